@@ -0,0 +1,390 @@
+# admin.py
+# Admin panel: authentication, dashboard, article and message management, performance pages
+import asyncio
+import math
+from datetime import datetime
+from functools import wraps
+
+from bson.objectid import ObjectId
+from flask import Blueprint, Response, current_app, flash, redirect, render_template, request, session, url_for
+from werkzeug.security import check_password_hash, generate_password_hash
+from werkzeug.utils import secure_filename
+
+from articles import ADMIN_LIST_PROJECTION, DASHBOARD_PROJECTION, record_deletion, summarize_content
+from images import variant_files
+from pagination import count_articles, paginate
+from services import (admin_accounts, async_mongo, category_registry, contact_queue, get_services, image_pipeline,
+                      login_throttle, mongo, profiler, related_index, search_index, trending, upload_store)
+from stats import read_dashboard_stats, record_article_added, record_article_removed, record_article_updated
+
+admin = Blueprint('admin', __name__, url_prefix='/admin')
+
+# Allowed file extensions for image uploads
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+
+# Authentication decorator
+def admin_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'admin_logged_in' not in session:
+            flash('Please log in to access the admin panel', 'error')
+            return redirect(url_for('admin.login'))
+        return current_app.ensure_sync(f)(*args, **kwargs)
+    return decorated_function
+
+
+@admin.route('/signup', methods=['GET', 'POST'])
+def signup():
+    # If there's already an admin, redirect to login (asking the database again before creating one)
+    if admin_accounts.exists(refresh=request.method == 'POST'):
+        flash('Admin user already exists. Please log in instead.', 'info')
+        return redirect(url_for('admin.login'))
+
+    if request.method == 'POST':
+        username = request.form.get('username')
+        email = request.form.get('email')
+        password = request.form.get('password')
+        confirm_password = request.form.get('confirm_password')
+
+        # Validation
+        if not username or not email or not password:
+            flash('All fields are required', 'error')
+            return render_template('admin/signup.html')
+
+        if password != confirm_password:
+            flash('Passwords do not match', 'error')
+            return render_template('admin/signup.html')
+
+        if len(password) < 6:
+            flash('Password must be at least 6 characters long', 'error')
+            return render_template('admin/signup.html')
+
+        # Check if username already exists
+        if mongo.db.admin_users.find_one({'username': username}):
+            flash('Username already exists', 'error')
+            return render_template('admin/signup.html')
+
+        # Create admin user
+        admin_user = {
+            'username': username,
+            'email': email,
+            'password': generate_password_hash(password),
+            'date_created': datetime.utcnow(),
+            'last_login': None,
+            'is_active': True
+        }
+
+        mongo.db.admin_users.insert_one(admin_user)
+        admin_accounts.created()
+
+        flash('Admin account created successfully! Please log in.', 'success')
+        return redirect(url_for('admin.login'))
+
+    return render_template('admin/signup.html')
+
+
+@admin.route('/login', methods=['GET', 'POST'])
+def login():
+    # If no admin exists, redirect to signup
+    if not admin_accounts.exists():
+        flash('No admin account found. Please create an admin account first.', 'info')
+        return redirect(url_for('admin.signup'))
+
+    if request.method == 'POST':
+        username = request.form.get('username')
+        password = request.form.get('password')
+
+        # Over the limit: turned away before the (deliberately slow) password hash
+        wait = login_throttle.check(request.remote_addr, username)
+        if wait:
+            flash('Too many login attempts. Please try again later.', 'error')
+            return render_template('admin/login.html'), 429, {'Retry-After': str(math.ceil(wait))}
+
+        admin_user = mongo.db.admin_users.find_one({'username': username, 'is_active': True})
+
+        if admin_user and check_password_hash(admin_user['password'], password):
+            login_throttle.succeeded(request.remote_addr, username)
+
+            # Set session, under a new id
+            session.clear()
+            session.regenerate()
+            session['admin_logged_in'] = True
+            session['admin_username'] = username
+            session['admin_id'] = str(admin_user['_id'])
+            session['last_login'] = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+
+            # Update last login
+            mongo.db.admin_users.update_one(
+                {'_id': admin_user['_id']},
+                {'$set': {'last_login': datetime.utcnow()}}
+            )
+
+            flash(f'Welcome back, {username}!', 'success')
+            return redirect(url_for('admin.dashboard'))
+        else:
+            flash('Invalid username or password', 'error')
+
+    return render_template('admin/login.html')
+
+
+@admin.route('/logout')
+def logout():
+    session.clear()
+    session.regenerate()
+    flash('You have been logged out successfully', 'success')
+    return redirect(url_for('admin.login'))
+
+
+# Updated Admin Dashboard Route with Fixed Analytics
+@admin.route('/dashboard')
+@admin_required
+def dashboard():
+    try:
+        # Totals, per-category and time-bucketed counters come from the news_stats rollups
+        stats = read_dashboard_stats(mongo.db, category_registry)
+
+        # Get recent news (last 5)
+        recent_news = list(mongo.db.news.find({}, DASHBOARD_PROJECTION).sort('date_created', -1).limit(5))
+
+        # Get most viewed news (top 5 by views)
+        popular_news = list(mongo.db.news.find({}, DASHBOARD_PROJECTION).sort('views', -1).limit(5))
+
+    except Exception:
+        # Render an empty dashboard rather than an error page, but keep the traceback
+        current_app.logger.exception("Dashboard analytics failed")
+        stats, recent_news, popular_news = EMPTY_DASHBOARD_STATS, [], []
+
+    return render_dashboard(stats, recent_news, popular_news)
+
+
+EMPTY_DASHBOARD_STATS = {
+    'total_news': 0,
+    'total_views': 0,
+    'category_stats': [],
+    'today_views': 0,
+    'news_with_images': 0
+}
+
+
+def render_dashboard(stats, recent_news, popular_news):
+    total_news = stats['total_news']
+    total_views_count = stats['total_views']
+
+    # Calculate average views per article
+    avg_views = total_views_count / total_news if total_news > 0 else 0
+
+    return render_template('admin/dashboard.html',
+                         total_news=total_news,
+                         total_views=total_views_count,
+                         recent_news=recent_news,
+                         popular_news=popular_news,
+                         trending_news=trending.top(5),
+                         category_stats=stats['category_stats'],
+                         today_views=stats['today_views'],
+                         news_with_images=stats['news_with_images'],
+                         avg_views=round(avg_views, 1))
+
+
+@admin.route('/news')
+@admin_required
+def news_list():
+    page = paginate(mongo.db.news, {}, current_app.config['ADMIN_NEWS_PER_PAGE'],
+                    after=request.args.get('after'),
+                    before=request.args.get('before'),
+                    projection=ADMIN_LIST_PROJECTION)
+    total = category_registry.count()
+    return render_template('admin/news_list.html', news_list=page.items, page=page, total=total)
+
+
+@admin.route('/messages')
+@admin_required
+def messages():
+    page = paginate(mongo.db.contacts, {}, current_app.config['ADMIN_MESSAGES_PER_PAGE'],
+                    after=request.args.get('after'),
+                    before=request.args.get('before'))
+    total = count_articles(mongo.db.contacts, {}, estimated=current_app.config['PAGINATION_ESTIMATED_COUNT'])
+    return render_template('admin/messages.html', messages=page.items, page=page, total=total,
+                           queue_stats=contact_queue.stats())
+
+
+@admin.route('/messages/delete/<message_id>', methods=['POST'])
+@admin_required
+def delete_message(message_id):
+    if ObjectId.is_valid(message_id) and mongo.db.contacts.delete_one({'_id': ObjectId(message_id)}).deleted_count:
+        flash('Message deleted', 'success')
+    else:
+        flash('Message not found', 'error')
+    return redirect(request.referrer or url_for('admin.messages'))
+
+
+@admin.route('/news/add', methods=['GET', 'POST'])
+@admin_required
+def add_news():
+    if request.method == 'POST':
+        title = request.form.get('title')
+        content = request.form.get('content')
+        category = request.form.get('category')
+
+        # Handle image upload (streamed to storage, stored once per distinct content)
+        image_filename = None
+        if 'image' in request.files:
+            image = request.files['image']
+            if image and allowed_file(image.filename):
+                image_filename = upload_store.add(image.stream, secure_filename(image.filename))
+
+        # Save news to database
+        news = {
+            'title': title,
+            'content': content,
+            'category': category,
+            'image': image_filename,
+            'date_created': datetime.utcnow(),
+            'date_updated': datetime.utcnow(),
+            'views': 0,
+            'author': session.get('admin_username', 'Admin'),
+            **summarize_content(content)
+        }
+        mongo.db.news.insert_one(news)
+        record_article_added(mongo.db, news)
+        category_registry.article_added(news)
+        services = get_services()
+        services.invalidate_news_caches(category, date_created=news['date_created'])
+        search_index.add(news)
+        related_index.submit_update(mongo.db.news, news, on_done=services.invalidate_article_pages)
+        if image_filename:
+            image_pipeline.submit(mongo.db.news, news['_id'], image_filename,
+                                  on_done=lambda: services.invalidate_news_caches(news_id=news['_id']))
+
+        flash('News article added successfully!', 'success')
+        return redirect(url_for('admin.news_list'))
+
+    return render_template('admin/add_news.html', categories=category_registry.names())
+
+
+@admin.route('/news/edit/<news_id>', methods=['GET', 'POST'])
+@admin_required
+def edit_news(news_id):
+    news = mongo.db.news.find_one({'_id': ObjectId(news_id)})
+
+    if not news:
+        flash('News article not found', 'error')
+        return redirect(url_for('admin.news_list'))
+
+    if request.method == 'POST':
+        title = request.form.get('title')
+        content = request.form.get('content')
+        category = request.form.get('category')
+
+        update_data = {
+            'title': title,
+            'content': content,
+            'category': category,
+            'date_updated': datetime.utcnow(),
+            **summarize_content(content)
+        }
+
+        # Handle image upload if a new image is provided
+        if 'image' in request.files:
+            image = request.files['image']
+            if image and allowed_file(image.filename):
+                # Save new image; the old one is released once the article no longer uses it
+                update_data['image'] = upload_store.add(image.stream, secure_filename(image.filename))
+                update_data['image_variants'] = []
+
+        # Update news in database
+        mongo.db.news.update_one({'_id': ObjectId(news_id)}, {'$set': update_data})
+        if update_data.get('image'):
+            upload_store.release(news.get('image'), legacy_files=variant_files(news))
+        record_article_updated(mongo.db, news, {**news, **update_data})
+        category_registry.article_updated(news, {**news, **update_data})
+        services = get_services()
+        services.invalidate_news_caches(news.get('category'), category, news_id=news_id,
+                                        date_created=news.get('date_created'))
+        search_index.add({**news, **update_data})
+        trending.update_article({**news, **update_data})
+        related_index.submit_update(mongo.db.news, {**news, **update_data}, on_done=services.invalidate_article_pages)
+        if update_data.get('image'):
+            image_pipeline.submit(mongo.db.news, news['_id'], update_data['image'],
+                                  on_done=lambda: services.invalidate_news_caches(news_id=news_id))
+
+        flash('News article updated successfully!', 'success')
+        return redirect(url_for('admin.news_list'))
+
+    return render_template('admin/edit_news.html', news=news, categories=category_registry.names())
+
+
+@admin.route('/news/delete/<news_id>')
+@admin_required
+def delete_news(news_id):
+    news = mongo.db.news.find_one({'_id': ObjectId(news_id)})
+
+    if news:
+        # Delete news from database
+        mongo.db.news.delete_one({'_id': ObjectId(news_id)})
+        record_deletion(mongo.db.news, news['_id'])
+
+        # Its image (and variants) are deleted in the background unless other articles use it
+        upload_store.release(news.get('image'), legacy_files=variant_files(news))
+        record_article_removed(mongo.db, news)
+        category_registry.article_removed(news)
+        services = get_services()
+        services.invalidate_news_caches(news.get('category'), news_id=news_id, date_created=news.get('date_created'))
+        search_index.remove(news_id)
+        trending.remove(news_id)
+        related_index.submit_remove(mongo.db.news, news_id, on_done=services.invalidate_article_pages)
+        flash('News article deleted successfully!', 'success')
+    else:
+        flash('News article not found', 'error')
+
+    return redirect(url_for('admin.news_list'))
+
+
+@admin.route('/performance')
+@admin_required
+def performance():
+    return render_template('admin/performance.html',
+                           slow_requests=profiler.slow_requests(),
+                           slow_threshold_ms=profiler.slow_threshold_ms,
+                           sample_rate=profiler.sample_rate)
+
+
+@admin.route('/performance/clear', methods=['POST'])
+@admin_required
+def clear_slow_requests():
+    profiler.clear_slow_requests()
+    flash('Slow request log cleared', 'success')
+    return redirect(url_for('admin.performance'))
+
+
+@admin.route('/metrics')
+def metrics():
+    # Scrapers authenticate with METRICS_TOKEN; a logged-in admin can view it in the browser
+    token = current_app.config['METRICS_TOKEN']
+    if not (token and request.headers.get('Authorization') == f'Bearer {token}') \
+            and 'admin_logged_in' not in session:
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(profiler.render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+# Async serving mode: the dashboard queries issued concurrently on Motor.
+# create_app() swaps it in when ASYNC_MODE is on.
+@admin_required
+async def dashboard_async():
+    news = async_mongo.db.news
+    try:
+        # The rollup reader is shared with sync mode, so it runs in a thread alongside the Motor queries
+        stats, recent_news, popular_news = await asyncio.gather(
+            asyncio.to_thread(read_dashboard_stats, mongo.db, category_registry),
+            async_mongo.run(lambda: news.find({}, DASHBOARD_PROJECTION).sort('date_created', -1).to_list(5)),
+            async_mongo.run(lambda: news.find({}, DASHBOARD_PROJECTION).sort('views', -1).to_list(5))
+        )
+    except Exception:
+        current_app.logger.exception("Dashboard analytics failed")
+        stats, recent_news, popular_news = EMPTY_DASHBOARD_STATS, [], []
+
+    return render_dashboard(stats, recent_news, popular_news)
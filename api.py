@@ -0,0 +1,53 @@
+# api.py
+# JSON endpoints used by the frontend scripts
+from bson.objectid import ObjectId
+from flask import Blueprint, current_app, jsonify, request
+
+from articles import SEARCH_RESULT_PROJECTION
+from services import mongo, search_index, trending
+
+api = Blueprint('api', __name__, url_prefix='/api')
+
+
+@api.route('/search')
+def search():
+    query = request.args.get('q', '')
+
+    if query:
+        # Rank matches with the inverted index, then fetch them in one $in lookup
+        search_index.ensure_fresh(mongo.db.news)
+        ranked_ids = search_index.search(query, limit=10)
+        found = {str(news['_id']): news for news in mongo.db.news.find(
+            {'_id': {'$in': [ObjectId(news_id) for news_id in ranked_ids]}}, SEARCH_RESULT_PROJECTION)}
+        # Articles deleted by another worker simply drop out here
+        news_list = [found[news_id] for news_id in ranked_ids if news_id in found]
+
+        # Convert ObjectId to string for JSON serialization
+        for news in news_list:
+            news['_id'] = str(news['_id'])
+            news['date_created'] = news['date_created'].isoformat()
+            if news.get('date_updated'):
+                news['date_updated'] = news['date_updated'].isoformat()
+    else:
+        news_list = []
+
+    return jsonify(news_list)
+
+
+@api.route('/trending')
+def trending_news():
+    size = current_app.config['TRENDING_SIZE']
+    limit = min(max(request.args.get('limit', size, type=int), 1), size)
+
+    # Served from memory; the ranking is refreshed in the background
+    news_list = [{
+        '_id': str(news['_id']),
+        'title': news.get('title'),
+        'excerpt': news.get('excerpt'),
+        'category': news.get('category'),
+        'date_created': news['date_created'].isoformat() if news.get('date_created') else None,
+        'views': news.get('views', 0),
+        'trending_score': round(news['trending_score'], 3)
+    } for news in trending.top(limit)]
+
+    return jsonify(news_list)
@@ -0,0 +1,77 @@
+# articles.py
+# Stored summaries (excerpt, word count, reading time), list-view projections and deletion records
+import math
+import re
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+EXCERPT_LENGTH = 200
+WORDS_PER_MINUTE = 200
+
+# Fields each list view renders; the article body is never fetched for them
+CARD_PROJECTION = {
+    'title': 1, 'excerpt': 1, 'category': 1, 'image': 1, 'image_variants': 1,
+    'date_created': 1, 'date_updated': 1, 'views': 1, 'reading_time': 1
+}
+ADMIN_LIST_PROJECTION = {
+    'title': 1, 'category': 1, 'image': 1, 'image_variants': 1,
+    'date_created': 1, 'date_updated': 1, 'views': 1
+}
+DASHBOARD_PROJECTION = {'title': 1, 'category': 1, 'date_created': 1, 'views': 1}
+SEARCH_RESULT_PROJECTION = {
+    'title': 1, 'excerpt': 1, 'category': 1, 'date_created': 1, 'date_updated': 1
+}
+
+# Deleted article ids, kept DELETION_RETENTION seconds (a TTL index) so the
+# in-memory indexes of every worker (search, related articles) can drop them
+DELETED_COLLECTION = 'deleted_news'
+DELETION_RETENTION = 30 * 24 * 3600
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def summarize_content(content):
+    """Fields derived from an article body, stored alongside it on add and edit."""
+    text = _WHITESPACE_RE.sub(' ', content or '').strip()
+    word_count = len(text.split())
+    if len(text) > EXCERPT_LENGTH:
+        # Cut on a word boundary
+        excerpt = text[:EXCERPT_LENGTH + 1].rsplit(' ', 1)[0]
+    else:
+        excerpt = text
+    return {
+        'excerpt': excerpt,
+        'word_count': word_count,
+        'reading_time': max(1, math.ceil(word_count / WORDS_PER_MINUTE))
+    }
+
+
+def migrate_summaries(collection, batch_size=500, recompute=False):
+    """Store summaries on articles that lack them (all articles with ``recompute``).
+
+    Returns the number of articles updated.
+    """
+    query = {} if recompute else {'excerpt': {'$exists': False}}
+    updated = 0
+    batch = []
+    for news in collection.find(query, {'content': 1}).batch_size(batch_size):
+        batch.append(UpdateOne({'_id': news['_id']}, {'$set': summarize_content(news.get('content'))}))
+        if len(batch) >= batch_size:
+            updated += collection.bulk_write(batch, ordered=False).modified_count
+            batch = []
+    if batch:
+        updated += collection.bulk_write(batch, ordered=False).modified_count
+    return updated
+
+
+def record_deletion(collection, news_id, now=None):
+    """Note that ``news_id`` was deleted from ``collection`` (the news collection)."""
+    now = now or datetime.utcnow()
+    collection.database[DELETED_COLLECTION].replace_one({'_id': news_id}, {'date_deleted': now}, upsert=True)
+
+
+def deleted_since(collection, since):
+    """``(news_id, date_deleted)`` for articles deleted at or after ``since``."""
+    return [(doc['_id'], doc['date_deleted'])
+            for doc in collection.database[DELETED_COLLECTION].find({'date_deleted': {'$gte': since}})]
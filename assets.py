@@ -0,0 +1,167 @@
+# assets.py
+# Static asset pipeline: content-hashed filenames, gzip/Brotli precompression and long-lived caching
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import shutil
+
+from flask import request, send_from_directory
+
+from storage import is_content_key
+
+logger = logging.getLogger(__name__)
+
+# Directories under static/ that are not part of the build
+SKIPPED_DIRS = ('dist', 'uploads')
+ASSET_EXTENSIONS = ('.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.ico', '.woff', '.woff2')
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg')
+# Variants in order of preference: (Accept-Encoding token, file suffix)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def _compressors():
+    """(encoding, suffix, compress) for each available encoding; Brotli is optional."""
+    # mtime=0 keeps gzip output byte-for-byte reproducible
+    compressors = [('gzip', '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    try:
+        import brotli
+    except ImportError:
+        logger.warning('brotli is not installed; building assets without .br variants')
+    else:
+        compressors.insert(0, ('br', '.br', lambda data: brotli.compress(data, quality=11)))
+    return compressors
+
+
+def build_assets(static_folder, output_dir='dist'):
+    """Copy every asset under ``static_folder`` to ``output_dir`` as ``name.<hash>.ext``.
+
+    Text assets also get ``.gz`` and (with the brotli package) ``.br``
+    siblings when compression makes them smaller. Writes ``manifest.json``
+    mapping each original path to its hashed path, both relative to the
+    static folder, and returns that mapping. Earlier builds are left in place
+    so pages cached before a deploy keep loading; ``prune_assets()`` removes
+    them.
+    """
+    manifest = {}
+    compressors = _compressors()
+    output_root = os.path.join(static_folder, output_dir)
+    for root, dirs, files in os.walk(static_folder):
+        if root == static_folder:
+            dirs[:] = [name for name in dirs if name not in SKIPPED_DIRS]
+        for name in sorted(files):
+            extension = os.path.splitext(name)[1]
+            if extension.lower() not in ASSET_EXTENSIONS:
+                continue
+            source = os.path.join(root, name)
+            relative = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                data = f.read()
+            hashed = f'{os.path.splitext(relative)[0]}.{fingerprint(data)}{extension}'
+            target = os.path.join(output_root, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if not os.path.exists(target):
+                shutil.copyfile(source, target)
+            if extension.lower() in COMPRESSIBLE_EXTENSIONS:
+                for _, suffix, compress in compressors:
+                    compressed = compress(data)
+                    if len(compressed) < len(data):
+                        with open(target + suffix, 'wb') as f:
+                            f.write(compressed)
+            manifest[relative] = f'{output_dir}/{hashed}'
+
+    with open(os.path.join(output_root, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def prune_assets(static_folder, manifest, output_dir='dist'):
+    """Delete built files that ``manifest`` no longer references. Returns how many were removed."""
+    keep = set()
+    for hashed in manifest.values():
+        keep.add(hashed)
+        keep.update(hashed + suffix for _, suffix in ENCODINGS)
+    keep.add(f'{output_dir}/manifest.json')
+    removed = 0
+    for root, _, files in os.walk(os.path.join(static_folder, output_dir)):
+        for name in files:
+            path = os.path.join(root, name)
+            if os.path.relpath(path, static_folder).replace(os.sep, '/') not in keep:
+                os.remove(path)
+                removed += 1
+    return removed
+
+
+class StaticAssets:
+    """Serves the fingerprinted build and rewrites ``url_for('static', ...)`` to it.
+
+    With a manifest present, ``url_for('static', filename='css/style.css')``
+    returns the hashed path. Hashed files are sent with an immutable one-year
+    Cache-Control, as the precompressed ``.br``/``.gz`` variant when the client
+    accepts it. Content-addressed uploads are immutable too; older uploads get
+    ``upload_max_age``. Without a build (development) URLs and caching are
+    unchanged.
+    """
+
+    def __init__(self, app=None, output_dir='dist', upload_max_age=30 * 86400):
+        self.output_dir = output_dir
+        self.upload_max_age = upload_max_age
+        self.manifest = {}
+        self._static_folder = None
+        self._hashed = set()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self._static_folder = app.static_folder
+        self.load()
+        app.url_defaults(self._rewrite_static_url)
+        app.view_functions['static'] = self.send_static
+
+    def load(self):
+        path = os.path.join(self._static_folder, self.output_dir, 'manifest.json')
+        try:
+            with open(path) as f:
+                self.manifest = json.load(f)
+        except FileNotFoundError:
+            self.manifest = {}
+        self._hashed = set(self.manifest.values())
+
+    def _rewrite_static_url(self, endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = self.manifest.get(values['filename'], values['filename'])
+
+    def send_static(self, filename):
+        if filename in self._hashed:
+            response = self._send_hashed(filename)
+            response.headers['Cache-Control'] = IMMUTABLE
+            return response
+        if filename.startswith('uploads/'):
+            if is_content_key(filename[len('uploads/'):]):
+                response = send_from_directory(self._static_folder, filename)
+                response.headers['Cache-Control'] = IMMUTABLE
+                return response
+            return send_from_directory(self._static_folder, filename, max_age=self.upload_max_age)
+        return send_from_directory(self._static_folder, filename)
+
+    def _send_hashed(self, filename):
+        if filename.endswith(COMPRESSIBLE_EXTENSIONS):
+            for encoding, suffix in ENCODINGS:
+                if request.accept_encodings[encoding] > 0 and \
+                        os.path.exists(os.path.join(self._static_folder, filename + suffix)):
+                    response = send_from_directory(self._static_folder, filename + suffix,
+                                                   mimetype=mimetypes.guess_type(filename)[0])
+                    response.headers['Content-Encoding'] = encoding
+                    response.vary.add('Accept-Encoding')
+                    return response
+        response = send_from_directory(self._static_folder, filename)
+        if filename.endswith(COMPRESSIBLE_EXTENSIONS):
+            response.vary.add('Accept-Encoding')
+        return response
@@ -0,0 +1,60 @@
+# async_mongo.py
+# Motor client for the async serving mode (ASYNC_MODE)
+#
+# Flask runs each async view in a short-lived event loop of its own, but a
+# Motor client (and its connection pool) is bound to the loop it was created
+# on. The client therefore lives on one long-running loop in a background
+# thread. Views pass zero-argument callables, e.g.
+#     lambda: async_mongo.db.news.find(query).to_list(10)
+# which are invoked on that loop and awaited through run_coroutine_threadsafe.
+import asyncio
+import os
+import threading
+
+
+class AsyncMongo:
+    def __init__(self, uri=None, **client_options):
+        self.uri = uri
+        self.client_options = client_options
+        self._loop = None
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app, **client_options):
+        self.uri = app.config['MONGO_URI']
+        self.client_options = client_options
+
+    @property
+    def db(self):
+        """The default database of MONGO_URI, as a Motor database."""
+        return self._ensure_client().get_default_database()
+
+    async def run(self, query):
+        """Call ``query()`` on the Motor loop and await its result from any other loop."""
+        self._ensure_client()
+
+        async def call():
+            return await query()
+
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(call(), self._loop))
+
+    def _ensure_client(self):
+        # Event loop threads do not survive a fork: each worker builds its own
+        if self._client is not None and self._pid == os.getpid():
+            return self._client
+        with self._lock:
+            if self._client is None or self._pid != os.getpid():
+                from motor.motor_asyncio import AsyncIOMotorClient
+
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name='motor-loop', daemon=True)
+                thread.start()
+
+                async def create_client():
+                    return AsyncIOMotorClient(self.uri, **self.client_options)
+
+                self._client = asyncio.run_coroutine_threadsafe(create_client(), loop).result()
+                self._loop = loop
+                self._pid = os.getpid()
+        return self._client
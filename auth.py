@@ -0,0 +1,73 @@
+# auth.py
+# Admin authentication: a cached "admin exists" flag and login throttling
+import ipaddress
+import time
+
+from contacts import RateLimiter
+
+
+class AdminAccounts:
+    """Whether an admin account exists, without a query on every login or signup page view.
+
+    The app never deletes admin accounts, so once one has been seen the answer
+    is kept for the life of the process. "None yet" is only trusted for
+    ``ttl`` seconds, so an account created by another worker or by
+    'flask init-db' is noticed quickly.
+    """
+
+    def __init__(self, ttl=10):
+        self.ttl = ttl
+        self._exists = False
+        self._checked_at = None
+        self._get_collection = None
+
+    def init_collection(self, get_collection):
+        self._get_collection = get_collection
+
+    def exists(self, refresh=False):
+        if self._exists:
+            return True
+        now = time.monotonic()
+        if refresh or self._checked_at is None or now - self._checked_at >= self.ttl:
+            self._exists = self._get_collection().find_one({}, {'_id': 1}) is not None
+            self._checked_at = now
+        return self._exists
+
+    def created(self):
+        """Record an account created by this process."""
+        self._exists = True
+
+
+class LoginThrottle:
+    """Login attempts per client IP and per username and network, checked before hashing.
+
+    ``check()`` costs a dict lookup, so a brute-force client that is over
+    its limit is turned away without the deliberately slow password hash.
+    An attempt takes a token from the client IP's bucket and one from the
+    bucket of the username tried from that IP's network (a /24 for IPv4, a
+    /64 for IPv6), which limits a guessing attack spread over the addresses
+    of one network. Keying on the network as well means an attacker cannot
+    lock the real admin out from everywhere else. Tokens are taken before
+    hashing so concurrent attempts cannot overrun a limit. A successful login
+    refills its username bucket, so in effect only failures count against it.
+    """
+
+    def __init__(self, ip_rate, ip_burst, user_rate, user_burst, max_keys=10000):
+        self.by_ip = RateLimiter(ip_rate, ip_burst, max_keys=max_keys)
+        self.by_user = RateLimiter(user_rate, user_burst, max_keys=max_keys)
+
+    @staticmethod
+    def _user_key(ip, username):
+        try:
+            address = ipaddress.ip_address(ip)
+            network = ipaddress.ip_network(f'{address}/{24 if address.version == 4 else 64}', strict=False)
+        except ValueError:
+            network = ip
+        return (username or '').strip().lower(), str(network)
+
+    def check(self, ip, username):
+        """Count an attempt. Returns 0 if it may go ahead, else seconds to wait."""
+        return self.by_ip.allow(ip) or self.by_user.allow(self._user_key(ip, username))
+
+    def succeeded(self, ip, username):
+        self.by_user.reset(self._user_key(ip, username))
@@ -0,0 +1,18 @@
+# benchmarks/__init__.py
+# Performance benchmarks for the News Portal. Run from the repository root:
+#   python -m benchmarks.bench_homepage [--uri mongodb://localhost:27017/news_bench]
+# Without --uri the benchmarks run against mongomock (pip install mongomock).
+#
+# Load tests: benchmarks.corpus generates a realistic corpus, benchmarks.traffic
+# models the request mix and benchmarks.runner replays it, reporting per-route
+# throughput and latency percentiles as JSON for comparison across commits.
+#
+# benchmarks.bench_startup times a fresh worker's boot: import, create_app() and
+# the first request.
+#
+# benchmarks.bench_login measures CPU per admin login attempt under a brute-force
+# load, with and without login throttling.
+#
+# benchmarks.bench_uploads runs uploads through the local and S3 storage backends
+# (S3 on moto, or MinIO with --endpoint-url) and checks the add/variants/release
+# round trip leaves nothing behind.
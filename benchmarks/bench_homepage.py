@@ -0,0 +1,48 @@
+# benchmarks/bench_homepage.py
+# Compares the old six-query homepage with the cached one-aggregation data layer:
+#   python -m benchmarks.bench_homepage --articles 5000 --requests 500
+import argparse
+
+from benchmarks.common import (CATEGORIES, CountingCollection, add_database_arguments,
+                               get_database, seed_articles, summarize, timed)
+from homepage import HomepageCache, fetch_homepage
+
+
+def legacy_homepage(news):
+    """The homepage queries exactly as index() used to issue them."""
+    recent_news = list(news.find().sort('date_created', -1).limit(3))
+    updated_news = list(news.find().sort('date_updated', -1).limit(4))
+    categorized_news = {}
+    for category in CATEGORIES:
+        categorized_news[category] = list(news.find({'category': category}).sort('date_created', -1).limit(4))
+    return recent_news, updated_news, categorized_news
+
+
+def run(news, label, func, requests):
+    counting = CountingCollection(news)
+    samples = timed(lambda: func(counting), requests)
+    stats = summarize(samples)
+    print(f"{label:<22} round trips/request: {counting.round_trips / requests:6.2f}  "
+          f"p50: {stats['p50_ms']:8.3f} ms  p99: {stats['p99_ms']:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Homepage round trips and latency, before and after")
+    add_database_arguments(parser)
+    parser.add_argument('--articles', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--ttl', type=float, default=30)
+    args = parser.parse_args()
+
+    db = get_database(args.uri, args.db)
+    seed_articles(db.news, args.articles)
+    print(f"Seeded {args.articles} articles, {args.requests} homepage requests each\n")
+
+    cache = HomepageCache(ttl=args.ttl)
+    run(db.news, 'six queries (before)', legacy_homepage, args.requests)
+    run(db.news, 'aggregation, uncached', lambda news: fetch_homepage(news, CATEGORIES), args.requests)
+    run(db.news, 'aggregation + cache', lambda news: cache.get(news, CATEGORIES), args.requests)
+
+
+if __name__ == '__main__':
+    main()
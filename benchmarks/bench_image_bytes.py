@@ -0,0 +1,61 @@
+# benchmarks/bench_image_bytes.py
+# Image bytes a browser downloads for one homepage load, original uploads vs variants:
+#   python -m benchmarks.bench_image_bytes [--uploads static/uploads] [--dpr 2]
+import argparse
+import os
+import shutil
+import tempfile
+
+from images import VARIANT_WIDTHS, generate_variants
+
+# Homepage image slots at a 1320 px container: 3 "recent" cards (col-md-4)
+# and 4 category sections of 4 cards (col-lg-3). Widths are CSS pixels.
+HOMEPAGE_SLOTS = [416] * 3 + [306] * 16
+
+
+def pick_variant(variants, fmt, needed_width):
+    """What a browser picks from a srcset: the smallest candidate at least as wide as needed."""
+    candidates = sorted((v for v in variants if v['format'] == fmt), key=lambda v: v['width'])
+    for variant in candidates:
+        if variant['width'] >= needed_width:
+            return variant
+    return candidates[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Homepage image bytes before and after variants')
+    parser.add_argument('--uploads', default=os.path.join('static', 'uploads'))
+    parser.add_argument('--dpr', type=float, default=1.0, help='Device pixel ratio of the client')
+    args = parser.parse_args()
+
+    originals = sorted(name for name in os.listdir(args.uploads)
+                       if os.path.splitext(name)[1].lower() in ('.jpg', '.jpeg', '.png', '.gif'))
+    if not originals:
+        parser.error(f'no images in {args.uploads}')
+
+    workdir = tempfile.mkdtemp(prefix='image-bench-')
+    try:
+        variants = {}
+        for name in originals:
+            shutil.copy(os.path.join(args.uploads, name), workdir)
+            variants[name] = generate_variants(workdir, name, VARIANT_WIDTHS)
+
+        totals = {'original': 0, 'jpeg': 0, 'webp': 0}
+        for slot, css_width in enumerate(HOMEPAGE_SLOTS):
+            name = originals[slot % len(originals)]
+            needed = css_width * args.dpr
+            totals['original'] += os.path.getsize(os.path.join(args.uploads, name))
+            if variants[name]:
+                totals['jpeg'] += pick_variant(variants[name], 'jpeg', needed)['bytes']
+                totals['webp'] += pick_variant(variants[name], 'webp', needed)['bytes']
+    finally:
+        shutil.rmtree(workdir)
+
+    print(f"{len(HOMEPAGE_SLOTS)} homepage images, {len(originals)} distinct uploads, DPR {args.dpr}\n")
+    for label, key in (('original uploads', 'original'), ('JPEG srcset', 'jpeg'), ('WebP srcset', 'webp')):
+        saving = 100 * (1 - totals[key] / totals['original'])
+        print(f"{label:<17} {totals[key] / 1024:10.1f} KiB   ({saving:5.1f}% less than originals)")
+
+
+if __name__ == '__main__':
+    main()
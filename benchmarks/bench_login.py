@@ -0,0 +1,126 @@
+# benchmarks/bench_login.py
+# CPU spent per admin login attempt while a brute-force client hammers /admin/login
+#   python -m benchmarks.bench_login --attempts 200 --rate 50 [--ips 1] [--uri mongodb://localhost:27017/news_bench]
+# Runs the attack twice through the test client: with the configured login
+# throttle, then with it disabled (the app before throttling), and reports
+# process CPU per attempt, how many password hashes were computed and whether
+# the real admin can still log in from another address afterwards. Without
+# --uri the app runs on mongomock; with --uri the URI is the app's MONGO_URI,
+# so include the database name.
+import argparse
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import generate_password_hash
+
+import admin
+from app import create_app
+from benchmarks.common import UNTHROTTLED_LOGIN, summarize
+from services import get_services
+
+USERNAME = 'admin'
+PASSWORD = 'correct-horse-battery'
+
+
+def build_app(args, overrides):
+    config = {'TESTING': True, 'SESSION_STORE_URL': 'memory://', **overrides}
+    if args.uri:
+        config['MONGO_URI'] = args.uri
+    app = create_app(config)
+    services = get_services(app)
+    if not args.uri:
+        import mongomock
+        db = mongomock.MongoClient()[args.db]
+        services.mongo.db = db
+        services.mongo.cx = db.client
+    db = services.mongo.db
+    db.admin_users.delete_many({})
+    db.admin_users.insert_one({'username': USERNAME, 'email': 'admin@example.com',
+                               'password': generate_password_hash(PASSWORD), 'is_active': True})
+    return app
+
+
+class HashCounter:
+    """Counts check_password_hash calls made by the login view."""
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._check = admin.check_password_hash
+
+    def __call__(self, pwhash, password):
+        with self._lock:
+            self.calls += 1
+        return self._check(pwhash, password)
+
+
+def attack(app, args):
+    client = app.test_client()
+    statuses = Counter()
+    latencies = []
+    lock = threading.Lock()
+
+    def attempt(index):
+        # Open loop: attempts are sent at the attack rate whether or not earlier ones finished
+        delay = started + index / args.rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        request_started = time.perf_counter()
+        response = client.post('/admin/login', data={'username': USERNAME, 'password': f'guess-{index}'},
+                               environ_base={'REMOTE_ADDR': f'203.0.113.{index % args.ips}'})
+        with lock:
+            statuses[response.status_code] += 1
+            latencies.append((time.perf_counter() - request_started) * 1000)
+
+    counter = HashCounter()
+    admin.check_password_hash = counter
+    try:
+        cpu_started = time.process_time()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(attempt, range(args.attempts)))
+        wall = time.perf_counter() - started
+        cpu = time.process_time() - cpu_started
+    finally:
+        admin.check_password_hash = counter._check
+
+    # The real admin, from an address the attacker does not use
+    response = app.test_client().post('/admin/login', data={'username': USERNAME, 'password': PASSWORD},
+                                      environ_base={'REMOTE_ADDR': '198.51.100.1'})
+    return {
+        'cpu_ms_per_attempt': cpu * 1000 / args.attempts,
+        'cpu_share': cpu / wall,
+        'hashes': counter.calls,
+        'statuses': dict(sorted(statuses.items())),
+        'latency': summarize(latencies),
+        'admin_login_status': response.status_code,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU per login attempt under a brute-force load, throttled or not")
+    parser.add_argument('--uri', default=None,
+                        help="The app's MONGO_URI (with database name); uses mongomock when omitted")
+    parser.add_argument('--db', default='news_bench', help='mongomock database name')
+    parser.add_argument('--attempts', type=int, default=200)
+    parser.add_argument('--rate', type=float, default=50, help='Attempts per second offered by the attacker')
+    parser.add_argument('--ips', type=int, default=1, help='Source addresses the attack rotates through')
+    parser.add_argument('--concurrency', type=int, default=8, help='Attempts in flight at once')
+    args = parser.parse_args()
+
+    print(f"{args.attempts} wrong-password logins for '{USERNAME}' at {args.rate:g}/s "
+          f"from {args.ips} address(es), {args.concurrency} in flight\n")
+    for label, overrides in (('throttled', {}), ('unthrottled (before)', UNTHROTTLED_LOGIN)):
+        result = attack(build_app(args, overrides), args)
+        latency = result['latency']
+        print(f"{label:<21} CPU/attempt: {result['cpu_ms_per_attempt']:8.2f} ms  "
+              f"CPU busy: {result['cpu_share']:6.1%}  hashes: {result['hashes']:5d}  "
+              f"p50: {latency['p50_ms']:8.2f} ms  p99: {latency['p99_ms']:8.2f} ms")
+        print(f"{'':<21} statuses: {result['statuses']}  "
+              f"real admin login afterwards: {result['admin_login_status']}")
+
+
+if __name__ == '__main__':
+    main()
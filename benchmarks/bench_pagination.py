@@ -0,0 +1,50 @@
+# benchmarks/bench_pagination.py
+# Latency of page 1 vs a deep page, skip/limit against keyset cursors:
+#   python -m benchmarks.bench_pagination --uri mongodb://localhost:27017/news_bench
+# The default corpus is 1M articles; pass --articles for a quicker run on mongomock.
+import argparse
+
+from benchmarks.common import add_database_arguments, get_database, seed_articles, summarize, timed
+from pagination import SORT_KEYS, encode_cursor, paginate
+
+PER_PAGE = 6
+
+
+def skip_page(news, page):
+    return list(news.find({}).sort(SORT_KEYS).skip((page - 1) * PER_PAGE).limit(PER_PAGE))
+
+
+def cursor_for_page(news, page):
+    """Token of the last article on the page before ``page`` (computed once, outside timing)."""
+    if page == 1:
+        return None
+    previous = skip_page(news, page - 1)
+    return encode_cursor(previous[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Skip vs keyset pagination latency')
+    add_database_arguments(parser)
+    parser.add_argument('--articles', type=int, default=1_000_000)
+    parser.add_argument('--deep-page', type=int, default=10_000)
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+
+    if args.deep_page * PER_PAGE > args.articles:
+        parser.error('--deep-page is beyond the end of the corpus')
+
+    db = get_database(args.uri, args.db)
+    seed_articles(db.news, args.articles, content_words=20)
+    db.news.create_index(SORT_KEYS)
+    print(f"Seeded {args.articles} articles, {args.requests} requests per measurement\n")
+
+    for page_number in (1, args.deep_page):
+        after = cursor_for_page(db.news, page_number)
+        skip_stats = summarize(timed(lambda: skip_page(db.news, page_number), args.requests))
+        keyset_stats = summarize(timed(lambda: paginate(db.news, {}, PER_PAGE, after=after), args.requests))
+        print(f"page {page_number:>6}  skip/limit p50: {skip_stats['p50_ms']:9.3f} ms  p99: {skip_stats['p99_ms']:9.3f} ms   "
+              f"keyset p50: {keyset_stats['p50_ms']:9.3f} ms  p99: {keyset_stats['p99_ms']:9.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
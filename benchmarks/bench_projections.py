@@ -0,0 +1,66 @@
+# benchmarks/bench_projections.py
+# Bytes and decode time of list queries with full documents vs the card projection:
+#   python -m benchmarks.bench_projections --words 3000
+import argparse
+import time
+
+import bson
+
+from articles import CARD_PROJECTION, summarize_content
+from benchmarks.common import CATEGORIES, add_database_arguments, get_database, make_article, summarize, timed
+from homepage import build_homepage_pipeline
+
+PER_PAGE = 6
+
+
+def seed_long_articles(collection, count, words):
+    articles = []
+    for index in range(count):
+        article = make_article(index, content_words=words)
+        article.update(summarize_content(article['content']))
+        articles.append(article)
+    collection.insert_many(articles)
+
+
+def payload_bytes(docs):
+    """Approximate wire size: the BSON the server sends for these documents."""
+    return sum(len(bson.encode(doc)) for doc in docs)
+
+
+def decode_time_ms(docs, rounds=200):
+    raw = [bson.encode(doc) for doc in docs]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for data in raw:
+            bson.decode(data)
+    return (time.perf_counter() - start) * 1000 / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Full documents vs card projection for list views')
+    add_database_arguments(parser)
+    parser.add_argument('--articles', type=int, default=2000)
+    parser.add_argument('--words', type=int, default=3000, help='Words per article body')
+    parser.add_argument('--requests', type=int, default=100)
+    args = parser.parse_args()
+
+    db = get_database(args.uri, args.db)
+    seed_long_articles(db.news, args.articles, args.words)
+    print(f"Seeded {args.articles} articles of {args.words} words\n")
+
+    cases = [
+        ('all_news page', lambda projection: list(
+            db.news.find({}, projection).sort('date_created', -1).limit(PER_PAGE))),
+        ('homepage', lambda projection: list(
+            db.news.aggregate(build_homepage_pipeline(CATEGORIES, projection=projection)))),
+    ]
+    for label, query in cases:
+        for mode, projection in (('full', None), ('projected', CARD_PROJECTION)):
+            docs = query(projection)
+            latency = summarize(timed(lambda: query(projection), args.requests))
+            print(f"{label:<16} {mode:<10} {payload_bytes(docs) / 1024:9.1f} KiB  "
+                  f"decode {decode_time_ms(docs):7.3f} ms  p50 {latency['p50_ms']:8.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# benchmarks/bench_startup.py
+# Worker boot time: importing the app, create_app() and the first request, each run in a fresh interpreter
+#   python -m benchmarks.bench_startup --runs 10 [--path /all-news] [--uri mongodb://localhost:27017/news_bench]
+# Compare with --eager, which builds every service inside create_app() the way
+# the app did before services were lazy. Without --uri each run gets a small
+# mongomock database (seeding is not timed); with --uri the URI is the app's
+# MONGO_URI, so include the database name.
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from benchmarks.common import summarize
+
+PHASES = ('import_ms', 'create_app_ms', 'first_request_ms', 'second_request_ms', 'total_ms')
+# Modules whose import shows a service was built (or a dependency pulled in) before it was needed
+HEAVY_MODULES = ('numpy', 'PIL', 'motor', 'gridfs', 'flask_pymongo', 'related', 'transfer')
+
+
+def worker(args):
+    """One worker boot, in this (fresh) process. Prints the timings as JSON."""
+    started = time.perf_counter()
+    from app import create_app
+    from services import Services, get_services
+    imported = time.perf_counter()
+
+    app = create_app({'MONGO_URI': args.uri} if args.uri else None)
+    services = get_services(app)
+    if args.eager:
+        for name, attribute in vars(Services).items():
+            if isinstance(attribute, property):
+                getattr(services, name)
+    created = time.perf_counter()
+    loaded_by_startup = [name for name in HEAVY_MODULES if name in sys.modules]
+
+    if not args.uri:
+        import mongomock
+        from benchmarks.common import seed_articles
+        db = mongomock.MongoClient()[args.db]
+        seed_articles(db.news, 200)
+        services.mongo.db = db
+        services.mongo.cx = db.client
+        seeding = time.perf_counter() - created
+    else:
+        seeding = 0.0
+
+    client = app.test_client()
+    request_started = time.perf_counter()
+    status = client.get(args.path).status_code
+    first = time.perf_counter()
+    client.get(args.path)
+    second = time.perf_counter()
+
+    print(json.dumps({
+        'import_ms': (imported - started) * 1000,
+        'create_app_ms': (created - imported) * 1000,
+        'first_request_ms': (first - request_started) * 1000,
+        'second_request_ms': (second - first) * 1000,
+        'total_ms': (first - started - seeding) * 1000,
+        'status': status,
+        'loaded_by_startup': loaded_by_startup,
+    }))
+
+
+def run_worker(args):
+    command = [sys.executable, '-m', 'benchmarks.bench_startup', '--worker', '--path', args.path, '--db', args.db]
+    if args.uri:
+        command += ['--uri', args.uri]
+    if args.eager:
+        command.append('--eager')
+    started = time.perf_counter()
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    # Includes interpreter start-up, which no change to the app can avoid
+    result['process_ms'] = (time.perf_counter() - started) * 1000
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-to-first-request time of a fresh worker process")
+    parser.add_argument('--uri', default=None,
+                        help="The app's MONGO_URI (with database name); uses mongomock when omitted")
+    parser.add_argument('--db', default='news_bench', help='mongomock database name')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--path', default='/', help='Path of the first request')
+    parser.add_argument('--eager', action='store_true', help='Build every service in create_app()')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--json', help='Write the per-run results to this file')
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+
+    results = [run_worker(args) for _ in range(args.runs)]
+    statuses = sorted({result['status'] for result in results})
+    print(f"{args.runs} worker boots, first request GET {args.path} (status {', '.join(map(str, statuses))})"
+          f"{', eager services' if args.eager else ''}\n")
+    for phase in (*PHASES, 'process_ms'):
+        stats = summarize([result[phase] for result in results])
+        print(f"{phase[:-3]:<16} p50: {stats['p50_ms']:9.2f} ms  p99: {stats['p99_ms']:9.2f} ms  "
+              f"mean: {stats['mean_ms']:9.2f} ms")
+    loaded = results[0]['loaded_by_startup']
+    print(f"\nImported by import and create_app(): {', '.join(loaded) if loaded else 'none'} "
+          f"(of {', '.join(HEAVY_MODULES)})")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'path': args.path, 'eager': args.eager, 'runs': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
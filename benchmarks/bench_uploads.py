@@ -0,0 +1,151 @@
+# benchmarks/bench_uploads.py
+# Upload storage on the local and S3 backends: time per upload and a full add/variants/release round trip
+#   python -m benchmarks.bench_uploads [--uploads 50] [--duplicates 0.3] [--endpoint-url http://localhost:9000]
+# Stores --uploads JPEGs (a share of them repeats of earlier ones) through
+# UploadStore, generates variants for one of them, releases every reference
+# and checks that each backend ends up empty. Without --endpoint-url the S3
+# backend runs against moto's in-process S3 (needs boto3 and moto); with it,
+# against an S3-compatible server such as MinIO, using the usual AWS
+# credential variables. The uploads collection is on mongomock unless --uri
+# is given.
+import argparse
+import io
+import os
+import random
+import shutil
+import tempfile
+import time
+from contextlib import nullcontext
+
+from PIL import Image
+
+from benchmarks.common import add_database_arguments, get_database, summarize
+from images import ImagePipeline
+from storage import IMMUTABLE, LocalBackend, S3Backend, UploadStore
+
+
+def make_jpeg(rng, size=(640, 400)):
+    image = Image.new('RGB', size, tuple(rng.randrange(256) for _ in range(3)))
+    for _ in range(20):
+        x, y = rng.randrange(size[0] - 40), rng.randrange(size[1] - 40)
+        image.paste(tuple(rng.randrange(256) for _ in range(3)), (x, y, x + 40, y + 40))
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=85)
+    return output.getvalue()
+
+
+def make_uploads(count, duplicates, seed=42):
+    rng = random.Random(seed)
+    uploads = []
+    for _ in range(count):
+        if uploads and rng.random() < duplicates:
+            uploads.append(rng.choice(uploads))
+        else:
+            uploads.append(make_jpeg(rng))
+    return uploads
+
+
+def stored_keys(backend):
+    if isinstance(backend, S3Backend):
+        pages = backend.client.get_paginator('list_objects_v2').paginate(Bucket=backend.bucket,
+                                                                         Prefix=backend.prefix)
+        return [item['Key'][len(backend.prefix):] for page in pages for item in page.get('Contents', [])]
+    keys = []
+    for folder, directories, files in os.walk(backend.root):
+        directories[:] = [name for name in directories if name != '.staging']
+        keys.extend(os.path.relpath(os.path.join(folder, name), backend.root) for name in files)
+    return keys
+
+
+def round_trip(backend, db, uploads):
+    """Add, process and release ``uploads`` on ``backend``. Returns timings and the problems found."""
+    db.uploads.delete_many({})
+    db.news.delete_many({})
+    store = UploadStore(backend)
+    store.init_collection(lambda: db.uploads)
+    problems = []
+
+    latencies = []
+    keys = []
+    for index, data in enumerate(uploads):
+        started = time.perf_counter()
+        keys.append(store.add(io.BytesIO(data), f'upload-{index}.JPG'))
+        latencies.append((time.perf_counter() - started) * 1000)
+    distinct = len(set(uploads))
+    if len(stored_keys(backend)) != distinct:
+        problems.append(f'{len(stored_keys(backend))} objects stored for {distinct} distinct uploads')
+    for key, data in zip(keys, uploads):
+        with store.backend.open(key) as stored:
+            if stored.read() != data:
+                problems.append(f'{key} does not read back as uploaded')
+                break
+    if isinstance(backend, S3Backend):
+        head = backend.client.head_object(Bucket=backend.bucket, Key=backend.prefix + keys[0])
+        if head.get('CacheControl') != IMMUTABLE or head.get('ContentType') != 'image/jpeg':
+            problems.append(f"object headers: {head.get('CacheControl')!r}, {head.get('ContentType')!r}")
+
+    news_id = db.news.insert_one({'image': keys[0]}).inserted_id
+    started = time.perf_counter()
+    variants = ImagePipeline(store).process(db.news, news_id, keys[0])
+    variants_ms = (time.perf_counter() - started) * 1000
+    missing = [variant['filename'] for variant in variants if not backend.exists(variant['filename'])]
+    if not variants or missing:
+        problems.append(f'variants not stored: {missing or "none generated"}')
+
+    started = time.perf_counter()
+    for key in keys:
+        store.release(key)
+    store.shutdown()
+    release_ms = (time.perf_counter() - started) * 1000
+    left = stored_keys(backend)
+    if left or db.uploads.count_documents({}):
+        problems.append(f'{len(left)} objects and {db.uploads.count_documents({})} records left after release')
+
+    return {'add': summarize(latencies), 'stored': distinct, 'variants': len(variants),
+            'variants_ms': variants_ms, 'release_ms': release_ms, 'problems': problems}
+
+
+def s3_backend(args):
+    import boto3
+    client = boto3.client('s3', endpoint_url=args.endpoint_url, region_name='us-east-1')
+    client.create_bucket(Bucket=args.bucket)
+    return S3Backend(args.bucket, prefix='uploads/', client=client, endpoint_url=args.endpoint_url)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Upload storage round trip on the local and S3 backends')
+    add_database_arguments(parser)
+    parser.add_argument('--uploads', type=int, default=50)
+    parser.add_argument('--duplicates', type=float, default=0.3, help='Share of uploads that repeat an earlier one')
+    parser.add_argument('--endpoint-url', default=None, help='S3-compatible server (MinIO); moto when omitted')
+    parser.add_argument('--bucket', default='news-bench-uploads')
+    args = parser.parse_args()
+
+    db = get_database(args.uri, args.db)
+    uploads = make_uploads(args.uploads, args.duplicates)
+    print(f"{args.uploads} uploads ({len(set(uploads))} distinct), "
+          f"{sum(map(len, uploads)) / len(uploads) / 1024:.1f} KiB each on average\n")
+
+    if args.endpoint_url:
+        mock = nullcontext()
+    else:
+        from moto import mock_aws
+        os.environ.setdefault('AWS_ACCESS_KEY_ID', 'bench')
+        os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'bench')
+        mock = mock_aws()
+
+    root = tempfile.mkdtemp(prefix='upload-bench-')
+    try:
+        with mock:
+            for label, backend in (('local', LocalBackend(root)), ('s3', s3_backend(args))):
+                result = round_trip(backend, db, uploads)
+                print(f"{label:<6} add p50: {result['add']['p50_ms']:7.2f} ms  p99: {result['add']['p99_ms']:7.2f} ms  "
+                      f"stored: {result['stored']:4d}  variants: {result['variants']} in {result['variants_ms']:7.1f} ms  "
+                      f"release all: {result['release_ms']:7.1f} ms")
+                print(f"{'':<6} {'; '.join(result['problems']) or 'round trip ok'}")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
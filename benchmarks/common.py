@@ -0,0 +1,100 @@
+# benchmarks/common.py
+# Helpers shared by the benchmark scripts
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from categories import DEFAULT_CATEGORIES as CATEGORIES
+
+# App settings that take the login throttle out of the way: load tests log in
+# far more often from one address than a person does
+UNTHROTTLED_LOGIN = {'LOGIN_IP_BURST': 10 ** 9, 'LOGIN_USER_BURST': 10 ** 9}
+
+
+def add_database_arguments(parser):
+    parser.add_argument('--uri', default=None,
+                        help='MongoDB URI of a local mongod; uses mongomock when omitted')
+    parser.add_argument('--db', default='news_bench', help='Database name to (re)create')
+
+
+def get_database(uri=None, name='news_bench'):
+    """Return a clean database on a real mongod, or an in-memory mongomock one."""
+    if uri:
+        from pymongo import MongoClient
+        client = MongoClient(uri)
+    else:
+        import mongomock
+        client = mongomock.MongoClient()
+    client.drop_database(name)
+    return client[name]
+
+
+def make_article(index, now=None, content_words=60):
+    now = now or datetime.utcnow()
+    created = now - timedelta(minutes=index)
+    words = ' '.join(random.choice(('lorem', 'ipsum', 'dolor', 'news', 'portal', 'update'))
+                     for _ in range(content_words))
+    return {
+        'title': f'Benchmark article {index}',
+        'content': words,
+        'category': CATEGORIES[index % len(CATEGORIES)],
+        'image': None,
+        'date_created': created,
+        'date_updated': created + timedelta(seconds=random.randint(0, 3600)),
+        'views': random.randint(0, 5000),
+        'author': 'Admin'
+    }
+
+
+def seed_articles(collection, count, batch_size=10000, content_words=60):
+    now = datetime.utcnow()
+    for start in range(0, count, batch_size):
+        stop = min(start + batch_size, count)
+        collection.insert_many([make_article(i, now, content_words) for i in range(start, stop)])
+
+
+class CountingCollection:
+    """Wraps a collection and counts calls that cost a round trip to the server."""
+
+    ROUND_TRIP_METHODS = {'find', 'find_one', 'aggregate', 'count_documents',
+                          'estimated_document_count', 'distinct'}
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.round_trips = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name in self.ROUND_TRIP_METHODS:
+            def counted(*args, **kwargs):
+                self.round_trips += 1
+                return attr(*args, **kwargs)
+            return counted
+        return attr
+
+
+def timed(func, iterations):
+    """Call ``func`` repeatedly and return the latencies in milliseconds."""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples):
+    return {
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p99_ms': round(percentile(samples, 99), 3),
+        'mean_ms': round(statistics.mean(samples), 3) if samples else 0.0
+    }
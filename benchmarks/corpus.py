@@ -0,0 +1,153 @@
+# benchmarks/corpus.py
+# Synthetic corpus at realistic size for load tests:
+#   python -m benchmarks.corpus --uri mongodb://localhost:27017/news_bench --articles 100000
+# Article bodies are log-normally sized (median ~550 words), categories are
+# skewed, publication dates lean recent and views follow a power law. Words
+# are drawn Zipf-style from a shared vocabulary plus per-category topic words,
+# so search and related articles see text with real term statistics.
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from articles import summarize_content
+from benchmarks.common import add_database_arguments, get_database
+from categories import ensure_categories, rebuild_categories
+from indexes import ensure_indexes
+from related import RelatedIndex
+from stats import rebuild_stats
+
+# Share of articles per category
+CATEGORY_WEIGHTS = {'Technology': 0.35, 'Sports': 0.3, 'Political': 0.2, 'Programming': 0.15}
+
+COMMON_WORDS = (
+    'the of and to in a is that for it as was with be by on not he i this are or his from at which '
+    'but have an they you were her she there one all we their has been would more if will when who '
+    'so no said new year people time day report city government week company team country world '
+    'state public group local season market announced officials according support million percent '
+    'early national plan month number part last week expected major series growth change'
+).split()
+TOPIC_WORDS = {
+    'Technology': ('ai model chip startup cloud device battery software hardware smartphone data '
+                   'network security privacy platform launch research robot quantum semiconductor').split(),
+    'Sports': ('match goal season championship coach league player score final tournament '
+               'victory defeat striker injury transfer stadium fans record title squad').split(),
+    'Political': ('election minister parliament vote policy campaign senate summit treaty '
+                  'reform budget opposition coalition president law court debate climate tax').split(),
+    'Programming': ('python rust compiler release library framework api runtime language '
+                    'developer async memory performance bug patch version typescript kernel '
+                    'database testing').split(),
+}
+# Chance that a word is a topic word rather than a common one
+TOPIC_SHARE = 0.25
+
+
+def _zipf_cum_weights(count, exponent=1.1):
+    total = 0.0
+    cum_weights = []
+    for rank in range(1, count + 1):
+        total += 1 / rank ** exponent
+        cum_weights.append(total)
+    return cum_weights
+
+
+_COMMON_CUM_WEIGHTS = _zipf_cum_weights(len(COMMON_WORDS))
+_TOPIC_CUM_WEIGHTS = {category: _zipf_cum_weights(len(words)) for category, words in TOPIC_WORDS.items()}
+
+
+def _words(rng, category, count):
+    topic = TOPIC_WORDS[category]
+    topic_count = sum(1 for _ in range(count) if rng.random() < TOPIC_SHARE)
+    words = (rng.choices(COMMON_WORDS, cum_weights=_COMMON_CUM_WEIGHTS, k=count - topic_count)
+             + rng.choices(topic, cum_weights=_TOPIC_CUM_WEIGHTS[category], k=topic_count))
+    rng.shuffle(words)
+    return words
+
+
+def make_article(rng, index, now, days):
+    category = rng.choices(list(CATEGORY_WEIGHTS), weights=list(CATEGORY_WEIGHTS.values()))[0]
+    # Publication age: exponential, so most articles are recent but the archive is deep
+    created = now - timedelta(seconds=min(rng.expovariate(3 / (days * 86400)), days * 86400))
+    word_count = max(40, min(int(rng.lognormvariate(6.3, 0.5)), 5000))
+    words = _words(rng, category, word_count)
+    # Paragraphs of 40-120 words
+    paragraphs = []
+    while words:
+        size = rng.randint(40, 120)
+        paragraphs.append(' '.join(words[:size]).capitalize() + '.')
+        words = words[size:]
+    content = '\n\n'.join(paragraphs)
+    title = ' '.join(_words(rng, category, rng.randint(5, 11))).capitalize()
+    updated = created
+    if rng.random() < 0.2:
+        updated = min(now, created + timedelta(hours=rng.uniform(0.5, 72)))
+    return {
+        'title': f'{title} ({index})',
+        'content': content,
+        'category': category,
+        'image': None,
+        'date_created': created,
+        'date_updated': updated,
+        'views': int(rng.paretovariate(1.2) * 20) - 20,
+        'author': 'Admin',
+        **summarize_content(content)
+    }
+
+
+def generate_corpus(db, count, seed=42, days=365, batch_size=2000, admin_password='admin123', related=False):
+    """Replace ``db.news`` with ``count`` synthetic articles and prepare the database like init_database().
+
+    Returns the number of articles inserted.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    db.news.drop()
+    batch = []
+    for index in range(count):
+        batch.append(make_article(rng, index, now, days))
+        if len(batch) >= batch_size:
+            db.news.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        db.news.insert_many(batch, ordered=False)
+
+    ensure_indexes(db)
+    rebuild_stats(db)
+    ensure_categories(db)
+    rebuild_categories(db)
+    if related:
+        RelatedIndex().rebuild(db.news)
+    if db.admin_users.count_documents({'username': 'admin'}) == 0:
+        db.admin_users.insert_one({
+            'username': 'admin',
+            'email': 'admin@newsportal.com',
+            'password': generate_password_hash(admin_password),
+            'date_created': now,
+            'last_login': None,
+            'is_active': True
+        })
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic news corpus')
+    add_database_arguments(parser)
+    parser.add_argument('--articles', type=int, default=100_000)
+    parser.add_argument('--days', type=int, default=365, help='How far back publication dates go')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--related', action='store_true', help='Also precompute related articles')
+    args = parser.parse_args()
+
+    if not args.uri:
+        parser.error('--uri is required: a mongomock corpus would vanish when this process exits '
+                     '(benchmarks.runner --generate builds one in-process)')
+    db = get_database(args.uri, args.db)
+    start = time.perf_counter()
+    generate_corpus(db, args.articles, seed=args.seed, days=args.days, related=args.related)
+    print(f"Inserted {args.articles} articles into {args.db} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
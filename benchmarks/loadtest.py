@@ -0,0 +1,106 @@
+# benchmarks/loadtest.py
+# HTTP load test against a running server. ASYNC_MODE only changes the admin
+# dashboard, so compare sync and async serving on it, with an admin session cookie:
+#   gunicorn -w 2 -k gthread --threads 16 wsgi:app                (ASYNC_MODE = False)
+#   python -m benchmarks.loadtest --path /admin/dashboard --cookie session=... --label sync --json sync.json
+#   gunicorn -w 2 -k gthread --threads 16 wsgi:app                (ASYNC_MODE = True)
+#   python -m benchmarks.loadtest --path /admin/dashboard --cookie session=... --label async --json async.json
+# Pass --bust-cache to add a unique query arg per request, so the database path
+# is measured rather than response cache hits.
+import argparse
+import itertools
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import percentile
+
+DEFAULT_PATHS = ['/all-news', '/all-news?category=Technology']
+
+
+def fetch(url, headers):
+    request = urllib.request.Request(url, headers=headers)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as error:
+        status = error.code
+    except (urllib.error.URLError, OSError):
+        status = None
+    return status, time.perf_counter() - start
+
+
+def run(url, concurrency, duration, headers, bust_cache=False):
+    """Keep ``concurrency`` clients requesting ``url`` for ``duration`` seconds."""
+    separator = '&' if '?' in url else '?'
+    counter = itertools.count()
+    samples = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            target = f'{url}{separator}_={next(counter)}' if bust_cache else url
+            status, elapsed = fetch(target, headers)
+            with lock:
+                if status == 200:
+                    samples.append(elapsed)
+                else:
+                    errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client)
+    wall = time.perf_counter() - started
+
+    samples.sort()
+    return {
+        'url': url,
+        'requests': len(samples),
+        'errors': errors,
+        'rps': round(len(samples) / wall, 1),
+        'p50_ms': round(percentile(samples, 50) * 1000, 2) if samples else None,
+        'p95_ms': round(percentile(samples, 95) * 1000, 2) if samples else None,
+        'p99_ms': round(percentile(samples, 99) * 1000, 2) if samples else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Throughput and tail latency of a running server')
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--path', action='append', dest='paths',
+                        help='Path to load (repeatable); defaults to the all-news pages')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds per path')
+    parser.add_argument('--bust-cache', action='store_true',
+                        help='Defeat the response cache with a unique query arg per request')
+    parser.add_argument('--cookie', help='Session cookie, for loading admin pages')
+    parser.add_argument('--label', default='run', help='Name of this run, e.g. sync or async')
+    parser.add_argument('--json', help='Also write the results to this file')
+    args = parser.parse_args()
+
+    headers = {'Cookie': args.cookie} if args.cookie else {}
+    results = []
+    print(f"{args.label}: {args.concurrency} concurrent clients, {args.duration:g}s per path\n")
+    for path in args.paths or DEFAULT_PATHS:
+        result = run(args.base_url.rstrip('/') + path, args.concurrency, args.duration, headers, args.bust_cache)
+        results.append(result)
+        print(f"{path:<40} {result['rps']:8.1f} req/s  p50: {result['p50_ms']} ms  "
+              f"p95: {result['p95_ms']} ms  p99: {result['p99_ms']} ms  errors: {result['errors']}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'label': args.label, 'concurrency': args.concurrency,
+                       'duration': args.duration, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,275 @@
+# benchmarks/runner.py
+# Replays the traffic model and reports throughput and latency percentiles per route.
+#
+# Against a server (gunicorn, flask run) whose MONGO_URI points at the corpus:
+#   python -m benchmarks.corpus --uri mongodb://localhost:27017/news_bench --articles 100000
+#   python -m benchmarks.runner --uri mongodb://localhost:27017/news_bench \
+#       --base-url http://127.0.0.1:8000 --json results/$(git rev-parse --short HEAD).json
+# In-process through the Flask test client (no server; --generate builds the corpus first,
+# and without --uri everything runs on mongomock):
+#   python -m benchmarks.runner --generate 5000 --requests 2000
+# Compare against an earlier run with --baseline old.json.
+#
+# Every replay client logs in, and the mix includes login POSTs from one
+# address, so a server under test needs the login throttle raised (see
+# benchmarks.common.UNTHROTTLED_LOGIN; the in-process target applies it).
+# Rate-limited responses, and admin pages that redirect to the login page,
+# count as errors rather than as completed requests.
+import argparse
+import http.cookiejar
+import json
+import platform
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from benchmarks.common import UNTHROTTLED_LOGIN, percentile
+from benchmarks.corpus import generate_corpus
+from benchmarks.traffic import TrafficModel, load_requests, save_requests
+
+
+def connect(uri=None, name='news_bench'):
+    """The benchmark database, without dropping it (unlike common.get_database)."""
+    if uri:
+        from pymongo import MongoClient
+        return MongoClient(uri)[name]
+    import mongomock
+    return mongomock.MongoClient()[name]
+
+
+class HttpTarget:
+    """Sends requests to a running server; each client thread keeps its own cookies."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def client(self):
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+                                             _NoRedirect)
+
+        def send(method, path, data=None):
+            body = urllib.parse.urlencode(data).encode() if data else None
+            request = urllib.request.Request(self.base_url + path, data=body, method=method)
+            try:
+                with opener.open(request, timeout=30) as response:
+                    response.read()
+                    return response.status
+            except urllib.error.HTTPError as error:
+                return error.code
+            except (urllib.error.URLError, OSError):
+                return None
+        return send
+
+    def close(self):
+        pass
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # A redirect is a complete response for timing purposes (e.g. the login POST)
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class AppTarget:
+    """Drives the app in this process through the Flask test client, on the given database."""
+
+    def __init__(self, db, response_cache=True):
+        from app import create_app
+        from services import get_services
+        self.app = create_app(UNTHROTTLED_LOGIN)
+        self.services = get_services(self.app)
+        self.services.mongo.db = db
+        self.services.mongo.cx = db.client
+        self.services.response_cache.enabled = response_cache
+
+    def client(self):
+        test_client = self.app.test_client()
+
+        def send(method, path, data=None):
+            return test_client.open(path, method=method, data=data).status_code
+        return send
+
+    def close(self):
+        view_counter = self.services.built('view_counter')
+        if view_counter is not None:
+            view_counter.stop()
+
+
+def failed(route, status):
+    """Whether a response does not count as a completed request."""
+    if status is None or status >= 400:
+        return True
+    # A logged-out admin page redirects to the login page; only the login POST itself redirects on success
+    return route.startswith('admin_') and route != 'admin_login' and 300 <= status < 400
+
+
+def replay(target, requests, concurrency, login=None):
+    """Send ``requests`` from ``concurrency`` clients. Returns (samples by route, errors by route, wall seconds)."""
+    samples = {}
+    errors = {}
+    lock = threading.Lock()
+    position = iter(range(len(requests)))
+
+    def worker():
+        send = target.client()
+        if login:
+            send('POST', '/admin/login', {'username': login[0], 'password': login[1]})
+        while True:
+            with lock:
+                index = next(position, None)
+            if index is None:
+                return
+            item = requests[index]
+            start = time.perf_counter()
+            status = send(item['method'], item['path'], item.get('data'))
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                if failed(item['route'], status):
+                    errors[item['route']] = errors.get(item['route'], 0) + 1
+                else:
+                    samples.setdefault(item['route'], []).append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return samples, errors, time.perf_counter() - started
+
+
+def summarize_routes(samples, errors, wall):
+    routes = {}
+    for route in sorted(set(samples) | set(errors)):
+        latencies = samples.get(route, [])
+        routes[route] = {
+            'requests': len(latencies),
+            'errors': errors.get(route, 0),
+            'rps': round(len(latencies) / wall, 2),
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'mean_ms': round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        }
+    everything = [latency for latencies in samples.values() for latency in latencies]
+    overall = {
+        'requests': len(everything),
+        'errors': sum(errors.values()),
+        'rps': round(len(everything) / wall, 2),
+        'p50_ms': round(percentile(everything, 50), 3),
+        'p95_ms': round(percentile(everything, 95), 3),
+        'p99_ms': round(percentile(everything, 99), 3),
+    }
+    return routes, overall
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(routes, overall, baseline=None):
+    def change(route, key):
+        if not baseline:
+            return ''
+        old = (baseline['overall'] if route is None else baseline['routes'].get(route, {})).get(key)
+        new = (overall if route is None else routes[route])[key]
+        if not old:
+            return ' ' * 8
+        return f' ({(new - old) / old * 100:+5.1f}%)'
+
+    print(f"{'route':<20}{'req':>7}{'err':>5}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for route, result in routes.items():
+        print(f"{route:<20}{result['requests']:>7}{result['errors']:>5}{result['rps']:>10.1f}"
+              f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+              f"{change(route, 'p50_ms')}{change(route, 'p99_ms')}")
+    print(f"{'all':<20}{overall['requests']:>7}{overall['errors']:>5}{overall['rps']:>10.1f}"
+          f"{overall['p50_ms']:>10.2f}{overall['p95_ms']:>10.2f}{overall['p99_ms']:>10.2f}"
+          f"{change(None, 'p50_ms')}{change(None, 'p99_ms')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay the traffic model and report per-route latency')
+    parser.add_argument('--uri', default=None, help='MongoDB URI of the corpus; uses mongomock when omitted')
+    parser.add_argument('--db', default='news_bench', help='Database name of the corpus')
+    parser.add_argument('--generate', type=int, metavar='N', help='(Re)generate a corpus of N articles first')
+    parser.add_argument('--base-url', help='Benchmark a running server instead of the app in-process')
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--warmup', type=int, default=200, help='Requests sent before measuring')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--no-response-cache', action='store_true',
+                        help='In-process only: disable the response cache to measure the database path')
+    parser.add_argument('--admin', default='admin:admin123', help='username:password for the admin routes')
+    parser.add_argument('--save-traffic', help='Write the generated requests to this JSON lines file')
+    parser.add_argument('--replay', help='Replay requests from a JSON lines file instead of generating them')
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--baseline', help='Results file of an earlier run to compare against')
+    args = parser.parse_args()
+
+    if not args.uri and not args.generate:
+        parser.error('without --uri the mongomock database starts empty: pass --generate N')
+    if args.base_url and not args.uri:
+        parser.error('--base-url needs --uri: the server cannot see an in-process mongomock corpus')
+
+    if not args.uri and args.concurrency > 1:
+        print("mongomock is not thread-safe: running with a single client")
+        args.concurrency = 1
+
+    db = connect(args.uri, args.db)
+    if args.generate:
+        start = time.perf_counter()
+        generate_corpus(db, args.generate)
+        print(f"Generated {args.generate} articles in {time.perf_counter() - start:.1f}s")
+
+    login = tuple(args.admin.split(':', 1))
+    if args.replay:
+        requests = load_requests(args.replay)
+    else:
+        requests = TrafficModel.from_database(db, seed=args.seed, admin_credentials=login).requests(
+            args.warmup + args.requests)
+    if args.save_traffic:
+        save_requests(requests, args.save_traffic)
+
+    target = HttpTarget(args.base_url) if args.base_url else AppTarget(db, not args.no_response_cache)
+    try:
+        replay(target, requests[:args.warmup], args.concurrency, login)
+        samples, errors, wall = replay(target, requests[args.warmup:], args.concurrency, login)
+    finally:
+        target.close()
+
+    routes, overall = summarize_routes(samples, errors, wall)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    mode = args.base_url or 'in-process'
+    print(f"{overall['requests']} requests, {args.concurrency} clients, {mode}, {wall:.1f}s\n")
+    print_report(routes, overall, baseline)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'commit': git_commit(),
+                'date': datetime.utcnow().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'target': mode,
+                'articles': db.news.estimated_document_count(),
+                'requests': args.requests,
+                'concurrency': args.concurrency,
+                'seed': args.seed,
+                'response_cache': bool(args.base_url) or not args.no_response_cache,
+                'routes': routes,
+                'overall': overall,
+            }, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+# benchmarks/traffic.py
+# Replayable traffic model: a seeded mix of reader and admin requests drawn from the corpus.
+# A request is a dict {'route', 'method', 'path', 'data'}; a run can be saved as
+# JSON lines and replayed exactly (benchmarks.runner --save-traffic / --replay).
+import itertools
+import json
+import random
+from urllib.parse import urlencode
+
+from pagination import SORT_KEYS, encode_cursor
+from search import tokenize
+
+# Share of requests per route. Readers dominate; detail pages follow article popularity.
+ROUTE_WEIGHTS = {
+    'homepage': 0.28,
+    'all_news': 0.14,
+    'all_news_category': 0.08,
+    'news_detail': 0.34,
+    'search': 0.10,
+    'contact': 0.02,
+    'admin_dashboard': 0.015,
+    'admin_news_list': 0.015,
+    'admin_login': 0.01,
+}
+# Chance that a list request is a deeper page rather than the first one
+DEEP_PAGE_SHARE = 0.3
+
+
+class TrafficModel:
+    """Draws requests for a corpus: articles by Zipf rank over the newest ``population``.
+
+    News traffic concentrates on recent stories, so detail and deep-page
+    requests sample the newest articles with weight 1/rank. Search queries
+    are one or two words from real titles, sometimes cut short as if still
+    being typed.
+    """
+
+    def __init__(self, articles, categories, search_terms, seed=1, admin_credentials=('admin', 'admin123')):
+        self.articles = articles
+        self.categories = categories
+        self.search_terms = search_terms
+        self.admin_credentials = admin_credentials
+        self._rng = random.Random(seed)
+        self._article_cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(articles) + 1)))
+
+    @classmethod
+    def from_database(cls, db, population=5000, seed=1, **kwargs):
+        articles = list(db.news.find({}, {'date_created': 1, 'category': 1, 'title': 1})
+                        .sort(SORT_KEYS).limit(population))
+        if not articles:
+            raise ValueError('the news collection is empty; generate a corpus first')
+        categories = sorted({article['category'] for article in articles})
+        terms = sorted({term for article in articles for term in tokenize(article['title'])
+                        if not term.isdigit() and len(term) > 2})
+        return cls(articles, categories, terms, seed=seed, **kwargs)
+
+    def requests(self, count):
+        routes = list(ROUTE_WEIGHTS)
+        weights = list(ROUTE_WEIGHTS.values())
+        return [self._request(self._rng.choices(routes, weights=weights)[0]) for _ in range(count)]
+
+    def _request(self, route):
+        rng = self._rng
+        if route == 'homepage':
+            return _get(route, '/')
+        if route in ('all_news', 'all_news_category'):
+            args = {'category': rng.choice(self.categories)} if route == 'all_news_category' else {}
+            if rng.random() < DEEP_PAGE_SHARE:
+                args['after'] = encode_cursor(self._article())
+            return _get(route, '/all-news', args)
+        if route == 'news_detail':
+            return _get(route, f"/news/{self._article()['_id']}")
+        if route == 'search':
+            words = rng.sample(self.search_terms, k=min(len(self.search_terms), rng.choice((1, 1, 2))))
+            query = ' '.join(words)
+            if rng.random() < 0.3:
+                query = query[:max(3, len(query) - rng.randint(1, 3))]
+            return _get(route, '/api/search', {'q': query})
+        if route == 'contact':
+            return _get(route, '/contact')
+        if route == 'admin_dashboard':
+            return _get(route, '/admin/dashboard')
+        if route == 'admin_news_list':
+            return _get(route, '/admin/news')
+        if route == 'admin_login':
+            username, password = self.admin_credentials
+            return {'route': route, 'method': 'POST', 'path': '/admin/login',
+                    'data': {'username': username, 'password': password}}
+        raise ValueError(f'unknown route {route}')
+
+    def _article(self):
+        return self._rng.choices(self.articles, cum_weights=self._article_cum_weights)[0]
+
+
+def _get(route, path, args=None):
+    return {'route': route, 'method': 'GET', 'path': f'{path}?{urlencode(args)}' if args else path, 'data': None}
+
+
+def save_requests(requests, path):
+    with open(path, 'w') as f:
+        for item in requests:
+            f.write(json.dumps(item) + '\n')
+
+
+def load_requests(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
@@ -0,0 +1,156 @@
+# categories.py
+# Category registry: the categories collection with per-category article counts and
+# latest-article timestamps, kept current by the admin write routes and read from memory
+#
+# Documents:
+#   {_id: <name>, position, count, latest}
+import logging
+import threading
+import time
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Registered by 'flask init-db'; categories that first appear through an import are added after them
+DEFAULT_CATEGORIES = ['Technology', 'Sports', 'Political', 'Programming']
+UNLISTED_POSITION = 1000
+
+
+def _count_update(category, count, latest=None):
+    update = {'$inc': {'count': count}, '$setOnInsert': {'position': UNLISTED_POSITION}}
+    if latest is not None:
+        update['$max'] = {'latest': latest}
+    return UpdateOne({'_id': category}, update, upsert=True)
+
+
+def ensure_categories(db, names=DEFAULT_CATEGORIES):
+    """Register ``names`` in this order, ahead of any other category."""
+    db.categories.bulk_write([
+        UpdateOne({'_id': name},
+                  {'$min': {'position': position}, '$setOnInsert': {'count': 0, 'latest': None}},
+                  upsert=True)
+        for position, name in enumerate(names)
+    ], ordered=False)
+
+
+def rebuild_categories(db):
+    """Recompute every category's count and latest timestamp from the news collection."""
+    groups = list(db.news.aggregate([
+        {'$group': {'_id': '$category', 'count': {'$sum': 1}, 'latest': {'$max': '$date_created'}}}
+    ]))
+    # Registered categories without articles stay registered, with a zero count
+    db.categories.update_many({}, {'$set': {'count': 0, 'latest': None}})
+    if groups:
+        db.categories.bulk_write([
+            UpdateOne({'_id': group['_id']},
+                      {'$set': {'count': group['count'], 'latest': group['latest']},
+                       '$setOnInsert': {'position': UNLISTED_POSITION}},
+                      upsert=True)
+            for group in groups
+        ], ordered=False)
+    return len(groups)
+
+
+class CategoryRegistry:
+    """The categories collection, cached in memory for ``ttl`` seconds.
+
+    Listing pages read the filter dropdown, homepage sections and pagination
+    totals from here instead of running ``distinct`` or ``count_documents``,
+    and the dashboard reads its article counts from here. The collection is
+    built by 'flask init-db' and 'flask rebuild-stats', never on a request.
+    The admin write routes update the collection through ``article_added``,
+    ``article_updated`` and ``article_removed``, which also drop this
+    worker's copy; other workers pick the change up within ``ttl``.
+    """
+
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._categories = None
+        self._expires_at = 0
+        self._generation = 0
+        self._get_db = None
+        self._lock = threading.Lock()
+
+    def init_db(self, get_db):
+        self._get_db = get_db
+
+    # Reading
+
+    def _load(self):
+        categories = self._categories
+        if categories is not None and time.monotonic() < self._expires_at:
+            return categories
+        with self._lock:
+            generation = self._generation
+        db = self._get_db()
+        categories = list(db.categories.find().sort([('position', 1), ('_id', 1)]))
+        if not categories:
+            logger.warning("The categories collection is empty; run 'flask rebuild-stats' to build it")
+        with self._lock:
+            # Don't keep a result that raced with an invalidation
+            if generation == self._generation:
+                self._categories = categories
+                self._expires_at = time.monotonic() + self.ttl
+        return categories
+
+    def names(self):
+        """Every registered category, in display order (admin forms, homepage sections)."""
+        return [category['_id'] for category in self._load() if category['_id']]
+
+    def listed(self):
+        """Categories that have articles (the listing page's filter)."""
+        return [category['_id'] for category in self._load() if category['_id'] and category['count'] > 0]
+
+    def counts(self):
+        return {category['_id']: category['count'] for category in self._load()}
+
+    def count(self, category=None):
+        """Articles in ``category``, or in all of them."""
+        if category is None:
+            return sum(category['count'] for category in self._load())
+        return self.counts().get(category, 0)
+
+    def latest(self, category=None):
+        """Creation time of the newest article in ``category`` (or overall), None if there is none."""
+        dates = [doc['latest'] for doc in self._load()
+                 if doc.get('latest') and (category is None or doc['_id'] == category)]
+        return max(dates, default=None)
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._categories = None
+            self._expires_at = 0
+
+    # Write paths
+
+    def article_added(self, news):
+        self._get_db().categories.bulk_write([_count_update(news.get('category'), 1, news.get('date_created'))])
+        self.invalidate()
+
+    def article_updated(self, old, new):
+        if new.get('category') == old.get('category'):
+            return
+        db = self._get_db()
+        db.categories.bulk_write([
+            _count_update(old.get('category'), -1),
+            _count_update(new.get('category'), 1, new.get('date_created'))
+        ], ordered=False)
+        self._refresh_latest(db, old)
+        self.invalidate()
+
+    def article_removed(self, news):
+        db = self._get_db()
+        db.categories.bulk_write([_count_update(news.get('category'), -1)])
+        self._refresh_latest(db, news)
+        self.invalidate()
+
+    @staticmethod
+    def _refresh_latest(db, news):
+        """After ``news`` left its category, find that category's newest article if it was this one."""
+        category = news.get('category')
+        if db.categories.find_one({'_id': category, 'latest': {'$gt': news.get('date_created')}}, {'_id': 1}):
+            return
+        newest = db.news.find_one({'category': category}, {'date_created': 1}, sort=[('date_created', -1)])
+        db.categories.update_one({'_id': category}, {'$set': {'latest': newest['date_created'] if newest else None}})
@@ -0,0 +1,184 @@
+# commands.py
+# 'flask' CLI commands: one-time setup, maintenance and data transfer
+from contextlib import closing
+
+import click
+from flask import Blueprint, current_app
+
+from articles import migrate_summaries
+from assets import build_assets, prune_assets
+from categories import rebuild_categories
+from images import variant_files
+from indexes import check_query_plans, ensure_indexes
+from services import (category_registry, feeds, homepage_cache, image_pipeline, mongo, related_index,
+                      response_cache, static_assets, upload_store)
+from stats import rebuild_stats
+from storage import is_content_key
+
+# Registered without a group, so the commands are 'flask <name>'
+commands = Blueprint('commands', __name__, cli_group=None)
+
+
+@commands.cli.command('init-db')
+def init_db_command():
+    """Create indexes, the default admin and sample news (once per database)."""
+    from init_db import init_database
+    init_database()
+
+
+@commands.cli.command('ensure-indexes')
+def ensure_indexes_command():
+    """Create the indexes declared in indexes.py."""
+    for collection, names in ensure_indexes(mongo.db).items():
+        print(f"{collection}: {', '.join(names)}")
+
+
+@commands.cli.command('check-indexes')
+def check_indexes_command():
+    """Explain every route query and fail on collection scans, in-memory sorts or a homepage that reads more than it shows."""
+    problems = check_query_plans(mongo.db)
+    for name, stages in problems:
+        print(f"FAIL {name}: {' -> '.join(stages)}")
+    if problems:
+        raise SystemExit(1)
+    print("All route queries are index-backed")
+
+
+@commands.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Recompute the news_stats totals, category rollups and category registry from scratch."""
+    categories = rebuild_stats(mongo.db)
+    rebuild_categories(mongo.db)
+    category_registry.invalidate()
+    print(f"Rebuilt news_stats and the category registry for {categories} categories")
+
+
+@commands.cli.command('backfill-images')
+def backfill_images_command():
+    """Generate resized variants for uploads that do not have them yet."""
+    pending = mongo.db.news.find({'image': {'$nin': [None, '']},
+                                  'image_variants': {'$in': [None, []]}},
+                                 {'image': 1})
+    processed = 0
+    for news in pending:
+        if not upload_store.backend.exists(news['image']):
+            print(f"Missing file for {news['_id']}: {news['image']}")
+            continue
+        variants = image_pipeline.process(mongo.db.news, news['_id'], news['image'])
+        processed += 1
+        print(f"{news['image']}: {len(variants)} variants")
+    homepage_cache.invalidate()
+    response_cache.clear()
+    print(f"Backfilled {processed} images")
+
+
+@commands.cli.command('migrate-excerpts')
+@click.option('--recompute', is_flag=True, help='Recompute summaries for every article.')
+@click.option('--batch-size', default=500, show_default=True)
+def migrate_excerpts_command(recompute, batch_size):
+    """Store excerpt, word count and reading time on existing articles."""
+    updated = migrate_summaries(mongo.db.news, batch_size=batch_size, recompute=recompute)
+    homepage_cache.invalidate()
+    response_cache.clear()
+    feeds.clear()
+    print(f"Stored summaries on {updated} articles")
+
+
+@commands.cli.command('rebuild-related')
+def rebuild_related_command():
+    """Refit the related-articles vectors and store every article's neighbors."""
+    count = related_index.rebuild(mongo.db.news)
+    response_cache.clear()
+    print(f"Stored related articles for {count} articles")
+
+
+@commands.cli.command('export-news')
+@click.argument('path')
+@click.option('--images', 'images_path', help='Also pack the uploaded images into this tar (.tar.gz to compress).')
+@click.option('--category', help='Only export this category.')
+@click.option('--batch-size', default=1000, show_default=True)
+def export_news_command(path, images_path, category, batch_size):
+    """Stream the news collection to an NDJSON file (.gz to compress)."""
+    # Imported here: only these two commands need the tar and NDJSON machinery
+    from transfer import export_articles
+    progress = export_articles(mongo.db.news, path,
+                               query={'category': category} if category else None,
+                               batch_size=batch_size,
+                               store=upload_store,
+                               images_path=images_path,
+                               report=lambda progress: print(f"... {progress}"))
+    print(f"Exported {progress}")
+
+
+@commands.cli.command('import-news')
+@click.argument('path')
+@click.option('--images', 'images_path', help='Tar of uploaded images written by export-news.')
+@click.option('--batch-size', default=1000, show_default=True)
+@click.option('--start-line', default=1, show_default=True,
+              help='Resume an interrupted import after the last line it reported.')
+def import_news_command(path, images_path, batch_size, start_line):
+    """Upsert articles from an NDJSON file; safe to re-run."""
+    from transfer import import_articles, import_images
+    ensure_indexes(mongo.db)
+    if images_path:
+        extracted, skipped = import_images(images_path, upload_store)
+        print(f"Images: {extracted} extracted, {skipped} already present")
+    progress = import_articles(mongo.db.news, path, batch_size=batch_size, start_line=start_line,
+                               report=lambda progress: print(f"... {progress}"),
+                               on_error=lambda line, error: print(f"Skipped line {line}: {error}"))
+    print(f"Imported {progress}")
+
+    # Derived data that is not part of the export
+    rebuild_stats(mongo.db)
+    rebuild_categories(mongo.db)
+    upload_store.rebuild_refs(mongo.db.news)
+    category_registry.invalidate()
+    homepage_cache.invalidate()
+    response_cache.clear()
+    feeds.clear()
+    print("Rebuilt news_stats and the category registry. Run 'flask rebuild-related' to refresh related articles, "
+          "and restart the web workers so their search indexes load the imported articles.")
+
+
+@commands.cli.command('sweep-uploads')
+def sweep_uploads_command():
+    """Delete uploads no article references (finishes deletes interrupted by a restart)."""
+    print(f"Removed {upload_store.sweep(mongo.db.news)} unreferenced uploads")
+
+
+@commands.cli.command('migrate-uploads')
+def migrate_uploads_command():
+    """Move uploads from before content addressing into the sharded, deduplicated store."""
+    migrated = 0
+    for news in mongo.db.news.find({'image': {'$nin': [None, '']}}, {'image': 1, 'image_variants': 1}):
+        if is_content_key(news['image']) or not upload_store.backend.exists(news['image']):
+            continue
+        with closing(upload_store.backend.open(news['image'])) as source:
+            key = upload_store.add(source, news['image'])
+        mongo.db.news.update_one({'_id': news['_id']}, {'$set': {'image': key, 'image_variants': []}})
+        upload_store.release(news['image'], legacy_files=variant_files(news))
+        image_pipeline.process(mongo.db.news, news['_id'], key)
+        migrated += 1
+    upload_store.shutdown()
+    homepage_cache.invalidate()
+    response_cache.clear()
+    print(f"Migrated {migrated} uploads")
+
+
+@commands.cli.command('clear-feeds')
+def clear_feeds_command():
+    """Mark the cached sitemap and feeds stale (e.g. after changing SITE_URL)."""
+    feeds.clear()
+    print("Sitemap and feeds will be rebuilt on their next request")
+
+
+@commands.cli.command('build-assets')
+@click.option('--prune', is_flag=True, help='Delete files from earlier builds.')
+def build_assets_command(prune):
+    """Fingerprint and precompress static assets and write the manifest."""
+    manifest = build_assets(current_app.static_folder)
+    static_assets.load()
+    for original, hashed in sorted(manifest.items()):
+        print(f"{original} -> {hashed}")
+    if prune:
+        print(f"Removed {prune_assets(current_app.static_folder, manifest)} files from earlier builds")
@@ -7,6 +7,153 @@ SECRET_KEY = 'your-secret-key-change-this-in-production-2024'
 # MongoDB configuration
 MONGO_URI = 'mongodb://localhost:27017/news_portal'
 
+# Connection pool, shared by the sync (PyMongo) and async (Motor) clients.
+# Size maxPoolSize to roughly the concurrent requests per worker (threads, or
+# in-flight async queries); waitQueueTimeoutMS fails fast instead of piling
+# requests up behind an exhausted pool.
+MONGO_CLIENT_OPTIONS = {
+    'maxPoolSize': 50,
+    'minPoolSize': 5,
+    'maxIdleTimeMS': 60000,
+    'waitQueueTimeoutMS': 2000,
+    'connectTimeoutMS': 5000,
+    'serverSelectionTimeoutMS': 5000,
+    'retryReads': True,
+    'retryWrites': True,
+}
+
 # Upload configuration
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'uploads')
-MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
\ No newline at end of file
+MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+
+# Upload storage: None keeps uploads in UPLOAD_FOLDER (sharded by content
+# hash); 's3://bucket/prefix' stores them in S3 or an S3-compatible service
+# (needs boto3). S3_ENDPOINT_URL points at a non-AWS service such as a local
+# MinIO (http://localhost:9000); UPLOAD_PUBLIC_URL is the base browsers load
+# objects from (a CDN or the bucket's public URL).
+UPLOAD_STORAGE_URL = None
+S3_ENDPOINT_URL = None
+UPLOAD_PUBLIC_URL = None
+
+# Browser cache lifetime (seconds) of uploads stored before content addressing.
+# Content-addressed uploads and built assets (static/dist) never change under
+# their name and are always cached for a year as immutable.
+UPLOAD_CACHE_MAX_AGE = 30 * 86400
+
+# Homepage cache: seconds before the homepage sections are re-read from MongoDB
+HOMEPAGE_CACHE_TTL = 30
+
+# View counting: buffered views are flushed every VIEW_FLUSH_INTERVAL seconds
+# or once VIEW_FLUSH_THRESHOLD views are pending. Set VIEW_BUFFER_URL to a
+# Redis URL (e.g. 'redis://localhost:6379/0') to share the buffer between
+# gunicorn workers; requires the redis package.
+VIEW_BUFFER_URL = None
+VIEW_FLUSH_INTERVAL = 5
+VIEW_FLUSH_THRESHOLD = 1000
+
+# Pagination: use the collection's estimated count for unfiltered listings
+# instead of an exact count_documents (the admin inbox; article listings take
+# their totals from the category registry)
+PAGINATION_ESTIMATED_COUNT = True
+ADMIN_NEWS_PER_PAGE = 20
+ADMIN_MESSAGES_PER_PAGE = 25
+
+# Category registry: the categories collection (names, article counts, newest
+# article dates) is cached per worker for CATEGORY_CACHE_TTL seconds; admin
+# writes refresh the copy of the worker that made them straight away
+CATEGORY_CACHE_TTL = 30
+
+# Contact form. Messages are queued (at most CONTACT_QUEUE_SIZE per worker) and
+# written by a background thread in batches of up to CONTACT_BATCH_SIZE, at
+# least every CONTACT_FLUSH_INTERVAL seconds. When the queue is full a POST
+# waits CONTACT_QUEUE_TIMEOUT seconds for room, then gets a 503. Each client IP
+# may send CONTACT_RATE_BURST messages at once, then CONTACT_RATE_PER_HOUR an
+# hour; a message identical to one sent within CONTACT_DUPLICATE_WINDOW seconds
+# is dropped. Behind a reverse proxy, wrap app.wsgi_app in werkzeug's ProxyFix
+# so limits apply to the client's address rather than the proxy's.
+CONTACT_QUEUE_SIZE = 1000
+CONTACT_BATCH_SIZE = 100
+CONTACT_FLUSH_INTERVAL = 1.0
+CONTACT_QUEUE_TIMEOUT = 0.5
+CONTACT_RATE_BURST = 3
+CONTACT_RATE_PER_HOUR = 10
+CONTACT_DUPLICATE_WINDOW = 3600
+
+# Admin sessions are kept server-side; the cookie holds only a random id.
+# SESSION_STORE_URL None stores them as files in SESSION_DIR, shared by the
+# workers of one host; 'memory://' keeps them in the worker's memory (a single
+# worker only) and a Redis URL shares them between hosts. A session expires
+# after SESSION_TTL seconds without a request.
+SESSION_STORE_URL = None
+SESSION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'sessions')
+SESSION_TTL = 8 * 3600
+SESSION_COOKIE_HTTPONLY = True
+SESSION_COOKIE_SAMESITE = 'Lax'
+
+# Login throttling, checked before the password hash. Each client IP may try
+# LOGIN_IP_BURST logins at once, then LOGIN_IP_PER_HOUR an hour; each username
+# may fail LOGIN_USER_BURST times, then LOGIN_USER_PER_HOUR an hour, from one
+# network (/24 for IPv4, /64 for IPv6), so guessing from elsewhere cannot lock
+# the real admin out. Limits are per worker, like the contact form's. "No
+# admin account yet" is re-checked in the database at most every
+# ADMIN_EXISTS_TTL seconds.
+LOGIN_IP_BURST = 10
+LOGIN_IP_PER_HOUR = 30
+LOGIN_USER_BURST = 5
+LOGIN_USER_PER_HOUR = 12
+ADMIN_EXISTS_TTL = 10
+
+# Search: number of recent queries whose results are cached, and how often
+# (seconds) each worker picks up articles written by other workers
+SEARCH_CACHE_SIZE = 256
+SEARCH_REFRESH_INTERVAL = 60
+
+# Related articles: neighbors stored per article, and the vocabulary size of
+# the TF-IDF vectors (memory is articles x features x 4 bytes per worker)
+RELATED_COUNT = 3
+RELATED_MAX_FEATURES = 4096
+
+# Trending: views count with a half-life of TRENDING_HALF_LIFE seconds. Each
+# worker keeps the top TRENDING_SIZE articles in memory and merges its counts
+# with the other workers' every TRENDING_SYNC_INTERVAL seconds.
+TRENDING_HALF_LIFE = 6 * 3600
+TRENDING_SIZE = 10
+TRENDING_SYNC_INTERVAL = 60
+
+# Image pipeline: threads generating resized JPEG/WebP variants of uploads
+IMAGE_WORKERS = 2
+
+# Response cache for rendered frontend pages. Set RESPONSE_CACHE_URL to a
+# Redis URL to share it (and its invalidations) between workers.
+RESPONSE_CACHE_URL = None
+RESPONSE_CACHE_TTL = 60
+RESPONSE_CACHE_MAX_ENTRIES = 1000
+RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Sitemap and RSS/Atom feeds. The generated files are cached in FEED_CACHE_DIR
+# (shared by the workers of a host) and rebuilt per sitemap shard or feed after
+# admin writes. SITE_URL is the base of their absolute links, e.g.
+# 'https://news.example.com'. The cached files are shared by every client, so
+# they are never built from a request's Host header: when SITE_URL is None the
+# base comes from SERVER_NAME, and with neither set the sitemap and feeds are
+# disabled (404, with an error in the log). FEED_MAX_AGE is how long (seconds)
+# clients and proxies may reuse a response before revalidating its ETag.
+SITE_URL = None
+SITE_NAME = 'Purna Teach'
+FEED_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'feeds')
+FEED_SIZE = 20
+FEED_MAX_AGE = 300
+
+# Async serving mode: serve the admin dashboard as an async view on Motor (needs
+# the motor and asgiref packages). Other routes have no independent queries to
+# overlap (a single query, or one that needs the result of another), so they stay sync
+ASYNC_MODE = False
+
+# Instrumentation: fraction of requests profiled in detail (Mongo commands,
+# template time, Server-Timing header), the wall time above which a request is
+# kept in the admin slow-request log, and how many of those are kept. Set
+# METRICS_TOKEN to let Prometheus scrape /admin/metrics with a bearer token.
+PROFILE_SAMPLE_RATE = 0.1
+SLOW_REQUEST_MS = 500
+SLOW_REQUEST_LOG_SIZE = 100
+METRICS_TOKEN = None
@@ -0,0 +1,238 @@
+# contacts.py
+# Contact form ingestion: validation, per-IP token buckets, duplicate filtering and a batched write queue
+import atexit
+import hashlib
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+# Longest accepted value per form field
+FIELD_LIMITS = {'name': 100, 'email': 254, 'subject': 200, 'message': 5000}
+_EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def validate_contact(form):
+    """Return ``(message, None)`` for a valid form, or ``(None, error)``."""
+    message = {field: (form.get(field) or '').strip() for field in FIELD_LIMITS}
+    missing = [field for field, value in message.items() if not value]
+    if missing:
+        return None, f"Please fill in: {', '.join(missing)}"
+    for field, limit in FIELD_LIMITS.items():
+        if len(message[field]) > limit:
+            return None, f"The {field} is too long (at most {limit} characters)"
+    if not _EMAIL_RE.match(message['email']):
+        return None, 'Please enter a valid email address'
+    return message, None
+
+
+class RateLimiter:
+    """Per-key token buckets: ``burst`` requests at once, refilled at ``rate`` per second.
+
+    Buckets live in this process (each gunicorn worker limits on its own) in
+    an LRU of at most ``max_keys`` entries; a key that falls out of it simply
+    starts again with a full bucket.
+    """
+
+    def __init__(self, rate, burst, max_keys=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def allow(self, key, now=None):
+        """Take a token for ``key``. Returns 0 if allowed, else seconds until the next token."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def reset(self, key):
+        """Give ``key`` a full bucket again."""
+        with self._lock:
+            self._buckets.pop(key, None)
+
+
+class DuplicateFilter:
+    """Remembers message fingerprints for ``window`` seconds (at most ``max_entries``)."""
+
+    def __init__(self, window=3600, max_entries=10000):
+        self.window = window
+        self.max_entries = max_entries
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(message):
+        # Case and whitespace changes do not make a message new
+        text = '\x00'.join(_WHITESPACE_RE.sub(' ', message[field]).lower()
+                           for field in ('email', 'subject', 'message'))
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def check(self, message, now=None):
+        """True if ``message`` was already seen within the window; otherwise remember it."""
+        now = time.monotonic() if now is None else now
+        key = self.fingerprint(message)
+        with self._lock:
+            # Entries are in insertion order, so expired ones are at the front
+            while self._seen and next(iter(self._seen.values())) <= now - self.window:
+                self._seen.popitem(last=False)
+            if key in self._seen:
+                return True
+            self._seen[key] = now
+            if len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+            return False
+
+    def forget(self, message):
+        """Drop ``message``'s fingerprint, for a message that was checked but not stored."""
+        with self._lock:
+            self._seen.pop(self.fingerprint(message), None)
+
+
+class ContactQueue:
+    """Bounded in-process queue of contact messages, written with ``insert_many``.
+
+    ``submit()`` only enqueues; a background thread takes up to
+    ``batch_size`` messages at a time, waiting at most ``flush_interval``
+    seconds to fill a batch, and inserts them in one round trip. A failed
+    batch is retried with backoff while new messages keep queueing, so
+    when MongoDB is slow or down the queue fills and ``submit()`` pushes
+    back: it waits up to ``put_timeout`` seconds for room, then raises
+    ``queue.Full``. Messages still queued are written when the process exits.
+    """
+
+    def __init__(self, maxsize=1000, batch_size=100, flush_interval=1.0, put_timeout=0.5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._get_collection = None
+        self._counts = {'accepted': 0, 'written': 0, 'rejected': 0, 'failed_batches': 0}
+        self._counts_lock = threading.Lock()
+        # Batch taken off the queue but not written yet (writer thread only, until stop())
+        self._pending = []
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._atexit_registered = False
+
+    def init_collection(self, get_collection):
+        """Register a callable returning the ``contacts`` collection."""
+        self._get_collection = get_collection
+        # Once per queue: the registration is inherited by forked workers, each flushing its own queue
+        if not self._atexit_registered:
+            atexit.register(self.stop)
+            self._atexit_registered = True
+
+    def submit(self, message):
+        """Queue ``message`` for writing; raises ``queue.Full`` if there is no room in time."""
+        self._ensure_thread()
+        try:
+            self._queue.put(message, timeout=self.put_timeout)
+        except queue.Full:
+            self._count('rejected')
+            raise
+        self._count('accepted')
+
+    def stats(self):
+        with self._counts_lock:
+            return {**self._counts, 'queued': self._queue.qsize(), 'capacity': self._queue.maxsize}
+
+    def _count(self, name, amount=1):
+        with self._counts_lock:
+            self._counts[name] += amount
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        try:
+            self._get_collection().insert_many(batch, ordered=False)
+        except BulkWriteError as error:
+            # insert_many set each document's _id, so on a retry the part that did
+            # get written comes back as duplicate keys, which is fine
+            if any(write_error.get('code') != 11000 for write_error in error.details.get('writeErrors', [])):
+                raise
+        self._count('written', len(batch))
+
+    def _run(self):
+        backoff = 0.5
+        while not self._stopping.is_set():
+            if not self._pending:
+                self._pending = self._next_batch()
+                if not self._pending:
+                    continue
+            try:
+                self._write(self._pending)
+            except Exception:
+                self._count('failed_batches')
+                logger.exception('Writing %d contact messages failed; retrying in %.1fs',
+                                 len(self._pending), backoff)
+                self._stopping.wait(backoff)
+                backoff = min(backoff * 2, 30)
+                continue
+            self._pending = []
+            backoff = 0.5
+
+    def stop(self):
+        self._stopping.set()
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                self._thread.join(timeout=self.flush_interval + 1)
+            # A later submit() starts a new writer rather than queueing for this one
+            self._thread = None
+            self._pid = None
+        batch, self._pending = self._pending, []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch and self._get_collection is not None:
+            try:
+                self._write(batch)
+            except Exception:
+                logger.exception('Final write of %d contact messages failed', len(batch))
+
+    def _ensure_thread(self):
+        # Threads do not survive a fork, so each gunicorn worker starts its own
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='contact-writer', daemon=True)
+            self._thread.start()
@@ -0,0 +1,406 @@
+# feeds.py
+# Sitemap and RSS/Atom feeds, streamed from cursors into cached files that admin writes invalidate piece by piece
+import hashlib
+import itertools
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape, quoteattr
+
+from flask import url_for
+
+from pagination import SORT_KEYS
+
+logger = logging.getLogger(__name__)
+
+# Per-file limit of the sitemap protocol; beyond it /sitemap.xml becomes an index of shards
+SITEMAP_MAX_URLS = 50000
+FEED_SIZE = 20
+CURSOR_BATCH_SIZE = 1000
+SITEMAP_PROJECTION = {'date_created': 1, 'date_updated': 1}
+FEED_PROJECTION = {'title': 1, 'excerpt': 1, 'category': 1, 'author': 1, 'date_created': 1, 'date_updated': 1}
+# Sitemap shards hold one month of articles: 'YYYY-MM', then 'YYYY-MM-2'... past SITEMAP_MAX_URLS
+SHARD_NAME_RE = re.compile(r'^(\d{4})-(\d{2})(?:-([2-9]|[1-9]\d+))?$')
+FEED_MIMETYPES = {'rss': 'application/rss+xml', 'atom': 'application/atom+xml'}
+
+CachedFile = namedtuple('CachedFile', 'path etag')
+
+
+def _w3c(moment):
+    return moment.replace(tzinfo=timezone.utc).isoformat(timespec='seconds')
+
+
+def _rfc822(moment):
+    return format_datetime(moment.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def _month_range(year, month):
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return start, end
+
+
+def _category_key(category):
+    # Category names are free text; file names use a hash of them
+    return hashlib.sha1(category.encode('utf-8')).hexdigest()[:16]
+
+
+class _Output:
+    """A file being generated: written to a temp file and hashed as it goes."""
+
+    def __init__(self, directory):
+        descriptor, self.temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        self._file = os.fdopen(descriptor, 'wb')
+        self._digest = hashlib.sha1()
+
+    def write(self, text):
+        data = text.encode('utf-8')
+        self._digest.update(data)
+        self._file.write(data)
+
+    def close(self):
+        self._file.close()
+        return self._digest.hexdigest()
+
+
+class FileCache:
+    """Generated files on disk, shared by every worker process.
+
+    Files are built in *units* (a feed, a sitemap shard), each of which may
+    write several files. After a build, ``.<unit>.built`` lists the files with
+    their ETags. A unit is fresh while that record is newer than its
+    ``.<unit>.stale`` marker (and the ``.all.stale`` marker of ``clear()``),
+    so invalidating is one touch that every worker sees. Records are stamped
+    with the time their build *started*: a build overlapping an invalidation
+    stays stale and is redone on the next request.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._records = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def _mtime(self, filename):
+        try:
+            return os.stat(self._path(filename)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _record(self, unit):
+        """``{filename: etag}`` of the unit's last build if it is still fresh, else None."""
+        built = self._mtime(f'.{unit}.built')
+        if built is None:
+            return None
+        stale = max(self._mtime(f'.{unit}.stale') or 0, self._mtime('.all.stale') or 0)
+        if built <= stale:
+            return None
+        cached = self._records.get(unit)
+        if cached is None or cached[0] != built:
+            cached = self._records[unit] = (built, self._read_record(unit))
+        return cached[1]
+
+    def _read_record(self, unit):
+        try:
+            with open(self._path(f'.{unit}.built')) as f:
+                return dict(line.split() for line in f if line.strip())
+        except FileNotFoundError:
+            return {}
+
+    def is_fresh(self, unit):
+        return self._record(unit) is not None
+
+    def get(self, unit, filename, build):
+        """The CachedFile for ``filename``, first (re)building ``unit`` if it is stale.
+
+        ``build(open_output)`` writes the unit's files; ``open_output(name)``
+        is a context manager yielding an object with ``write(text)``. Returns
+        None if the build did not produce ``filename``.
+        """
+        files = self._record(unit)
+        if files is None:
+            with self._unit_lock(unit):
+                files = self._record(unit)
+                if files is None:
+                    files = self._build(unit, build)
+        etag = files.get(filename)
+        return CachedFile(self._path(filename), etag) if etag else None
+
+    def _unit_lock(self, unit):
+        with self._lock:
+            return self._locks.setdefault(unit, threading.Lock())
+
+    def _build(self, unit, build):
+        started = time.time_ns()
+        files = {}
+
+        @contextmanager
+        def open_output(filename):
+            output = _Output(self.directory)
+            try:
+                yield output
+            except BaseException:
+                output.close()
+                os.remove(output.temp_path)
+                raise
+            files[filename] = output.close()
+            os.replace(output.temp_path, self._path(filename))
+
+        build(open_output)
+
+        # Files the previous build wrote and this one did not (a shrunken shard)
+        for filename in set(self._read_record(unit)) - set(files):
+            try:
+                os.remove(self._path(filename))
+            except FileNotFoundError:
+                pass
+
+        descriptor, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        with os.fdopen(descriptor, 'w') as f:
+            f.writelines(f'{filename} {etag}\n' for filename, etag in files.items())
+        os.utime(temp_path, ns=(started, started))
+        os.replace(temp_path, self._path(f'.{unit}.built'))
+        self._records[unit] = (started, files)
+        return files
+
+    def invalidate(self, *units):
+        now = time.time_ns()
+        for unit in units:
+            marker = self._path(f'.{unit}.stale')
+            with open(marker, 'a'):
+                pass
+            # Stamped from the same clock as build start times
+            os.utime(marker, ns=(now, now))
+
+    def clear(self):
+        self.invalidate('all')
+
+
+class Feeds:
+    """``/sitemap.xml`` and per-category RSS/Atom feeds, served from a FileCache.
+
+    Up to ``max_urls`` URLs the sitemap is one urlset streamed from a cursor;
+    beyond that it is an index of a pages shard and one shard per month of
+    articles (split further if a month alone exceeds ``max_urls``). An
+    article write invalidates the index, its month's shard and the feeds of
+    its categories; everything else stays cached. Links are absolute, based
+    on ``site_url``. The files are shared by every client, so they are never
+    built from the request's Host header: without ``site_url`` there is no
+    sitemap or feed (the routes return 404) and an error is logged.
+    """
+
+    def __init__(self, cache_dir, site_url=None, site_name='News', feed_size=FEED_SIZE,
+                 max_urls=SITEMAP_MAX_URLS):
+        self.cache = FileCache(cache_dir)
+        self.site_url = site_url
+        self.site_name = site_name
+        self.feed_size = feed_size
+        self.max_urls = max_urls
+        self._warned = False
+
+    def _configured(self):
+        if not self.site_url and not self._warned:
+            self._warned = True
+            logger.error('SITE_URL (or SERVER_NAME) is not set: the sitemap and feeds are disabled')
+        return bool(self.site_url)
+
+    # Invalidation
+
+    def invalidate(self, categories=(), date_created=None):
+        """Mark what an article write in ``categories`` (created at ``date_created``) changes."""
+        categories = [category for category in categories if category]
+        if not categories and date_created is None:
+            return
+        units = ['sitemap', 'sitemap-pages', 'feed-all']
+        units.extend(f'feed-{_category_key(category)}' for category in categories)
+        if date_created is not None:
+            units.append(f'sitemap-{date_created:%Y-%m}')
+        self.cache.invalidate(*units)
+
+    def clear(self):
+        self.cache.clear()
+
+    # Sitemap
+
+    def sitemap(self, collection):
+        if not self._configured():
+            return None
+        return self.cache.get('sitemap', 'sitemap.xml',
+                              lambda open_output: self._write_sitemap(collection, open_output))
+
+    def sitemap_shard(self, collection, name):
+        """A shard listed by the sitemap index: 'pages' or a month ('YYYY-MM', 'YYYY-MM-2', ...)."""
+        if not self._configured():
+            return None
+        if name == 'pages':
+            return self.cache.get('sitemap-pages', 'sitemap-pages.xml',
+                                  lambda open_output: self._write_pages_shard(collection, open_output))
+        match = SHARD_NAME_RE.match(name)
+        if not match or not 1 <= int(match.group(2)) <= 12:
+            return None
+        start, end = _month_range(int(match.group(1)), int(match.group(2)))
+        unit = f'sitemap-{start:%Y-%m}'
+        # Only months that have articles get cache files
+        if not self.cache.is_fresh(unit) and \
+                collection.find_one({'date_created': {'$gte': start, '$lt': end}}, {'_id': 1}) is None:
+            return None
+        return self.cache.get(unit, f'sitemap-{name}.xml',
+                              lambda open_output: self._write_month_shard(collection, start, end, open_output))
+
+    def _links(self):
+        base = self.site_url.rstrip('/')
+        # url_for once per build; article links are this prefix plus the id
+        article_prefix = base + url_for('frontend.news_detail', news_id='x')[:-1]
+        return base, article_prefix
+
+    def _page_urls(self, collection, base):
+        urls = [base + url_for('frontend.index'), base + url_for('frontend.all_news'), base + url_for('frontend.contact')]
+        urls.extend(base + url_for('frontend.all_news', category=category)
+                    for category in sorted(collection.distinct('category')))
+        return urls
+
+    def _write_sitemap(self, collection, open_output):
+        base, article_prefix = self._links()
+        pages = self._page_urls(collection, base)
+        if collection.estimated_document_count() + len(pages) <= self.max_urls:
+            with open_output('sitemap.xml') as output:
+                output.write(URLSET_START)
+                for loc in pages:
+                    output.write(_url_entry(loc))
+                articles = collection.find({}, SITEMAP_PROJECTION).sort(SORT_KEYS).batch_size(CURSOR_BATCH_SIZE)
+                for news in articles:
+                    output.write(_url_entry(article_prefix + str(news['_id']), news.get('date_updated')))
+                output.write(URLSET_END)
+            return
+
+        months = collection.aggregate([
+            {'$group': {
+                '_id': {'$dateToString': {'format': '%Y-%m', 'date': '$date_created'}},
+                'count': {'$sum': 1},
+                'lastmod': {'$max': '$date_updated'}
+            }},
+            {'$sort': {'_id': -1}}
+        ])
+        with open_output('sitemap.xml') as output:
+            output.write(INDEX_START)
+            output.write(_sitemap_entry(base + url_for('frontend.sitemap_shard', name='pages')))
+            for month in months:
+                parts = -(-month['count'] // self.max_urls)
+                for part in range(1, parts + 1):
+                    name = month['_id'] if part == 1 else f"{month['_id']}-{part}"
+                    output.write(_sitemap_entry(base + url_for('frontend.sitemap_shard', name=name), month['lastmod']))
+            output.write(INDEX_END)
+
+    def _write_pages_shard(self, collection, open_output):
+        base, _ = self._links()
+        with open_output('sitemap-pages.xml') as output:
+            output.write(URLSET_START)
+            for loc in self._page_urls(collection, base):
+                output.write(_url_entry(loc))
+            output.write(URLSET_END)
+
+    def _write_month_shard(self, collection, start, end, open_output):
+        _, article_prefix = self._links()
+        # Oldest first, so part boundaries stay put as the month grows
+        articles = iter(collection.find({'date_created': {'$gte': start, '$lt': end}}, SITEMAP_PROJECTION)
+                        .sort([('date_created', 1), ('_id', 1)]).batch_size(CURSOR_BATCH_SIZE))
+        part = 1
+        while True:
+            chunk = itertools.islice(articles, self.max_urls)
+            first = next(chunk, None)
+            if first is None:
+                return
+            filename = f'sitemap-{start:%Y-%m}.xml' if part == 1 else f'sitemap-{start:%Y-%m}-{part}.xml'
+            with open_output(filename) as output:
+                output.write(URLSET_START)
+                for news in itertools.chain([first], chunk):
+                    output.write(_url_entry(article_prefix + str(news['_id']), news.get('date_updated')))
+                output.write(URLSET_END)
+            part += 1
+
+    # Feeds
+
+    def feed(self, collection, kind, category=None):
+        """The 'rss' or 'atom' feed of the newest articles, in ``category`` or overall."""
+        if not self._configured():
+            return None
+        unit = f'feed-{_category_key(category)}' if category else 'feed-all'
+        if category and not self.cache.is_fresh(unit) and \
+                collection.find_one({'category': category}, {'_id': 1}) is None:
+            return None
+        return self.cache.get(unit, f'{unit}.{kind}.xml',
+                              lambda open_output: self._write_feeds(collection, unit, category, open_output))
+
+    def _write_feeds(self, collection, unit, category, open_output):
+        base, article_prefix = self._links()
+        query = {'category': category} if category else {}
+        items = list(collection.find(query, FEED_PROJECTION).sort(SORT_KEYS).limit(self.feed_size))
+        title = f'{self.site_name} - {category}' if category else self.site_name
+        home = base + (url_for('frontend.all_news', category=category) if category else url_for('frontend.index'))
+        updated = max((news.get('date_updated') or news['date_created'] for news in items),
+                      default=datetime(1970, 1, 1))
+        self_urls = {kind: base + url_for('frontend.news_feed', kind=kind, category=category) for kind in FEED_MIMETYPES}
+
+        # Both formats come from the one query
+        with open_output(f'{unit}.rss.xml') as output:
+            output.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                         '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom"><channel>\n'
+                         f'<title>{escape(title)}</title><link>{escape(home)}</link>'
+                         f'<description>{escape(f"Latest articles from {title}")}</description>'
+                         f'<lastBuildDate>{_rfc822(updated)}</lastBuildDate>'
+                         f'<atom:link href={quoteattr(self_urls["rss"])} rel="self" type="application/rss+xml"/>\n')
+            for news in items:
+                link = escape(article_prefix + str(news['_id']))
+                output.write(f'<item><title>{escape(news.get("title") or "")}</title><link>{link}</link>'
+                             f'<guid isPermaLink="true">{link}</guid>'
+                             f'<pubDate>{_rfc822(news["date_created"])}</pubDate>'
+                             f'<category>{escape(news.get("category") or "")}</category>'
+                             f'<description>{escape(news.get("excerpt") or "")}</description></item>\n')
+            output.write('</channel></rss>\n')
+
+        with open_output(f'{unit}.atom.xml') as output:
+            output.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                         '<feed xmlns="http://www.w3.org/2005/Atom">\n'
+                         f'<id>{escape(self_urls["atom"])}</id><title>{escape(title)}</title>'
+                         f'<updated>{_w3c(updated)}</updated>'
+                         f'<link href={quoteattr(self_urls["atom"])} rel="self"/>'
+                         f'<link href={quoteattr(home)} rel="alternate" type="text/html"/>\n')
+            for news in items:
+                link = article_prefix + str(news['_id'])
+                output.write(f'<entry><id>{escape(link)}</id><title>{escape(news.get("title") or "")}</title>'
+                             f'<link href={quoteattr(link)} rel="alternate" type="text/html"/>'
+                             f'<published>{_w3c(news["date_created"])}</published>'
+                             f'<updated>{_w3c(news.get("date_updated") or news["date_created"])}</updated>'
+                             f'<author><name>{escape(news.get("author") or self.site_name)}</name></author>'
+                             f'<category term={quoteattr(news.get("category") or "")}/>'
+                             f'<summary>{escape(news.get("excerpt") or "")}</summary></entry>\n')
+            output.write('</feed>\n')
+
+
+URLSET_START = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+URLSET_END = '</urlset>\n'
+INDEX_START = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+               '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+INDEX_END = '</sitemapindex>\n'
+
+
+def _url_entry(loc, lastmod=None):
+    lastmod = f'<lastmod>{_w3c(lastmod)}</lastmod>' if lastmod else ''
+    return f'<url><loc>{escape(loc)}</loc>{lastmod}</url>\n'
+
+
+def _sitemap_entry(loc, lastmod=None):
+    lastmod = f'<lastmod>{_w3c(lastmod)}</lastmod>' if lastmod else ''
+    return f'<sitemap><loc>{escape(loc)}</loc>{lastmod}</sitemap>\n'
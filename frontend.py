@@ -0,0 +1,159 @@
+# frontend.py
+# Public pages: homepage, listings, article pages, contact form, sitemap and feeds
+import math
+import queue
+from datetime import datetime
+
+from bson.objectid import ObjectId
+from flask import Blueprint, abort, current_app, flash, redirect, render_template, request, send_file, url_for
+
+from articles import CARD_PROJECTION
+from contacts import validate_contact
+from feeds import FEED_MIMETYPES
+from pagination import paginate
+from services import (cached, category_registry, contact_duplicates, contact_limiter, contact_queue,
+                      feeds, homepage_cache, mongo, response_cache, trending, view_counter)
+
+frontend = Blueprint('frontend', __name__)
+
+
+def count_article_view(news_id):
+    # Runs for cached and freshly rendered detail pages alike
+    if ObjectId.is_valid(news_id):
+        view_counter.record(news_id)
+
+
+@frontend.route('/')
+@cached(tags=['homepage'])
+def index():
+    # Recent, updated and per-category sections come from one cached aggregation,
+    # one section per registered category
+    sections = homepage_cache.get(mongo.db.news, category_registry.names())
+
+    return render_template('frontend/index.html',
+                         recent_news=sections['recent_news'],
+                         updated_news=sections['updated_news'],
+                         categorized_news=sections['categorized_news'],
+                         category_counts=category_registry.counts(),
+                         trending_news=trending.top())
+
+
+@frontend.route('/all-news')
+@cached(tags=['news-list'])
+def all_news():
+    per_page = 6
+    category = request.args.get('category', '')
+
+    # Build query based on category filter
+    query = {}
+    if category:
+        query['category'] = category
+
+    # Get total count for pagination (cached per-category counts)
+    total = category_registry.count(category or None)
+
+    # Get news with keyset pagination (cost does not grow with page depth)
+    page = paginate(mongo.db.news, query, per_page,
+                    after=request.args.get('after'),
+                    before=request.args.get('before'),
+                    projection=CARD_PROJECTION)
+
+    # Get categories for filter dropdown
+    categories = category_registry.listed()
+
+    return render_all_news(page, per_page, total, category, categories)
+
+
+def render_all_news(page, per_page, total, category, categories):
+    return render_template('frontend/all_news.html',
+                         news_list=page.items,
+                         page=page,
+                         per_page=per_page,
+                         total=total,
+                         category=category,
+                         categories=categories)
+
+
+@frontend.route('/news/<news_id>')
+@cached(tags=lambda news_id: [f'news:{news_id}'], on_request=count_article_view)
+def news_detail(news_id):
+    news = mongo.db.news.find_one({'_id': ObjectId(news_id)})
+    if not news:
+        flash('News article not found', 'error')
+        return redirect(url_for('frontend.index'))
+
+    # Include views still waiting in the buffer (this one was counted by count_article_view)
+    news['views'] = news.get('views', 0) + view_counter.pending(news_id)
+
+    related_ids = news.get('related_ids')
+    if related_ids:
+        # Neighbors precomputed by related_index, fetched in one lookup and kept in rank order
+        related = {doc['_id']: doc for doc in mongo.db.news.find({'_id': {'$in': related_ids}}, CARD_PROJECTION)}
+        related_news = [related[related_id] for related_id in related_ids if related_id in related]
+    else:
+        # Not processed yet: fall back to the newest articles in the same category,
+        # a list that changes whenever this category does
+        response_cache.tag(f"category:{news['category']}")
+        related_news = list(mongo.db.news.find({
+            '_id': {'$ne': ObjectId(news_id)},
+            'category': news['category']
+        }, CARD_PROJECTION).sort('date_created', -1).limit(3))
+
+    return render_template('frontend/news_detail.html', news=news, related_news=related_news)
+
+
+@frontend.route('/contact', methods=['GET', 'POST'])
+@cached(tags=['contact'])
+def contact():
+    if request.method == 'POST':
+        # Throttle before doing any other work for the request
+        wait = contact_limiter.allow(request.remote_addr)
+        if wait:
+            flash('You have sent several messages in a short time. Please try again later.', 'error')
+            return render_template('frontend/contact.html', form=request.form), 429, {'Retry-After': str(math.ceil(wait))}
+
+        message, error = validate_contact(request.form)
+        if error:
+            flash(error, 'error')
+            return render_template('frontend/contact.html', form=request.form), 400
+
+        # Repeats (double submits, copy-paste spam) are acknowledged but not stored again
+        if not contact_duplicates.check(message):
+            message['ip'] = request.remote_addr
+            message['date_created'] = datetime.utcnow()
+            try:
+                contact_queue.submit(message)
+            except queue.Full:
+                # Not stored, so a retry must not be taken for a repeat
+                contact_duplicates.forget(message)
+                flash('We are receiving a lot of messages right now. Please try again in a minute.', 'error')
+                return render_template('frontend/contact.html', form=request.form), 503, {'Retry-After': '60'}
+
+        flash('Your message has been sent successfully!', 'success')
+        return redirect(url_for('frontend.contact'))
+
+    return render_template('frontend/contact.html')
+
+
+# Sitemap and feeds, served from the file cache with content ETags
+def send_feed_file(cached_file, mimetype):
+    if cached_file is None:
+        abort(404)
+    return send_file(cached_file.path, mimetype=mimetype, etag=cached_file.etag, conditional=True,
+                     max_age=current_app.config['FEED_MAX_AGE'])
+
+
+@frontend.route('/sitemap.xml')
+def sitemap():
+    return send_feed_file(feeds.sitemap(mongo.db.news), 'application/xml')
+
+
+@frontend.route('/sitemaps/<name>.xml')
+def sitemap_shard(name):
+    return send_feed_file(feeds.sitemap_shard(mongo.db.news, name), 'application/xml')
+
+
+@frontend.route('/feeds/<any(rss, atom):kind>.xml')
+@frontend.route('/feeds/<category>/<any(rss, atom):kind>.xml')
+def news_feed(kind, category=None):
+    return send_feed_file(feeds.feed(mongo.db.news, kind, category), FEED_MIMETYPES[kind])
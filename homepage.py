@@ -0,0 +1,122 @@
+# homepage.py
+# Homepage data layer: all sections in one aggregation of bounded sub-pipelines, cached with a TTL
+import threading
+import time
+from datetime import datetime
+
+from articles import CARD_PROJECTION
+
+RECENT_LIMIT = 3
+UPDATED_LIMIT = 4
+CATEGORY_LIMIT = 4
+SECTION_FIELD = '_section'
+
+
+def homepage_sections(categories):
+    """``(name, filter, sort field, limit)`` of every homepage section."""
+    sections = [
+        ('recent', {}, 'date_created', RECENT_LIMIT),
+        ('updated', {}, 'date_updated', UPDATED_LIMIT)
+    ]
+    for index, category in enumerate(categories):
+        sections.append((f'category_{index}', {'category': category}, 'date_created', CATEGORY_LIMIT))
+    return sections
+
+
+def build_homepage_pipeline(categories, collection='news', projection=CARD_PROJECTION):
+    """Build the single aggregation that returns every homepage section.
+
+    Each section is its own $match/$sort/$limit, so the server reads it from
+    an index and examines only that section's few documents; $unionWith
+    (MongoDB 4.4+) chains them into one round trip. Documents carry the
+    name of their section in SECTION_FIELD.
+    """
+    pipelines = []
+    for name, filter_, sort_field, limit in homepage_sections(categories):
+        stages = [{'$match': filter_}] if filter_ else []
+        stages += [{'$sort': {sort_field: -1}}, {'$limit': limit}]
+        if projection:
+            stages.append({'$project': projection})
+        stages.append({'$set': {SECTION_FIELD: name}})
+        pipelines.append(stages)
+    first, *others = pipelines
+    return first + [{'$unionWith': {'coll': collection, 'pipeline': stages}} for stages in others]
+
+
+def fetch_homepage(collection, categories):
+    """Run the homepage aggregation (one round trip) and split it into sections."""
+    sections = {}
+    for doc in collection.aggregate(build_homepage_pipeline(categories, collection.name)):
+        sections.setdefault(doc.pop(SECTION_FIELD), []).append(doc)
+    for name, _, sort_field, _ in homepage_sections(categories):
+        # $unionWith does not promise an order for the combined output
+        sections.get(name, []).sort(key=lambda doc: doc.get(sort_field) or datetime.min, reverse=True)
+    return {
+        'recent_news': sections.get('recent', []),
+        'updated_news': sections.get('updated', []),
+        'categorized_news': {
+            category: sections.get(f'category_{index}', [])
+            for index, category in enumerate(categories)
+        }
+    }
+
+
+class HomepageCache:
+    """Process-wide cache of the homepage sections.
+
+    Only one thread rebuilds an expired entry; while it does, other readers
+    keep getting the previous data. Admin writes call ``invalidate()`` so
+    edits show up on the next request, and a change in the category list
+    (from the category registry) rebuilds the sections.
+    """
+
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._categories = None
+        self._data = None
+        self._stale = None
+        self._expires_at = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def _fresh(self, categories):
+        return self._data is not None and self._categories == categories and time.monotonic() < self._expires_at
+
+    def get(self, collection, categories):
+        categories = list(categories)
+        if self._fresh(categories):
+            return self._data
+
+        # Serve the previous copy while another thread is refreshing
+        stale = self._stale
+        if stale is not None:
+            if not self._refresh_lock.acquire(blocking=False):
+                return stale
+        else:
+            self._refresh_lock.acquire()
+
+        try:
+            if self._fresh(categories):
+                return self._data
+            with self._lock:
+                generation = self._generation
+
+            data = fetch_homepage(collection, categories)
+
+            with self._lock:
+                # Don't store a result that raced with an invalidation
+                if generation == self._generation:
+                    self._data = self._stale = data
+                    self._categories = categories
+                    self._expires_at = time.monotonic() + self.ttl
+            return data
+        finally:
+            self._refresh_lock.release()
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._data = None
+            self._stale = None
+            self._expires_at = 0
@@ -0,0 +1,123 @@
+# images.py
+# Upload image pipeline: resized JPEG/WebP variants for srcset, EXIF stripped
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Card images are shown at 150-400 CSS px; the largest width serves the detail page
+VARIANT_WIDTHS = (320, 640, 1280)
+VARIANT_FORMATS = {
+    'jpeg': {'extension': 'jpg', 'options': {'quality': 82, 'optimize': True, 'progressive': True}},
+    'webp': {'extension': 'webp', 'options': {'quality': 80, 'method': 4}},
+}
+
+
+def variant_filename(filename, width, fmt):
+    stem = os.path.splitext(filename)[0]
+    return f"{stem}_{width}w.{VARIANT_FORMATS[fmt]['extension']}"
+
+
+def generate_variants(upload_folder, filename, widths=VARIANT_WIDTHS):
+    """Decode ``filename`` once and write a JPEG and a WebP copy per width.
+
+    Images are never upscaled: widths larger than the original collapse into
+    one variant at the original width. Re-encoding without the ``exif``
+    argument drops EXIF (camera, GPS) metadata; orientation is applied to the
+    pixels first. Returns the variant metadata to store on the news document,
+    or an empty list for files that are not processed (animated images, or
+    Pillow not installed).
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        logger.warning('Pillow is not installed; serving %s without variants', filename)
+        return []
+
+    with Image.open(os.path.join(upload_folder, filename)) as original:
+        if getattr(original, 'is_animated', False):
+            return []
+        image = ImageOps.exif_transpose(original)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+    targets = sorted({min(width, image.width) for width in widths}, reverse=True)
+    variants = []
+    current = image
+    # Resize from the previous (larger) variant rather than the original each time
+    for width in targets:
+        if width < current.width:
+            height = max(1, round(current.height * width / current.width))
+            current = current.resize((width, height), Image.LANCZOS)
+        for fmt, spec in VARIANT_FORMATS.items():
+            output = current.convert('RGB') if fmt == 'jpeg' and current.mode != 'RGB' else current
+            name = variant_filename(filename, width, fmt)
+            output.save(os.path.join(upload_folder, name), fmt.upper(), **spec['options'])
+            variants.append({
+                'width': width,
+                'height': current.height,
+                'format': fmt,
+                'filename': name,
+                'bytes': os.path.getsize(os.path.join(upload_folder, name))
+            })
+    variants.sort(key=lambda variant: (variant['format'], variant['width']))
+    return variants
+
+
+def variant_files(news):
+    """Filenames of an article's image variants."""
+    return [variant['filename'] for variant in news.get('image_variants') or []]
+
+
+class ImagePipeline:
+    """Runs variant generation in a thread pool so uploads return immediately.
+
+    Pillow releases the GIL while decoding, resizing and encoding, so threads
+    give real parallelism here without the pickling cost of a process pool.
+    Variants are kept with the upload in ``store``: content uploaded before
+    reuses them, and remote backends are worked on through a temporary copy.
+    """
+
+    def __init__(self, store, max_workers=2, widths=VARIANT_WIDTHS):
+        self.store = store
+        self.widths = widths
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='image-variants')
+
+    def process(self, collection, news_id, filename):
+        """Generate variants now and store them on the article. Returns the variants."""
+        variants = self.store.variants(filename)
+        if not variants:
+            variants = self._generate(filename)
+            self.store.set_variants(filename, variants)
+        if variants:
+            # Only attach them if the article still uses this image
+            collection.update_one({'_id': news_id, 'image': filename},
+                                  {'$set': {'image_variants': variants}})
+        return variants
+
+    def _generate(self, filename):
+        folder = self.store.backend.local_folder
+        if folder:
+            return generate_variants(folder, filename, self.widths)
+        with tempfile.TemporaryDirectory() as folder:
+            self.store.download(filename, os.path.join(folder, filename))
+            variants = generate_variants(folder, filename, self.widths)
+            for variant in variants:
+                self.store.backend.save(variant['filename'], os.path.join(folder, variant['filename']))
+            return variants
+
+    def submit(self, collection, news_id, filename, on_done=None):
+        future = self._executor.submit(self.process, collection, news_id, filename)
+
+        def _finished(future):
+            if future.exception() is not None:
+                logger.error('Image variants failed for %s', filename, exc_info=future.exception())
+            elif on_done is not None:
+                on_done()
+
+        future.add_done_callback(_finished)
+        return future
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
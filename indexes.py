@@ -0,0 +1,161 @@
+# indexes.py
+# Index declarations for every route query (frontend, admin and api blueprints), plus a query-plan check
+from datetime import datetime
+
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from articles import DELETED_COLLECTION, DELETION_RETENTION
+from categories import DEFAULT_CATEGORIES
+from homepage import build_homepage_pipeline, homepage_sections
+from pagination import SORT_KEYS, keyset_filter
+
+# collection name -> indexes it needs
+INDEXES = {
+    'news': [
+        # all_news, admin_news_list (keyset order), homepage "recent", dashboard recent
+        IndexModel([('date_created', DESCENDING), ('_id', DESCENDING)], name='date_created_id'),
+        # all_news filtered by category, homepage category sections, related news fallback
+        IndexModel([('category', ASCENDING), ('date_created', DESCENDING), ('_id', DESCENDING)],
+                   name='category_date_created_id'),
+        # homepage "recently updated", search index refresh
+        IndexModel([('date_updated', DESCENDING)], name='date_updated'),
+        # dashboard "most viewed"
+        IndexModel([('views', DESCENDING)], name='views'),
+        # related_index: articles listing a changed article
+        IndexModel([('related_ids', ASCENDING)], name='related_ids'),
+    ],
+    'admin_users': [
+        IndexModel([('username', ASCENDING), ('is_active', ASCENDING)], name='username_is_active'),
+    ],
+    'contacts': [
+        # admin inbox (keyset order)
+        IndexModel([('date_created', DESCENDING), ('_id', DESCENDING)], name='date_created_id'),
+    ],
+    'trending': [
+        # top scores of the current era, and pruning of decayed ones
+        IndexModel([('era', ASCENDING), ('score', DESCENDING)], name='era_score'),
+    ],
+    'uploads': [
+        # sweep of unreferenced uploads
+        IndexModel([('refs', ASCENDING)], name='refs'),
+    ],
+    DELETED_COLLECTION: [
+        # search and related-articles refresh read recent deletions; old records expire
+        IndexModel([('date_deleted', ASCENDING)], name='date_deleted', expireAfterSeconds=DELETION_RETENTION),
+    ],
+    'news_stats': [
+        # dashboard reads every category rollup
+        IndexModel([('kind', ASCENDING)], name='kind'),
+        # hourly view buckets expire on their own
+        IndexModel([('expire_at', ASCENDING)], name='expire_at', expireAfterSeconds=0),
+    ],
+}
+
+_SAMPLE_POSITION = (datetime(2024, 1, 1), ObjectId())
+
+
+# Query shapes issued by the routes: (name, collection, filter, sort). Keep this
+# in step with the routes so the plan check covers every new query. The homepage
+# aggregation is checked separately, by running it. The 'flask rebuild-stats'
+# $group and the per-month $group of a sharded sitemap index scan the
+# collection by design and are not listed.
+QUERY_SHAPES = [
+    ('all_news: first page', 'news', {}, SORT_KEYS),
+    ('all_news: next page', 'news', keyset_filter({}, _SAMPLE_POSITION, '$lt'), SORT_KEYS),
+    ('all_news: category page', 'news', {'category': DEFAULT_CATEGORIES[0]}, SORT_KEYS),
+    ('all_news: category next page', 'news',
+     keyset_filter({'category': DEFAULT_CATEGORIES[0]}, _SAMPLE_POSITION, '$lt'), SORT_KEYS),
+    ('news_detail: related news', 'news', {'_id': {'$in': [ObjectId(), ObjectId()]}}, None),
+    ('news_detail: related news fallback', 'news',
+     {'_id': {'$ne': ObjectId()}, 'category': DEFAULT_CATEGORIES[0]}, [('date_created', -1)]),
+    ('related_index: listing articles', 'news', {'related_ids': ObjectId()}, None),
+    ('api_search: index refresh', 'news', {'date_updated': {'$gte': _SAMPLE_POSITION[0]}}, None),
+    ('api_search: deletions', DELETED_COLLECTION, {'date_deleted': {'$gte': _SAMPLE_POSITION[0]}}, None),
+    ('sitemap: all articles', 'news', {}, SORT_KEYS),
+    ('sitemap_shard: month', 'news', {'date_created': {'$gte': datetime(2024, 1, 1), '$lt': datetime(2024, 2, 1)}},
+     [('date_created', 1), ('_id', 1)]),
+    ('news_feed: category', 'news', {'category': DEFAULT_CATEGORIES[0]}, SORT_KEYS),
+    ('admin_news_list: first page', 'news', {}, SORT_KEYS),
+    ('admin_dashboard: stats rollups', 'news_stats',
+     {'$or': [{'_id': 'totals'}, {'kind': 'category'}, {'_id': {'$in': ['hour:2024010100']}}]}, None),
+    ('admin_dashboard: recent news', 'news', {}, [('date_created', -1)]),
+    ('admin_dashboard: popular news', 'news', {}, [('views', -1)]),
+    ('trending: top scores', 'trending', {'era': 1}, [('score', -1)]),
+    ('trending: decayed scores', 'trending', {'era': 1, 'score': {'$lt': 1.0}}, None),
+    ('admin_messages: first page', 'contacts', {}, SORT_KEYS),
+    ('admin_messages: next page', 'contacts', keyset_filter({}, _SAMPLE_POSITION, '$lt'), SORT_KEYS),
+    ('sweep-uploads: unreferenced', 'uploads', {'refs': {'$lte': 0}}, None),
+    ('admin_login: user lookup', 'admin_users', {'username': 'admin', 'is_active': True}, None),
+]
+
+
+def ensure_indexes(db):
+    """Create every declared index. Safe to run on each start: existing indexes are left as they are."""
+    created = {}
+    for collection, indexes in INDEXES.items():
+        created[collection] = db[collection].create_indexes(indexes)
+    return created
+
+
+def _plan_stages(plan):
+    """Yield every stage name in an explain() plan tree."""
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _plan_stages(item)
+
+
+def _winning_plan(explain):
+    return explain['queryPlanner']['winningPlan']
+
+
+def explain_query(db, collection, filter_, sort):
+    command = {'find': collection, 'filter': filter_, 'limit': 1}
+    if sort:
+        command['sort'] = dict(sort)
+    return db.command('explain', command, verbosity='queryPlanner')
+
+
+def _docs_examined(explain):
+    """Sum every ``totalDocsExamined`` in an explain tree, sub-pipelines included."""
+    if isinstance(explain, dict):
+        return (explain.get('totalDocsExamined', 0)
+                + sum(_docs_examined(value) for key, value in explain.items() if key != 'totalDocsExamined'))
+    if isinstance(explain, list):
+        return sum(_docs_examined(item) for item in explain)
+    return 0
+
+
+def check_homepage_plan(db, categories=DEFAULT_CATEGORIES):
+    """Run the homepage aggregation under explain; returns ``(documents examined, allowed)``.
+
+    Each section reads at most its limit from an index, so examining more
+    documents than all the limits together means some section is scanning.
+    Only meaningful on a database that has articles.
+    """
+    explain = db.command('explain', {'aggregate': 'news', 'pipeline': build_homepage_pipeline(categories),
+                                     'cursor': {}}, verbosity='executionStats')
+    return _docs_examined(explain), sum(limit for _, _, _, limit in homepage_sections(categories))
+
+
+def check_query_plans(db):
+    """Explain each route's query shape, and run the homepage aggregation.
+
+    Returns a list of ``(name, stages)`` for every shape whose winning plan
+    contains a COLLSCAN or a blocking in-memory SORT, and for a homepage
+    that examines more documents than its sections show; empty means all good.
+    """
+    problems = []
+    for name, collection, filter_, sort in QUERY_SHAPES:
+        stages = list(_plan_stages(_winning_plan(explain_query(db, collection, filter_, sort))))
+        if 'COLLSCAN' in stages or 'SORT' in stages:
+            problems.append((name, stages))
+    examined, allowed = check_homepage_plan(db)
+    if examined > allowed:
+        problems.append(('index: homepage sections', [f'{examined} documents examined', f'at most {allowed} expected']))
+    return problems
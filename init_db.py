@@ -1,56 +1,94 @@
 # init_db.py
-from app import app, mongo
+# One-time database setup: indexes, excerpts on old articles, categories, the default admin and sample news.
+# Run it once per database with 'flask init-db' (or 'python init_db.py'), not on every start.
+from datetime import datetime
+
 from werkzeug.security import generate_password_hash
 
+from articles import migrate_summaries, summarize_content
+from categories import ensure_categories, rebuild_categories
+from indexes import ensure_indexes
+from services import feeds, mongo, related_index
+from stats import rebuild_stats
+
+SAMPLE_NEWS = [
+    {
+        'title': 'New Breakthrough in Artificial Intelligence',
+        'content': 'Researchers have developed a new AI model that can understand and generate human-like text with unprecedented accuracy. This breakthrough could revolutionize how we interact with technology.',
+        'category': 'Technology',
+        'views': 150
+    },
+    {
+        'title': 'Local Team Wins Championship',
+        'content': 'In an exciting final match, our local team secured the championship title with a stunning last-minute goal. Thousands of fans celebrated throughout the city.',
+        'category': 'Sports',
+        'views': 89
+    },
+    {
+        'title': 'New Programming Language Released',
+        'content': 'A team of developers has released a new programming language designed for web development. Early adopters report significant productivity improvements.',
+        'category': 'Programming',
+        'views': 203
+    },
+    {
+        'title': 'Political Summit Addresses Climate Change',
+        'content': 'World leaders gathered at the global political summit to discuss urgent climate change measures and international cooperation strategies.',
+        'category': 'Political',
+        'views': 120
+    }
+]
+
+
 def init_database():
-    with app.app_context():
-        # Create admin user if it doesn't exist
-        if mongo.db.admin_users.count_documents({}) == 0:
-            admin_user = {
-                'username': 'admin',
-                'password': generate_password_hash('admin123'),
-                'email': 'admin@newsportal.com',
-                'date_created': datetime.utcnow()
-            }
-            mongo.db.admin_users.insert_one(admin_user)
-            print("Admin user created: username='admin', password='admin123'")
-        
-        # Create sample news if the collection is empty
-        if mongo.db.news.count_documents({}) == 0:
-            sample_news = [
-                {
-                    'title': 'New Breakthrough in Artificial Intelligence',
-                    'content': 'Researchers have developed a new AI model that can understand and generate human-like text with unprecedented accuracy. This breakthrough could revolutionize how we interact with technology.',
-                    'category': 'Technology',
-                    'image': None,
-                    'date_created': datetime.utcnow(),
-                    'date_updated': datetime.utcnow(),
-                    'views': 150
-                },
-                {
-                    'title': 'Local Team Wins Championship',
-                    'content': 'In an exciting final match, our local team secured the championship title with a stunning last-minute goal. Thousands of fans celebrated throughout the city.',
-                    'category': 'Sports',
-                    'image': None,
-                    'date_created': datetime.utcnow(),
-                    'date_updated': datetime.utcnow(),
-                    'views': 89
-                },
-                {
-                    'title': 'New Programming Language Released',
-                    'content': 'A team of developers has released a new programming language designed for web development. Early adopters report significant productivity improvements.',
-                    'category': 'Programming',
-                    'image': None,
-                    'date_created': datetime.utcnow(),
-                    'date_updated': datetime.utcnow(),
-                    'views': 203
-                }
-            ]
-            mongo.db.news.insert_many(sample_news)
-            print("Sample news articles created")
-        
-        print("Database initialization completed successfully!")
+    """Create indexes, categories, the default admin and the sample articles where missing. Needs an app context."""
+    # Create indexes (no-op when they already exist)
+    ensure_indexes(mongo.db)
+
+    # Store excerpts on articles created before they existed
+    migrate_summaries(mongo.db.news)
+
+    # Register the default categories in display order (counts are taken below)
+    ensure_categories(mongo.db)
+
+    # Create admin user if it doesn't exist
+    if mongo.db.admin_users.count_documents({}) == 0:
+        admin_user = {
+            'username': 'admin',
+            'email': 'admin@newsportal.com',
+            'password': generate_password_hash('admin123'),
+            'date_created': datetime.utcnow(),
+            'last_login': None,
+            'is_active': True
+        }
+        mongo.db.admin_users.insert_one(admin_user)
+        print("Admin user created: username='admin', password='admin123'")
+
+    # Create sample news if the collection is empty
+    if mongo.db.news.count_documents({}) == 0:
+        now = datetime.utcnow()
+        sample_news = [{
+            **sample,
+            'image': None,
+            'date_created': now,
+            'date_updated': now,
+            'author': 'Admin',
+            **summarize_content(sample['content'])
+        } for sample in SAMPLE_NEWS]
+        mongo.db.news.insert_many(sample_news)
+        related_index.rebuild(mongo.db.news)
+        feeds.clear()
+        print("Sample news articles created")
+
+    # Count the articles (samples or an existing collection) into the dashboard
+    # rollups and the category registry
+    rebuild_stats(mongo.db)
+    rebuild_categories(mongo.db)
+
+    print("Database initialization completed successfully!")
+
 
 if __name__ == '__main__':
-    from datetime import datetime
-    init_database()
\ No newline at end of file
+    from app import create_app
+
+    with create_app().app_context():
+        init_database()
@@ -0,0 +1,248 @@
+# instrumentation.py
+# Per-request timing (wall, template render, Mongo commands), Prometheus metrics and a slow-request log
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from pymongo import monitoring
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join('{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                     for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labels, label_values)} {value:g}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0, 0.0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += 1
+            series[2] += value
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        bucket_labels = self.labels + ('le',)
+        with self._lock:
+            for label_values, (counts, count, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f'{self.name}_bucket'
+                                 f'{_format_labels(bucket_labels, label_values + (f"{bound:g}",))} {cumulative}')
+                lines.append(f'{self.name}_bucket{_format_labels(bucket_labels, label_values + ("+Inf",))} {count}')
+                lines.append(f'{self.name}_sum{_format_labels(self.labels, label_values)} {total:.6f}')
+                lines.append(f'{self.name}_count{_format_labels(self.labels, label_values)} {count}')
+        return lines
+
+
+class RequestProfile:
+    """Timings gathered while one sampled request runs."""
+
+    __slots__ = ('mongo_count', 'mongo_seconds', 'commands', 'template_seconds', '_template_starts')
+
+    def __init__(self):
+        self.mongo_count = 0
+        self.mongo_seconds = 0.0
+        self.commands = []
+        self.template_seconds = 0.0
+        self._template_starts = []
+
+
+class _CommandTimer(monitoring.CommandListener):
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.profiler._record_command(event.command_name, event.duration_micros / 1e6, 'ok')
+
+    def failed(self, event):
+        self.profiler._record_command(event.command_name, event.duration_micros / 1e6, 'failed')
+
+
+class RequestProfiler:
+    """Request timing with PyMongo command monitoring and template render signals.
+
+    Every request adds to the request counter and the wall-time histogram
+    (two clock reads). A ``sample_rate`` fraction of requests is profiled in
+    detail: each Mongo command and template render is timed and attributed to
+    the endpoint, and a Server-Timing header is added. Any request slower than
+    ``slow_threshold_ms`` goes into a ring buffer of the last
+    ``slow_log_size`` slow requests, with its breakdown when it was sampled.
+
+    ``listener`` must be passed to the MongoClient (``event_listeners``).
+    Commands issued outside a request (view flushes, image and related-article
+    workers) are still counted by command name. Metrics are per worker
+    process; Prometheus should scrape each worker, or run a single worker.
+    """
+
+    def __init__(self, sample_rate=0.1, slow_threshold_ms=500, slow_log_size=100):
+        self.sample_rate = sample_rate
+        self.slow_threshold_ms = slow_threshold_ms
+        self.listener = _CommandTimer(self)
+        self._slow_requests = deque(maxlen=slow_log_size)
+
+        self.requests = Counter('news_portal_requests_total', 'HTTP requests',
+                                ('endpoint', 'method', 'status'))
+        self.request_seconds = Histogram('news_portal_request_duration_seconds',
+                                         'Request wall time', ('endpoint',))
+        self.sampled_requests = Counter('news_portal_sampled_requests_total',
+                                        'Requests profiled in detail', ('endpoint',))
+        self.request_mongo_commands = Counter('news_portal_request_mongo_commands_total',
+                                              'Mongo commands issued by sampled requests', ('endpoint',))
+        self.request_mongo_seconds = Counter('news_portal_request_mongo_seconds_total',
+                                             'Mongo time of sampled requests', ('endpoint',))
+        self.template_seconds = Histogram('news_portal_template_render_seconds',
+                                          'Template render time (sampled requests)', ('template',))
+        self.mongo_seconds = Histogram('news_portal_mongo_command_duration_seconds',
+                                       'Mongo command duration', ('command', 'outcome'))
+        self.slow_requests_total = Counter('news_portal_slow_requests_total',
+                                           'Requests above the slow threshold', ('endpoint',))
+        self._metrics = [self.requests, self.request_seconds, self.sampled_requests,
+                         self.request_mongo_commands, self.request_mongo_seconds,
+                         self.template_seconds, self.mongo_seconds, self.slow_requests_total]
+
+    def init_app(self, app):
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        before_render_template.connect(self._before_render, app, weak=False)
+        template_rendered.connect(self._after_render, app, weak=False)
+
+    # Request hooks
+
+    def _before_request(self):
+        g.profile_started = time.perf_counter()
+        g.profile = RequestProfile() if random.random() < self.sample_rate else None
+
+    def _after_request(self, response):
+        g.profile_status = response.status_code
+        profile = g.get('profile')
+        if profile is not None:
+            elapsed = time.perf_counter() - g.profile_started
+            response.headers['Server-Timing'] = (
+                f'mongo;dur={profile.mongo_seconds * 1000:.1f};desc="{profile.mongo_count} commands", '
+                f'template;dur={profile.template_seconds * 1000:.1f}, total;dur={elapsed * 1000:.1f}')
+        return response
+
+    def _teardown_request(self, exc):
+        started = g.get('profile_started')
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        endpoint = request.endpoint or 'unmatched'
+        status = g.get('profile_status', 500)
+        self.requests.inc(endpoint, request.method, status)
+        self.request_seconds.observe(elapsed, endpoint)
+
+        profile = g.get('profile')
+        if profile is not None:
+            self.sampled_requests.inc(endpoint)
+            self.request_mongo_commands.inc(endpoint, amount=profile.mongo_count)
+            self.request_mongo_seconds.inc(endpoint, amount=profile.mongo_seconds)
+
+        if elapsed * 1000 >= self.slow_threshold_ms:
+            self.slow_requests_total.inc(endpoint)
+            self._slow_requests.append({
+                'time': datetime.utcnow(),
+                'method': request.method,
+                'path': request.full_path.rstrip('?'),
+                'endpoint': endpoint,
+                'status': status,
+                'total_ms': elapsed * 1000,
+                'sampled': profile is not None,
+                'mongo_count': profile.mongo_count if profile else None,
+                'mongo_ms': profile.mongo_seconds * 1000 if profile else None,
+                'template_ms': profile.template_seconds * 1000 if profile else None,
+                # The slowest commands are the useful part of a long list
+                'commands': sorted(profile.commands, key=lambda command: -command[1])[:10] if profile else [],
+            })
+
+    # Signal and listener callbacks
+
+    def _before_render(self, sender, template, context, **extra):
+        profile = g.get('profile') if has_request_context() else None
+        if profile is not None:
+            profile._template_starts.append(time.perf_counter())
+
+    def _after_render(self, sender, template, context, **extra):
+        profile = g.get('profile') if has_request_context() else None
+        if profile is not None and profile._template_starts:
+            elapsed = time.perf_counter() - profile._template_starts.pop()
+            # A render_template() call made while another template renders counts once, in the outer one
+            if not profile._template_starts:
+                profile.template_seconds += elapsed
+            self.template_seconds.observe(elapsed, template.name or 'string')
+
+    def _record_command(self, command_name, seconds, outcome):
+        if has_request_context():
+            profile = g.get('profile')
+            if profile is None:
+                # Unsampled request: skip the bookkeeping entirely
+                return
+            profile.mongo_count += 1
+            profile.mongo_seconds += seconds
+            profile.commands.append((command_name, seconds * 1000))
+        self.mongo_seconds.observe(seconds, command_name, outcome)
+
+    # Reporting
+
+    def render_metrics(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.expose())
+        return '\n'.join(lines) + '\n'
+
+    def slow_requests(self):
+        """Logged slow requests, newest first."""
+        return list(reversed(self._slow_requests))
+
+    def clear_slow_requests(self):
+        self._slow_requests.clear()
@@ -0,0 +1,97 @@
+# pagination.py
+# Keyset (cursor) pagination over (date_created, _id), newest first
+import base64
+import json
+from datetime import datetime
+
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+
+SORT_KEYS = [('date_created', -1), ('_id', -1)]
+
+
+class Page:
+    def __init__(self, items, next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def encode_cursor(doc):
+    """Opaque token pointing at ``doc``'s position in the (date_created, _id) order."""
+    payload = json.dumps({'d': doc['date_created'].isoformat(), 'i': str(doc['_id'])},
+                         separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return ``(date_created, _id)`` for a token, or None if it is malformed."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload['d']), ObjectId(payload['i'])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        return None
+
+
+def keyset_filter(query, position, op):
+    date_created, object_id = position
+    keyset = {'$or': [
+        {'date_created': {op: date_created}},
+        {'date_created': date_created, '_id': {op: object_id}}
+    ]}
+    return {'$and': [query, keyset]} if query else keyset
+
+
+def count_articles(collection, query, estimated=False):
+    """Total for the pagination header. The estimate reads collection metadata only."""
+    if estimated and not query:
+        return collection.estimated_document_count()
+    return collection.count_documents(query)
+
+
+def paginate(collection, query, per_page, after=None, before=None, projection=None):
+    """Fetch one page of ``query`` using the ``after``/``before`` cursor tokens.
+
+    Only ``per_page + 1`` documents are read whatever the page depth, the
+    extra one telling us whether another page exists. Malformed tokens fall
+    back to the first page.
+    """
+    position = decode_cursor(after) if after else None
+    backwards = False
+    if position is None and before:
+        position = decode_cursor(before)
+        backwards = position is not None
+
+    if position is None:
+        filter_ = query
+        sort = SORT_KEYS
+    elif backwards:
+        filter_ = keyset_filter(query, position, '$gt')
+        sort = [(key, 1) for key, _ in SORT_KEYS]
+    else:
+        filter_ = keyset_filter(query, position, '$lt')
+        sort = SORT_KEYS
+
+    docs = list(collection.find(filter_, projection).sort(sort).limit(per_page + 1))
+    has_more = len(docs) > per_page
+    items = docs[:per_page]
+
+    if backwards:
+        items.reverse()
+        next_cursor = encode_cursor(items[-1]) if items else None
+        prev_cursor = encode_cursor(items[0]) if items and has_more else None
+    else:
+        next_cursor = encode_cursor(items[-1]) if items and has_more else None
+        prev_cursor = encode_cursor(items[0]) if items and position is not None else None
+
+    return Page(items, next_cursor, prev_cursor)
@@ -0,0 +1,264 @@
+# related.py
+# Related articles: TF-IDF vectors over title and content, top-k neighbors stored on each article
+import logging
+import math
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+
+from articles import deleted_since
+from search import TITLE_WEIGHT, tokenize
+
+logger = logging.getLogger(__name__)
+
+VECTOR_FIELDS = {'title': 1, 'content': 1, 'date_updated': 1}
+# Loaded on build: the stored lists tell how good a new article must be to enter them
+BUILD_FIELDS = {**VECTOR_FIELDS, 'related_ids': 1, 'related_score': 1}
+# Neighbors below this cosine similarity are not worth showing
+MIN_SIMILARITY = 0.05
+_EMPTY_VECTOR = (np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32))
+
+
+def term_counts(doc):
+    counts = Counter(tokenize(doc.get('content')))
+    for token in tokenize(doc.get('title')):
+        counts[token] += TITLE_WEIGHT
+    return counts
+
+
+class RelatedIndex:
+    """Finds each article's ``k`` most similar articles and stores their ids as ``related_ids``.
+
+    Articles are L2-normalized TF-IDF vectors, kept sparse (term columns and
+    weights per article) so a worker holds only the non-zero weights. Scores
+    are computed in blocks of ``batch_size`` articles that are made dense
+    just for one matrix product, so memory stays bounded whatever the corpus
+    size. The vocabulary is the ``max_features`` terms found in most articles
+    and, with the IDF weights, is fixed at build time; ``rebuild()`` (the
+    'flask rebuild-related' command) refits it and rewrites every list.
+
+    Adds, edits and deletes are applied incrementally on a single background
+    thread: the changed article gets fresh neighbors, and every article whose
+    list it now enters (or leaves) is recomputed. Each list is stored with
+    ``related_score``, the similarity of its k-th neighbor, which is the bar
+    a changed article has to clear to enter it; a worker that loads the
+    index restores these bars rather than recomputing every list on its
+    first update. ``on_done`` receives the ids of all articles whose lists
+    changed, for cache invalidation. Each worker process loads its own
+    vectors on first use and, before every update, picks up articles written
+    by other workers (by ``date_updated``) and drops the ones they deleted.
+    """
+
+    def __init__(self, k=3, max_features=4096, batch_size=1000):
+        self.k = k
+        self.max_features = max_features
+        self.batch_size = batch_size
+        self._vocabulary = {}
+        self._idf = np.zeros(0, dtype=np.float32)
+        # (columns, weights) per row
+        self._vectors = []
+        # Similarity of each row's k-th neighbor: a changed article enters a list only above it
+        self._kth = np.zeros(0, dtype=np.float32)
+        self._ids = []
+        self._rows = {}
+        self._loaded = False
+        self._synced_until = None
+        self._deletions_until = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='related-articles')
+
+    # Building
+
+    def build(self, collection):
+        """Fit the vocabulary and IDF on every article and vectorize them (nothing is written)."""
+        with self._lock:
+            self._build(collection)
+
+    def rebuild(self, collection):
+        """Rebuild from scratch and store the neighbors of every article. Returns the article count."""
+        with self._lock:
+            self._build(collection)
+            self._store_neighbors(collection, range(len(self._ids)))
+            return len(self._ids)
+
+    def _build(self, collection):
+        self._deletions_until = datetime.utcnow()
+        ids, counts, bars, document_frequency = [], [], [], Counter()
+        synced_until = None
+        for doc in collection.find({}, BUILD_FIELDS).batch_size(self.batch_size):
+            ids.append(doc['_id'])
+            terms = term_counts(doc)
+            counts.append(terms)
+            document_frequency.update(terms.keys())
+            bars.append(self._stored_bar(doc))
+            if doc.get('date_updated') and (synced_until is None or doc['date_updated'] > synced_until):
+                synced_until = doc['date_updated']
+
+        terms = [term for term, _ in document_frequency.most_common(self.max_features)]
+        self._vocabulary = {term: column for column, term in enumerate(terms)}
+        self._idf = np.array([math.log((1 + len(ids)) / (1 + document_frequency[term])) + 1
+                              for term in terms], dtype=np.float32)
+        self._vectors = [self._vectorize(terms_in_doc) for terms_in_doc in counts]
+        self._kth = np.array(bars, dtype=np.float32)
+        self._ids = ids
+        self._rows = {news_id: row for row, news_id in enumerate(ids)}
+        self._synced_until = synced_until
+        self._loaded = True
+
+    def _stored_bar(self, doc):
+        related_ids = doc.get('related_ids')
+        if related_ids is None:
+            # Never processed: its own edit or rebuild() fills its list
+            return np.inf
+        if len(related_ids) < self.k:
+            # Room left in the list
+            return 0
+        # Full lists from before scores were stored only change through rebuild()
+        return doc.get('related_score', np.inf)
+
+    def _vectorize(self, counts):
+        columns, weights = [], []
+        for term, count in counts.items():
+            column = self._vocabulary.get(term)
+            if column is not None:
+                columns.append(column)
+                weights.append((1 + math.log(count)) * self._idf[column])
+        if not columns:
+            return _EMPTY_VECTOR
+        weights = np.array(weights, dtype=np.float32)
+        return np.array(columns, dtype=np.int32), weights / np.linalg.norm(weights)
+
+    def _dense(self, rows):
+        matrix = np.zeros((len(rows), len(self._vocabulary)), dtype=np.float32)
+        for i, row in enumerate(rows):
+            columns, weights = self._vectors[row]
+            matrix[i, columns] = weights
+        return matrix
+
+    def _score_blocks(self, query):
+        """Similarities of the ``query`` rows to every article, one block of ``batch_size`` articles at a time."""
+        for start in range(0, len(self._ids), self.batch_size):
+            yield start, query @ self._dense(range(start, min(start + self.batch_size, len(self._ids)))).T
+
+    # Incremental updates
+
+    def submit_update(self, collection, doc, on_done=None):
+        """Queue an added or edited article (needs ``_id``, ``title`` and ``content``)."""
+        return self._submit(self.update, collection, doc, on_done)
+
+    def submit_remove(self, collection, news_id, on_done=None):
+        return self._submit(self.remove, collection, news_id, on_done)
+
+    def update(self, collection, doc):
+        """Store neighbors for ``doc`` and fix up the lists it enters or leaves. Returns the affected ids."""
+        with self._lock:
+            self._sync(collection)
+            row = self._set_row(doc['_id'], self._vectorize(term_counts(doc)))
+            scores = np.concatenate([block[0] for _, block in self._score_blocks(self._dense([row]))])
+            scores[row] = 0
+            # Articles that should now list it, and those that listed it before the edit
+            entering = np.nonzero((scores > self._kth[:len(self._ids)]) & (scores >= MIN_SIMILARITY))[0]
+            rows = {row, *entering.tolist(), *self._listing_rows(collection, doc['_id'])}
+            return self._store_neighbors(collection, sorted(rows))
+
+    def remove(self, collection, news_id):
+        """Drop a deleted article and refill the lists that showed it. Returns the affected ids."""
+        news_id = ObjectId(news_id)
+        with self._lock:
+            self._sync(collection)
+            self._clear_row(news_id)
+            return self._store_neighbors(collection, self._listing_rows(collection, news_id))
+
+    def _submit(self, method, collection, arg, on_done):
+        future = self._executor.submit(method, collection, arg)
+
+        def _finished(future):
+            if future.exception() is not None:
+                logger.error('Related articles update failed', exc_info=future.exception())
+            elif on_done is not None:
+                on_done(future.result())
+
+        future.add_done_callback(_finished)
+        return future
+
+    def _sync(self, collection):
+        """Load on first use, then apply what other workers wrote or deleted since the last sync."""
+        if not self._loaded:
+            self._build(collection)
+            return
+        for news_id, date_deleted in deleted_since(collection, self._deletions_until):
+            # The deleting worker has already refilled the lists that showed it
+            self._clear_row(news_id)
+            self._deletions_until = max(self._deletions_until, date_deleted)
+        if self._synced_until is None:
+            return
+        for doc in collection.find({'date_updated': {'$gt': self._synced_until}}, VECTOR_FIELDS):
+            self._set_row(doc['_id'], self._vectorize(term_counts(doc)))
+            self._synced_until = max(self._synced_until, doc['date_updated'])
+
+    def _set_row(self, news_id, vector):
+        row = self._rows.get(news_id)
+        if row is None:
+            row = len(self._ids)
+            if row >= len(self._kth):
+                # Grow by doubling so a run of adds does not copy the array each time
+                kth = np.zeros(max(2 * len(self._kth), 16), dtype=np.float32)
+                kth[:len(self._kth)] = self._kth
+                self._kth = kth
+            self._kth[row] = 0
+            self._ids.append(news_id)
+            self._rows[news_id] = row
+            self._vectors.append(vector)
+        else:
+            self._vectors[row] = vector
+        return row
+
+    def _clear_row(self, news_id):
+        row = self._rows.get(news_id)
+        if row is not None:
+            # An empty vector never scores above MIN_SIMILARITY; rebuild() compacts it away
+            self._vectors[row] = _EMPTY_VECTOR
+
+    def _listing_rows(self, collection, news_id):
+        return [self._rows[doc['_id']] for doc in collection.find({'related_ids': news_id}, {'_id': 1})
+                if doc['_id'] in self._rows]
+
+    def _store_neighbors(self, collection, rows):
+        """Recompute and write the neighbor lists of ``rows``, ``batch_size`` at a time. Returns their ids."""
+        rows = list(rows)
+        for start in range(0, len(rows), self.batch_size):
+            self._store_batch(collection, np.asarray(rows[start:start + self.batch_size], dtype=np.intp))
+        return [self._ids[row] for row in rows]
+
+    def _store_batch(self, collection, rows):
+        query = self._dense(rows)
+        # Running top k of every row, merged block by block
+        best_scores = np.zeros((len(rows), 0), dtype=np.float32)
+        best_columns = np.zeros((len(rows), 0), dtype=np.intp)
+        for start, block in self._score_blocks(query):
+            inside = np.nonzero((rows >= start) & (rows < start + block.shape[1]))[0]
+            block[inside, rows[inside] - start] = 0
+            scores = np.concatenate([best_scores, block], axis=1)
+            columns = np.concatenate([best_columns, np.broadcast_to(
+                np.arange(start, start + block.shape[1]), block.shape)], axis=1)
+            k = min(self.k, scores.shape[1])
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, top, axis=1)
+            best_columns = np.take_along_axis(columns, top, axis=1)
+
+        requests = []
+        for i, row in enumerate(rows):
+            ranked = np.argsort(-best_scores[i])
+            neighbors = [(best_columns[i, j], float(best_scores[i, j])) for j in ranked
+                         if best_scores[i, j] >= MIN_SIMILARITY]
+            self._kth[row] = neighbors[-1][1] if len(neighbors) == self.k else 0
+            update = {'related_ids': [self._ids[column] for column, _ in neighbors],
+                      'related_score': float(self._kth[row])}
+            requests.append(UpdateOne({'_id': self._ids[row]}, {'$set': update}))
+        if requests:
+            collection.bulk_write(requests, ordered=False)
@@ -0,0 +1,205 @@
+# response_cache.py
+# Full-page response cache with tag invalidation and conditional GET (ETag / Last-Modified)
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import g, make_response, request, session
+
+
+class CachedPage:
+    __slots__ = ('body', 'mimetype', 'etag', 'last_modified', 'tags', 'expires_at')
+
+    def __init__(self, body, mimetype, tags, ttl):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+        self.tags = tuple(tags)
+        self.expires_at = time.time() + ttl
+
+    @property
+    def size(self):
+        return len(self.body)
+
+
+class MemoryCacheBackend:
+    """Per-process LRU, bounded by entry count and total body bytes."""
+
+    def __init__(self, max_entries=1000, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.time():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            for tag in entry.tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate_tags(self, tags):
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class RedisCacheBackend:
+    """Cache shared by every worker. Entries expire through Redis TTLs; tags are Redis sets."""
+
+    def __init__(self, client, prefix='news_portal:page:'):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        import redis
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def get(self, key):
+        data = self.client.get(self.prefix + key)
+        return pickle.loads(data) if data is not None else None
+
+    def set(self, key, entry):
+        ttl = max(1, int(entry.expires_at - time.time()))
+        pipe = self.client.pipeline()
+        pipe.setex(self.prefix + key, ttl, pickle.dumps(entry, pickle.HIGHEST_PROTOCOL))
+        for tag in entry.tags:
+            pipe.sadd(self.prefix + 'tag:' + tag, key)
+            pipe.expire(self.prefix + 'tag:' + tag, ttl)
+        pipe.execute()
+
+    def invalidate_tags(self, tags):
+        for tag in tags:
+            tag_key = self.prefix + 'tag:' + tag
+            keys = self.client.smembers(tag_key)
+            pipe = self.client.pipeline()
+            for key in keys:
+                pipe.delete(self.prefix + (key.decode() if isinstance(key, bytes) else key))
+            pipe.delete(tag_key)
+            pipe.execute()
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+
+def create_cache_backend(url=None, max_entries=1000, max_bytes=64 * 1024 * 1024):
+    if url:
+        return RedisCacheBackend.from_url(url)
+    return MemoryCacheBackend(max_entries=max_entries, max_bytes=max_bytes)
+
+
+def cached_view(get_cache, tags=None, ttl=None, on_request=None):
+    """``ResponseCache.cached`` with the cache looked up per request, by ``get_cache()``."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**view_args):
+            if on_request is not None:
+                on_request(**view_args)
+
+            cache = get_cache()
+            if not cache.enabled or request.method != 'GET' or '_flashes' in session:
+                return view(**view_args)
+
+            key = cache._make_key()
+            entry = cache.backend.get(key)
+            if entry is None:
+                g.response_cache_tags = list(tags(**view_args) if callable(tags) else tags or [])
+                response = make_response(view(**view_args))
+                if response.status_code != 200 or response.direct_passthrough:
+                    return response
+                entry = CachedPage(response.get_data(), response.mimetype,
+                                   g.response_cache_tags, ttl or cache.default_ttl)
+                cache.backend.set(key, entry)
+                response.headers['X-Cache'] = 'MISS'
+            else:
+                response = make_response(entry.body)
+                response.mimetype = entry.mimetype
+                response.headers['X-Cache'] = 'HIT'
+
+            response.set_etag(entry.etag)
+            response.last_modified = entry.last_modified
+            response.cache_control.no_cache = True
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+
+class ResponseCache:
+    """Caches rendered GET responses keyed by endpoint, path and query args.
+
+    Views declare tags up front (``tags=``, a list or a callable receiving the
+    view args) or while rendering via ``tag()``; admin writes call
+    ``invalidate(*tags)``. Every cacheable response carries an ETag and
+    Last-Modified and is answered with 304 when the client already has it.
+    Requests with pending flash messages bypass the cache so the messages are
+    rendered and never stored.
+    """
+
+    def __init__(self, backend, default_ttl=60):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.enabled = True
+
+    def cached(self, tags=None, ttl=None, on_request=None):
+        """Decorator. ``on_request(**view_args)`` runs on hits and misses alike."""
+        return cached_view(lambda: self, tags, ttl, on_request)
+
+    def tag(self, *tags):
+        """Attach tags to the response being rendered (no-op outside a cached view)."""
+        if 'response_cache_tags' in g:
+            g.response_cache_tags.extend(tags)
+
+    def invalidate(self, *tags):
+        self.backend.invalidate_tags([tag for tag in tags if tag])
+
+    def clear(self):
+        self.backend.clear()
+
+    @staticmethod
+    def _make_key():
+        args = '&'.join(f'{name}={value}' for name, value in sorted(request.args.items(multi=True)))
+        return f'{request.endpoint}:{request.path}?{args}'
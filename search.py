@@ -0,0 +1,182 @@
+# search.py
+# In-memory inverted index for /api/search: tokenized, title-boosted, prefix-aware
+import bisect
+import heapq
+import math
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+
+from articles import deleted_since
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+STOPWORDS = frozenset({'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in',
+                       'is', 'it', 'of', 'on', 'or', 'that', 'the', 'to', 'was', 'with'})
+
+TITLE_WEIGHT = 3.0
+MAX_PREFIX_EXPANSIONS = 50
+INDEX_FIELDS = {'title': 1, 'content': 1, 'date_created': 1, 'date_updated': 1}
+
+
+def tokenize(text):
+    """Lowercase word tokens. Input is only ever split, never compiled into a regex."""
+    return [token for token in TOKEN_RE.findall((text or '').lower()) if token not in STOPWORDS]
+
+
+class SearchIndex:
+    """Inverted index over article titles and content.
+
+    Postings map each term to ``{news_id: weight}`` where a title occurrence
+    counts ``TITLE_WEIGHT`` times a content one. The last query token is
+    matched as a prefix so results follow the user while they type; a short
+    prefix stands for its ``MAX_PREFIX_EXPANSIONS`` completions found in the
+    most documents. Results for recent queries are kept in an LRU cache that
+    is cleared whenever the index changes.
+
+    Each worker process holds its own index. ``ensure_fresh()`` loads it on
+    first use and afterwards picks up articles added or edited through other
+    workers (by ``date_updated``), and drops the ones they deleted (from the
+    deletion records), every ``refresh_interval`` seconds.
+    """
+
+    def __init__(self, cache_size=256, refresh_interval=60):
+        self.cache_size = cache_size
+        self.refresh_interval = refresh_interval
+        self._postings = defaultdict(dict)
+        self._doc_terms = {}
+        self._doc_dates = {}
+        self._vocabulary = []
+        self._cache = OrderedDict()
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._synced_until = None
+        self._deletions_until = None
+        self._next_refresh = 0
+
+    # Maintenance
+
+    def ensure_fresh(self, collection):
+        if self._loaded and time.monotonic() < self._next_refresh:
+            return
+        with self._lock:
+            if self._loaded and time.monotonic() < self._next_refresh:
+                return
+            if self._deletions_until is None:
+                # Anything deleted before the first load is simply not loaded
+                self._deletions_until = datetime.utcnow()
+            else:
+                for news_id, date_deleted in deleted_since(collection, self._deletions_until):
+                    self.remove(news_id)
+                    self._deletions_until = max(self._deletions_until, date_deleted)
+            query = {}
+            if self._synced_until is not None:
+                query = {'date_updated': {'$gte': self._synced_until}}
+            for doc in collection.find(query, INDEX_FIELDS).batch_size(1000):
+                self.add(doc)
+            self._loaded = True
+            self._next_refresh = time.monotonic() + self.refresh_interval
+
+    def add(self, doc):
+        """Index ``doc``, replacing any earlier version of it."""
+        news_id = str(doc['_id'])
+        weights = defaultdict(float)
+        for token in tokenize(doc.get('title')):
+            weights[token] += TITLE_WEIGHT
+        for token in tokenize(doc.get('content')):
+            weights[token] += 1.0
+
+        with self._lock:
+            self._remove_locked(news_id)
+            for term, weight in weights.items():
+                postings = self._postings[term]
+                if not postings:
+                    bisect.insort(self._vocabulary, term)
+                postings[news_id] = weight
+            self._doc_terms[news_id] = tuple(weights)
+            self._doc_dates[news_id] = doc.get('date_created')
+            updated = doc.get('date_updated')
+            if updated is not None and (self._synced_until is None or updated > self._synced_until):
+                self._synced_until = updated
+            self._cache.clear()
+
+    def remove(self, news_id):
+        with self._lock:
+            self._remove_locked(str(news_id))
+            self._cache.clear()
+
+    def _remove_locked(self, news_id):
+        for term in self._doc_terms.pop(news_id, ()):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(news_id, None)
+            if not postings:
+                del self._postings[term]
+                index = bisect.bisect_left(self._vocabulary, term)
+                if index < len(self._vocabulary) and self._vocabulary[index] == term:
+                    del self._vocabulary[index]
+        self._doc_dates.pop(news_id, None)
+
+    # Querying
+
+    def search(self, query, limit=10):
+        """Return up to ``limit`` news ids (as strings), best match first."""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        key = (' '.join(tokens), limit)
+
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+            scores = None
+            for position, token in enumerate(tokens):
+                if position == len(tokens) - 1:
+                    terms = self._expand_prefix(token)
+                else:
+                    terms = [token] if token in self._postings else []
+                token_scores = self._score_terms(terms)
+                if scores is None:
+                    scores = token_scores
+                else:
+                    # Every token has to match
+                    scores = {news_id: score + token_scores[news_id]
+                              for news_id, score in scores.items() if news_id in token_scores}
+                if not scores:
+                    break
+
+            ranked = sorted(scores or {}, key=lambda news_id: (scores[news_id], self._sort_date(news_id)),
+                            reverse=True)[:limit]
+
+            self._cache[key] = ranked
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return ranked
+
+    def _expand_prefix(self, prefix):
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + '\U0010ffff', start)
+        # The most common completions, not the alphabetically first ones
+        return heapq.nlargest(MAX_PREFIX_EXPANSIONS, self._vocabulary[start:end],
+                              key=lambda term: len(self._postings[term]))
+
+    def _score_terms(self, terms):
+        """Best TF-IDF score per document over the given (alternative) terms."""
+        total_docs = max(len(self._doc_terms), 1)
+        scores = {}
+        for term in terms:
+            postings = self._postings[term]
+            idf = math.log(1 + total_docs / len(postings))
+            for news_id, weight in postings.items():
+                score = (1 + math.log(weight)) * idf
+                if score > scores.get(news_id, 0):
+                    scores[news_id] = score
+        return scores
+
+    def _sort_date(self, news_id):
+        date = self._doc_dates.get(news_id)
+        return date.timestamp() if date is not None else 0
@@ -0,0 +1,263 @@
+# services.py
+# The shared objects behind the routes (database clients, caches, background workers), built on first use
+#
+# create_app() attaches one Services to the app. Nothing here connects to
+# MongoDB, starts a thread or imports a heavy module (numpy, Pillow, Motor,
+# gridfs) until a request or command first needs that service, so workers
+# boot quickly and each builds its own clients after the fork. Blueprint
+# modules import the proxies at the bottom, which resolve to the current app's
+# instances; background threads are handed the real objects.
+import threading
+
+from flask import current_app
+from werkzeug.local import LocalProxy
+
+from response_cache import ResponseCache, cached_view, create_cache_backend
+
+EXTENSION_NAME = 'news_portal'
+
+
+def service(build):
+    """Property that calls ``build(services)`` on first access, once per app."""
+    name = build.__name__
+
+    def get(self):
+        instance = self._instances.get(name)
+        if instance is None:
+            # Re-entrant: building one service can build the ones it depends on
+            with self._lock:
+                instance = self._instances.get(name)
+                if instance is None:
+                    instance = self._instances[name] = build(self)
+        return instance
+
+    return property(get, doc=build.__doc__)
+
+
+class Services:
+    def __init__(self, app):
+        self.app = app
+        self.config = app.config
+        self._instances = {}
+        self._lock = threading.RLock()
+
+    def built(self, name):
+        """The service if it has been built, else None (for shutdown and cache clearing)."""
+        return self._instances.get(name)
+
+    # Cache invalidation. Methods rather than view helpers: background workers call them
+    # back (``on_done``) outside any app context.
+
+    def invalidate_article_pages(self, news_ids):
+        """Drop cached detail pages whose related list was recomputed."""
+        self.response_cache.invalidate(*(f'news:{news_id}' for news_id in news_ids))
+
+    def invalidate_news_caches(self, *categories, news_id=None, date_created=None):
+        """Drop cached data and pages affected by an article write."""
+        self.homepage_cache.invalidate()
+        self.response_cache.invalidate('homepage', 'news-list',
+                                       *(f'category:{category}' for category in categories),
+                                       f'news:{news_id}' if news_id else None)
+        self.feeds.invalidate(categories, date_created)
+
+    @service
+    def profiler(self):
+        """Request timing, Mongo command monitoring and the slow-request log."""
+        from instrumentation import RequestProfiler
+        return RequestProfiler(sample_rate=self.config['PROFILE_SAMPLE_RATE'],
+                               slow_threshold_ms=self.config['SLOW_REQUEST_MS'],
+                               slow_log_size=self.config['SLOW_REQUEST_LOG_SIZE'])
+
+    @service
+    def static_assets(self):
+        """Fingerprinted, precompressed static assets (built by 'flask build-assets')."""
+        from assets import StaticAssets
+        return StaticAssets(upload_max_age=self.config['UPLOAD_CACHE_MAX_AGE'])
+
+    @service
+    def mongo(self):
+        """PyMongo client; pool settings come from MONGO_CLIENT_OPTIONS."""
+        from flask_pymongo import PyMongo
+        return PyMongo(self.app, event_listeners=[self.profiler.listener], **self.config['MONGO_CLIENT_OPTIONS'])
+
+    @service
+    def async_mongo(self):
+        """Motor client used by the async views when ASYNC_MODE is on.
+
+        Its commands run on its own loop thread, so they are timed but not attributed to a request.
+        """
+        from async_mongo import AsyncMongo
+        async_mongo = AsyncMongo()
+        async_mongo.init_app(self.app, event_listeners=[self.profiler.listener], **self.config['MONGO_CLIENT_OPTIONS'])
+        return async_mongo
+
+    @service
+    def homepage_cache(self):
+        """Shared homepage sections, invalidated by the admin write routes."""
+        from homepage import HomepageCache
+        return HomepageCache(ttl=self.config['HOMEPAGE_CACHE_TTL'])
+
+    @service
+    def category_registry(self):
+        """Categories with their article counts and newest article dates, read from memory."""
+        from categories import CategoryRegistry
+        category_registry = CategoryRegistry(ttl=self.config['CATEGORY_CACHE_TTL'])
+        category_registry.init_db(lambda: self.mongo.db)
+        return category_registry
+
+    @service
+    def trending(self):
+        """Trending articles from time-decayed view counts, read from memory."""
+        from trending import TrendingTracker
+        trending = TrendingTracker(half_life=self.config['TRENDING_HALF_LIFE'], size=self.config['TRENDING_SIZE'],
+                                   sync_interval=self.config['TRENDING_SYNC_INTERVAL'])
+        trending.init_db(lambda: self.mongo.db)
+        return trending
+
+    @service
+    def view_counter(self):
+        """Article views, buffered and written in bulk by a background thread."""
+        from stats import record_views
+        from view_counter import ViewCounter, create_view_buffer
+        # Built first so its exit handler, registered first, runs after the view counter's final flush
+        trending = self.trending
+
+        def record_flushed(counts):
+            # Trending only scores articles the rollups found, so made-up ids leave no state behind
+            matched = record_views(self.mongo.db, counts)
+            if matched:
+                trending.record(matched)
+
+        view_counter = ViewCounter(create_view_buffer(self.config['VIEW_BUFFER_URL']),
+                                   flush_interval=self.config['VIEW_FLUSH_INTERVAL'],
+                                   flush_threshold=self.config['VIEW_FLUSH_THRESHOLD'])
+        view_counter.init_collection(lambda: self.mongo.db.news)
+        view_counter.add_flush_listener(record_flushed)
+        return view_counter
+
+    @service
+    def upload_store(self):
+        """Uploads: content-addressed and deduplicated, deleted in the background once unreferenced."""
+        from storage import UploadStore, create_backend
+        upload_store = UploadStore(create_backend(self.config['UPLOAD_STORAGE_URL'], self.config['UPLOAD_FOLDER'],
+                                                  endpoint_url=self.config['S3_ENDPOINT_URL'],
+                                                  public_url=self.config['UPLOAD_PUBLIC_URL']))
+        upload_store.init_collection(lambda: self.mongo.db.uploads)
+        return upload_store
+
+    @service
+    def image_pipeline(self):
+        """Resized image variants, generated off the request thread."""
+        from images import ImagePipeline
+        return ImagePipeline(self.upload_store, max_workers=self.config['IMAGE_WORKERS'])
+
+    @service
+    def contact_queue(self):
+        """Contact messages, written in batches off the request thread."""
+        from contacts import ContactQueue
+        contact_queue = ContactQueue(maxsize=self.config['CONTACT_QUEUE_SIZE'],
+                                     batch_size=self.config['CONTACT_BATCH_SIZE'],
+                                     flush_interval=self.config['CONTACT_FLUSH_INTERVAL'],
+                                     put_timeout=self.config['CONTACT_QUEUE_TIMEOUT'])
+        contact_queue.init_collection(lambda: self.mongo.db.contacts)
+        return contact_queue
+
+    @service
+    def contact_limiter(self):
+        """Contact submissions per client IP."""
+        from contacts import RateLimiter
+        return RateLimiter(rate=self.config['CONTACT_RATE_PER_HOUR'] / 3600, burst=self.config['CONTACT_RATE_BURST'])
+
+    @service
+    def contact_duplicates(self):
+        """Recently received contact messages, to drop repeats."""
+        from contacts import DuplicateFilter
+        return DuplicateFilter(window=self.config['CONTACT_DUPLICATE_WINDOW'])
+
+    @service
+    def sessions(self):
+        """Server-side session store behind the session cookie (app.session_interface)."""
+        from sessions import ServerSessionInterface, create_session_store
+        return ServerSessionInterface(create_session_store(self.config['SESSION_STORE_URL'],
+                                                           self.config['SESSION_DIR'], self.config['SESSION_TTL']))
+
+    @service
+    def admin_accounts(self):
+        """Whether an admin account exists, cached so the login and signup pages skip the query."""
+        from auth import AdminAccounts
+        admin_accounts = AdminAccounts(ttl=self.config['ADMIN_EXISTS_TTL'])
+        admin_accounts.init_collection(lambda: self.mongo.db.admin_users)
+        return admin_accounts
+
+    @service
+    def login_throttle(self):
+        """Login attempts per client IP and failures per username, checked before hashing."""
+        from auth import LoginThrottle
+        return LoginThrottle(ip_rate=self.config['LOGIN_IP_PER_HOUR'] / 3600, ip_burst=self.config['LOGIN_IP_BURST'],
+                             user_rate=self.config['LOGIN_USER_PER_HOUR'] / 3600,
+                             user_burst=self.config['LOGIN_USER_BURST'])
+
+    @service
+    def response_cache(self):
+        """Rendered frontend pages, invalidated by tag when articles change."""
+        return ResponseCache(create_cache_backend(self.config['RESPONSE_CACHE_URL'],
+                                                  max_entries=self.config['RESPONSE_CACHE_MAX_ENTRIES'],
+                                                  max_bytes=self.config['RESPONSE_CACHE_MAX_BYTES']),
+                             default_ttl=self.config['RESPONSE_CACHE_TTL'])
+
+    @service
+    def search_index(self):
+        """Full-text search index, kept current by the admin write routes."""
+        from search import SearchIndex
+        return SearchIndex(cache_size=self.config['SEARCH_CACHE_SIZE'],
+                           refresh_interval=self.config['SEARCH_REFRESH_INTERVAL'])
+
+    @service
+    def related_index(self):
+        """Related articles: neighbor lists stored on each article, updated in the background."""
+        from related import RelatedIndex
+        return RelatedIndex(k=self.config['RELATED_COUNT'], max_features=self.config['RELATED_MAX_FEATURES'])
+
+    @service
+    def feeds(self):
+        """Sitemap and RSS/Atom feeds: files shared by all workers, rebuilt per shard or feed after writes."""
+        from feeds import Feeds
+        site_url = self.config['SITE_URL']
+        if not site_url and self.config['SERVER_NAME']:
+            site_url = f"{self.config['PREFERRED_URL_SCHEME']}://{self.config['SERVER_NAME']}"
+        return Feeds(self.config['FEED_CACHE_DIR'], site_url=site_url,
+                     site_name=self.config['SITE_NAME'], feed_size=self.config['FEED_SIZE'])
+
+
+def get_services(app=None):
+    return (app or current_app).extensions[EXTENSION_NAME]
+
+
+def _proxy(name):
+    return LocalProxy(lambda: getattr(get_services(), name))
+
+
+profiler = _proxy('profiler')
+static_assets = _proxy('static_assets')
+mongo = _proxy('mongo')
+async_mongo = _proxy('async_mongo')
+homepage_cache = _proxy('homepage_cache')
+category_registry = _proxy('category_registry')
+trending = _proxy('trending')
+view_counter = _proxy('view_counter')
+upload_store = _proxy('upload_store')
+image_pipeline = _proxy('image_pipeline')
+contact_queue = _proxy('contact_queue')
+contact_limiter = _proxy('contact_limiter')
+contact_duplicates = _proxy('contact_duplicates')
+admin_accounts = _proxy('admin_accounts')
+login_throttle = _proxy('login_throttle')
+response_cache = _proxy('response_cache')
+search_index = _proxy('search_index')
+related_index = _proxy('related_index')
+feeds = _proxy('feeds')
+
+
+def cached(tags=None, ttl=None, on_request=None):
+    """``ResponseCache.cached`` for blueprint views, which are decorated before any app exists."""
+    return cached_view(lambda: get_services().response_cache, tags, ttl, on_request)
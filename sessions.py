@@ -0,0 +1,236 @@
+# sessions.py
+# Server-side sessions: the cookie carries a random id, the session data lives in a store with a TTL
+import hashlib
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSession, SessionInterface
+
+# Same serializer as Flask's cookie sessions, so tuples (flashed messages), datetimes etc. round-trip
+serializer = TaggedJSONSerializer()
+SID_LENGTH = 43  # secrets.token_urlsafe(32)
+
+
+class ServerSession(SecureCookieSession):
+    """A session dict that remembers its id. ``regenerate()`` moves it to a new id when saved."""
+
+    def __init__(self, initial=None, sid=None, expires_at=None):
+        super().__init__(initial)
+        self.sid = sid
+        self.expires_at = expires_at
+        self.regenerated = False
+
+    def regenerate(self):
+        # Called at login and logout, so an id seen before either cannot be used after it
+        self.regenerated = True
+        self.modified = True
+
+
+class MemorySessionStore:
+    """Sessions in this process only: for a single worker (or sticky load balancing).
+
+    Every entry lives ``ttl`` seconds after its last write, so the dict stays
+    ordered by expiry and expired entries are evicted from its front.
+    """
+
+    def __init__(self, ttl, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return ``(data, expires_at)``, or None for an unknown or expired session."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.time():
+                return None
+            return entry
+
+    def set(self, key, data):
+        now = time.time()
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (data, now + self.ttl)
+            while self._entries:
+                oldest, (_, expires_at) = next(iter(self._entries.items()))
+                if expires_at > now and len(self._entries) <= self.max_entries:
+                    break
+                del self._entries[oldest]
+
+    def touch(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            self.set(key, entry[0])
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class FileSessionStore:
+    """One file per session in ``directory``, shared by the workers of a host.
+
+    A session expires ``ttl`` seconds after its file was last written or
+    touched; expired files are removed by a sweep at most every
+    ``sweep_interval`` seconds per worker.
+    """
+
+    def __init__(self, directory, ttl, sweep_interval=300):
+        self.directory = directory
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._last_sweep = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                expires_at = os.fstat(f.fileno()).st_mtime + self.ttl
+                if expires_at <= time.time():
+                    return None
+                return f.read(), expires_at
+        except FileNotFoundError:
+            return None
+
+    def set(self, key, data):
+        # Write then rename, so a reader in another worker never sees a partial file
+        tmp_path = f'{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(key))
+        self._maybe_sweep()
+
+    def touch(self, key):
+        try:
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _maybe_sweep(self):
+        if time.monotonic() - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = time.monotonic()
+        cutoff = time.time() - self.ttl
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+
+class RedisSessionStore:
+    """Sessions shared by every worker on every host; Redis expires them."""
+
+    def __init__(self, client, ttl, prefix='news_portal:session:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        import redis
+        return cls(redis.Redis.from_url(url, decode_responses=True), **kwargs)
+
+    def get(self, key):
+        pipe = self.client.pipeline()
+        pipe.get(self.prefix + key)
+        pipe.ttl(self.prefix + key)
+        data, ttl = pipe.execute()
+        return (data, time.time() + ttl) if data is not None else None
+
+    def set(self, key, data):
+        self.client.setex(self.prefix + key, self.ttl, data)
+
+    def touch(self, key):
+        self.client.expire(self.prefix + key, self.ttl)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+
+def create_session_store(url, directory, ttl):
+    """Pick a store from SESSION_STORE_URL: None means files in ``directory``."""
+    if url and url.startswith(('redis://', 'rediss://')):
+        return RedisSessionStore.from_url(url, ttl=ttl)
+    if url == 'memory://':
+        return MemorySessionStore(ttl)
+    return FileSessionStore(directory, ttl)
+
+
+class ServerSessionInterface(SessionInterface):
+    """Flask session interface over one of the stores above.
+
+    Requests without a session cookie (every anonymous page view) never touch
+    the store, and a session is only written when it changes; an unchanged
+    one is touched to extend its TTL once less than half of it is left.
+    Stores are keyed by a hash of the id, so their keys (file names, Redis
+    keys) cannot be replayed as cookies.
+    """
+
+    session_class = ServerSession
+
+    def __init__(self, store):
+        self.store = store
+
+    @staticmethod
+    def _key(sid):
+        return hashlib.sha256(sid.encode()).hexdigest()
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid and len(sid) == SID_LENGTH:
+            entry = self.store.get(self._key(sid))
+            if entry is not None:
+                data, expires_at = entry
+                return self.session_class(serializer.loads(data), sid=sid, expires_at=expires_at)
+        return self.session_class()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if session.sid and (session.regenerated or (not session and session.modified)):
+            self.store.delete(self._key(session.sid))
+            session.sid = None
+
+        if not session:
+            if session.modified:
+                response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                       samesite=samesite, httponly=httponly)
+                response.vary.add('Cookie')
+            return
+
+        if session.sid is None or session.modified:
+            session.sid = session.sid or secrets.token_urlsafe(32)
+            self.store.set(self._key(session.sid), serializer.dumps(dict(session)))
+        elif session.expires_at - time.time() < self.store.ttl / 2:
+            self.store.touch(self._key(session.sid))
+
+        if session.modified or self.should_set_cookie(app, session):
+            response.set_cookie(name, session.sid, expires=self.get_expiration_time(app, session),
+                                httponly=httponly, domain=domain, path=path, secure=secure, samesite=samesite)
+            response.vary.add('Cookie')
@@ -98,7 +98,7 @@ function displaySearchResults(results) {
         resultItem.className = 'search-result-item';
         resultItem.innerHTML = `
             <h6 class="mb-1">${result.title}</h6>
-            <p class="small text-muted mb-0">${result.content.substring(0, 80)}...</p>
+            <p class="small text-muted mb-0">${(result.excerpt || '').substring(0, 80)}...</p>
             <small class="text-primary">${result.category} • ${new Date(result.date_created).toLocaleDateString()}</small>
         `;
         
@@ -149,8 +149,9 @@ function initCategoryFiltering() {
                 currentUrl.searchParams.delete('category');
             }
             
-            // Reset to page 1 when changing category
-            currentUrl.searchParams.delete('page');
+            // Reset to the first page when changing category
+            currentUrl.searchParams.delete('after');
+            currentUrl.searchParams.delete('before');
             
             window.location.href = currentUrl.toString();
         });
@@ -0,0 +1,195 @@
+# stats.py
+# Pre-aggregated dashboard statistics kept in the news_stats collection
+#
+# Documents:
+#   {_id: 'totals', views, with_images, built_at}
+#   {_id: 'category:<name>', kind: 'category', category, views}
+#   {_id: 'hour:YYYYMMDDHH', kind: 'hour', start, views, expire_at}
+#   {_id: 'day:YYYYMMDD', kind: 'day', start, views}
+#
+# Article counts are not kept here: the category registry (categories.py) holds them.
+# built_at is only written by rebuild_stats, so the incremental upserts below
+# cannot make an unbuilt database look built.
+import logging
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+from pymongo import ReplaceOne, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+TOTALS_ID = 'totals'
+HOURLY_RETENTION = timedelta(days=7)
+
+
+def _category_id(category):
+    return f'category:{category}'
+
+
+def _hour_start(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _hour_id(moment):
+    return moment.strftime('hour:%Y%m%d%H')
+
+
+def _day_id(moment):
+    return moment.strftime('day:%Y%m%d')
+
+
+def _has_image(news):
+    return 1 if news.get('image') else 0
+
+
+def _category_update(category, views=0):
+    return UpdateOne(
+        {'_id': _category_id(category)},
+        {'$inc': {'views': views},
+         '$setOnInsert': {'kind': 'category', 'category': category}},
+        upsert=True
+    )
+
+
+def _totals_update(views=0, with_images=0):
+    return UpdateOne({'_id': TOTALS_ID},
+                     {'$inc': {'views': views, 'with_images': with_images}},
+                     upsert=True)
+
+
+# Incremental updates, called from the write paths
+
+def record_article_added(db, news):
+    db.news_stats.bulk_write([
+        _totals_update(views=news.get('views', 0), with_images=_has_image(news)),
+        _category_update(news.get('category'), views=news.get('views', 0))
+    ], ordered=False)
+
+
+def record_article_updated(db, old, new):
+    operations = []
+    image_change = _has_image(new) - _has_image(old)
+    if image_change:
+        operations.append(_totals_update(with_images=image_change))
+    if new.get('category') != old.get('category'):
+        views = old.get('views', 0)
+        operations.append(_category_update(old.get('category'), views=-views))
+        operations.append(_category_update(new.get('category'), views=views))
+    if operations:
+        db.news_stats.bulk_write(operations, ordered=False)
+
+
+def record_article_removed(db, news):
+    views = news.get('views', 0)
+    db.news_stats.bulk_write([
+        _totals_update(views=-views, with_images=-_has_image(news)),
+        _category_update(news.get('category'), views=-views)
+    ], ordered=False)
+
+
+def record_views(db, counts, now=None):
+    """Add a batch of flushed view counts (``{news_id: views}``) to the rollups.
+
+    Returns the counts of the articles that exist, for listeners that must
+    not keep state for made-up ids.
+    """
+    now = now or datetime.utcnow()
+
+    # Views of articles deleted before the flush (or never created) are dropped, as bulk_write drops them
+    per_category = {}
+    matched = {}
+    for news in db.news.find({'_id': {'$in': [ObjectId(news_id) for news_id in counts]}},
+                             {'category': 1}):
+        news_id = str(news['_id'])
+        matched[news_id] = counts[news_id]
+        category = news.get('category')
+        per_category[category] = per_category.get(category, 0) + counts[news_id]
+    total = sum(per_category.values())
+    if not total:
+        return matched
+
+    hour = _hour_start(now)
+    operations = [
+        _totals_update(views=total),
+        UpdateOne({'_id': _hour_id(now)},
+                  {'$inc': {'views': total},
+                   '$setOnInsert': {'kind': 'hour', 'start': hour,
+                                    'expire_at': hour + HOURLY_RETENTION}},
+                  upsert=True),
+        UpdateOne({'_id': _day_id(now)},
+                  {'$inc': {'views': total},
+                   '$setOnInsert': {'kind': 'day', 'start': hour.replace(hour=0)}},
+                  upsert=True)
+    ]
+    operations.extend(_category_update(category, views=views) for category, views in per_category.items())
+    db.news_stats.bulk_write(operations, ordered=False)
+    return matched
+
+
+# Reading
+
+def read_dashboard_stats(db, categories, now=None):
+    """Everything the dashboard cards need, from a few small documents.
+
+    Article counts come from ``categories``, the app's CategoryRegistry. The
+    rollups are built by 'flask init-db' and 'flask rebuild-stats', never here.
+    """
+    now = now or datetime.utcnow()
+    hour_ids = [_hour_id(now - timedelta(hours=offset)) for offset in range(24)]
+
+    docs = list(db.news_stats.find({'$or': [
+        {'_id': TOTALS_ID},
+        {'kind': 'category'},
+        {'_id': {'$in': hour_ids}}
+    ]}))
+    totals = next((doc for doc in docs if doc['_id'] == TOTALS_ID), {})
+    if not totals.get('built_at'):
+        logger.warning("news_stats has not been built; run 'flask rebuild-stats' for correct view totals")
+    views = {doc['category']: doc['views'] for doc in docs if doc.get('kind') == 'category'}
+    category_stats = sorted(
+        ({'_id': category, 'count': count, 'total_views': views.get(category, 0)}
+         for category, count in categories.counts().items() if count > 0),
+        key=lambda stat: stat['count'], reverse=True
+    )
+    return {
+        'total_news': categories.count(),
+        'total_views': totals.get('views', 0),
+        'news_with_images': totals.get('with_images', 0),
+        'category_stats': category_stats,
+        'today_views': sum(doc['views'] for doc in docs if doc.get('kind') == 'hour')
+    }
+
+
+# Rebuild
+
+def rebuild_stats(db):
+    """Recompute the totals and per-category view rollups from the news collection.
+
+    View events are not stored individually, so the hourly and daily buckets
+    cannot be reconstructed and are left untouched. Each category document is
+    replaced in place rather than dropped and re-inserted, so an increment
+    from a concurrent write path lands on a document that exists.
+    """
+    categories = list(db.news.aggregate([
+        {'$group': {
+            '_id': '$category',
+            'views': {'$sum': '$views'},
+            'with_images': {'$sum': {'$cond': [{'$ifNull': ['$image', False]}, 1, 0]}}
+        }}
+    ]))
+
+    if categories:
+        db.news_stats.bulk_write([
+            ReplaceOne({'_id': _category_id(group['_id'])},
+                       {'kind': 'category', 'category': group['_id'], 'views': group['views']},
+                       upsert=True)
+            for group in categories
+        ], ordered=False)
+    db.news_stats.delete_many({'kind': 'category',
+                               '_id': {'$nin': [_category_id(group['_id']) for group in categories]}})
+    db.news_stats.replace_one({'_id': TOTALS_ID}, {
+        'views': sum(group['views'] for group in categories),
+        'with_images': sum(group['with_images'] for group in categories),
+        'built_at': datetime.utcnow()
+    }, upsert=True)
+    return len(categories)
@@ -0,0 +1,345 @@
+# storage.py
+# Upload storage: content-addressed, hash-sharded keys with reference counts and background deletes
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime
+
+from flask import url_for
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+# Originals are <sha256>.<ext>; image variants add a _<width>w suffix
+CONTENT_KEY_RE = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(_\d+w)?\.\w+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def content_key(digest, extension):
+    """``ab/cd/abcd...ef.jpg``: two levels of 256 shards keep every directory small."""
+    return f'{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def is_content_key(key):
+    return bool(CONTENT_KEY_RE.match(key or ''))
+
+
+def copy_stream(source, target, digest=None):
+    """Copy ``source`` to ``target`` in CHUNK_SIZE pieces, updating ``digest``. Returns the byte count."""
+    size = 0
+    while True:
+        chunk = source.read(CHUNK_SIZE)
+        if not chunk:
+            return size
+        if digest is not None:
+            digest.update(chunk)
+        target.write(chunk)
+        size += len(chunk)
+
+
+class LocalBackend:
+    """Files under ``root``, served by the static route at ``static/<static_prefix>/<key>``."""
+
+    def __init__(self, root, static_prefix='uploads'):
+        self.root = root
+        self.static_prefix = static_prefix
+        # Work can be done on the stored files in place (image variants)
+        self.local_folder = root
+
+    def path(self, key):
+        path = os.path.normpath(os.path.join(self.root, key))
+        if not path.startswith(os.path.normpath(self.root) + os.sep):
+            raise ValueError(f'invalid upload key: {key}')
+        return path
+
+    def staging_dir(self):
+        # Same filesystem as the stored files, so save() is a rename
+        path = os.path.join(self.root, '.staging')
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def save(self, key, source_path):
+        """Move the finished file at ``source_path`` to ``key``."""
+        target = self.path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(source_path, target)
+
+    def open(self, key):
+        return open(self.path(key), 'rb')
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def size(self, key):
+        return os.path.getsize(self.path(key))
+
+    def delete(self, key):
+        path = self.path(key)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        # Drop shard directories left empty
+        root = os.path.normpath(self.root)
+        directory = os.path.dirname(path)
+        while directory != root:
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
+
+    def url(self, key):
+        return url_for('static', filename=f'{self.static_prefix}/{key}')
+
+
+class S3Backend:
+    """Objects in an S3-compatible bucket (AWS, or MinIO/localstack via ``endpoint_url``).
+
+    Objects are written with an immutable Cache-Control: keys are derived from
+    their content. ``public_url`` is the base the browser loads them from (a
+    CDN, or the bucket's public endpoint).
+    """
+
+    local_folder = None
+
+    def __init__(self, bucket, prefix='', client=None, endpoint_url=None, public_url=None):
+        if client is None:
+            import boto3
+            client = boto3.client('s3', endpoint_url=endpoint_url)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.public_url = (public_url or f'{endpoint_url or "https://s3.amazonaws.com"}/{bucket}').rstrip('/')
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        """``s3://bucket/optional/prefix``"""
+        bucket, _, prefix = url[len('s3://'):].partition('/')
+        return cls(bucket, prefix=prefix.strip('/') + '/' if prefix.strip('/') else '', **kwargs)
+
+    def staging_dir(self):
+        return None
+
+    def save(self, key, source_path):
+        import mimetypes
+        try:
+            self.client.upload_file(source_path, self.bucket, self.prefix + key, ExtraArgs={
+                'ContentType': mimetypes.guess_type(key)[0] or 'application/octet-stream',
+                'CacheControl': IMMUTABLE
+            })
+        finally:
+            os.remove(source_path)
+
+    def open(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)['Body']
+
+    def exists(self, key):
+        return self._head(key) is not None
+
+    def size(self, key):
+        head = self._head(key)
+        return head['ContentLength'] if head else None
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+    def url(self, key):
+        return f'{self.public_url}/{self.prefix}{key}'
+
+    def _head(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+        except ClientError as error:
+            if error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+
+def create_backend(url, upload_folder, endpoint_url=None, public_url=None):
+    if url and url.startswith('s3://'):
+        return S3Backend.from_url(url, endpoint_url=endpoint_url, public_url=public_url)
+    return LocalBackend(upload_folder)
+
+
+class UploadStore:
+    """Deduplicated upload storage with reference counts in the ``uploads`` collection.
+
+    ``add()`` streams an upload to a staging file while hashing it, so the
+    same image uploaded twice is stored once under its SHA-256 key and its
+    count goes up. ``release()`` drops a reference; content nobody references
+    any more is deleted, with its image variants, on a background thread.
+    Deletion first marks the record ``deleting``, and ``add()`` waits out a
+    delete in progress before re-storing the same content, so a concurrent
+    upload never ends up pointing at a deleted file. ``sweep()`` finishes
+    deletes a process did not get to.
+
+    Uploads from before content addressing (``uuid_name`` files) have no
+    record; releasing one deletes it and the variants passed along. Content
+    whose record is missing may still be used by other articles, so
+    releasing it only records it as unreferenced and leaves the file to
+    ``sweep()``, which recounts references first.
+    """
+
+    def __init__(self, backend, max_workers=1):
+        self.backend = backend
+        self._get_collection = None
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='upload-cleanup')
+
+    def init_collection(self, getter):
+        self._get_collection = getter
+
+    @property
+    def collection(self):
+        return self._get_collection()
+
+    def url(self, key):
+        return self.backend.url(key)
+
+    # Adding
+
+    def add(self, stream, filename):
+        """Store an uploaded file (any readable binary stream). Returns its key."""
+        extension = os.path.splitext(filename)[1].lower()
+        digest = hashlib.sha256()
+        descriptor, staged = tempfile.mkstemp(dir=self.backend.staging_dir(), suffix=extension)
+        try:
+            with os.fdopen(descriptor, 'wb') as output:
+                size = copy_stream(stream, output, digest)
+            key = content_key(digest.hexdigest(), extension)
+            self._acquire(key, size)
+            if not self.backend.exists(key):
+                self.backend.save(key, staged)
+            return key
+        finally:
+            if os.path.exists(staged):
+                os.remove(staged)
+
+    def save_stream(self, key, stream):
+        """Store ``stream`` under a known ``key`` (restores). Reference counts are not touched."""
+        descriptor, staged = tempfile.mkstemp(dir=self.backend.staging_dir())
+        try:
+            with os.fdopen(descriptor, 'wb') as output:
+                copy_stream(stream, output)
+            self.backend.save(key, staged)
+        finally:
+            if os.path.exists(staged):
+                os.remove(staged)
+
+    def _acquire(self, key, size, attempts=50):
+        for _ in range(attempts):
+            try:
+                self.collection.update_one(
+                    {'_id': key, 'deleting': {'$ne': True}},
+                    {'$inc': {'refs': 1}, '$setOnInsert': {'size': size, 'variants': [],
+                                                           'date_created': datetime.utcnow()}},
+                    upsert=True)
+                return
+            except DuplicateKeyError:
+                # The cleanup thread is deleting this content; it is stored again once that is done
+                time.sleep(0.1)
+        raise RuntimeError(f'upload {key} is stuck in deletion; run the upload sweep')
+
+    # Variants
+
+    def variants(self, key):
+        """Variants already generated for this content, or None."""
+        record = self.collection.find_one({'_id': key}, {'variants': 1})
+        return (record or {}).get('variants') or None
+
+    def set_variants(self, key, variants):
+        self.collection.update_one({'_id': key}, {'$set': {'variants': variants}})
+
+    # Releasing
+
+    def release(self, key, legacy_files=()):
+        """Drop one reference to ``key``; unreferenced content is deleted in the background."""
+        if not key:
+            return None
+        record = self.collection.find_one_and_update({'_id': key}, {'$inc': {'refs': -1}},
+                                                     return_document=ReturnDocument.AFTER)
+        if record is None:
+            if not is_content_key(key):
+                return self._submit(self._delete_files, [key, *legacy_files])
+            logger.warning('Upload %s has no record; leaving it for the upload sweep', key)
+            self.collection.update_one({'_id': key}, {'$setOnInsert': {
+                'refs': 0, 'variants': [], 'date_created': datetime.utcnow()}}, upsert=True)
+            return None
+        if record['refs'] <= 0:
+            return self._submit(self._collect, key)
+        return None
+
+    def sweep(self, news=None):
+        """Delete all unreferenced content now. Returns how many uploads were removed.
+
+        With the ``news`` collection, references are recounted first, so a
+        record left at zero by a release that found no record is corrected
+        if an article still uses that content.
+        """
+        if news is not None:
+            self.rebuild_refs(news)
+        removed = 0
+        for record in self.collection.find({'refs': {'$lte': 0}}, {'_id': 1}):
+            removed += self._collect(record['_id'])
+        return removed
+
+    def _collect(self, key):
+        record = self.collection.find_one_and_update({'_id': key, 'refs': {'$lte': 0}},
+                                                     {'$set': {'deleting': True}},
+                                                     return_document=ReturnDocument.AFTER)
+        if record is None:
+            # Referenced again since it was released
+            return 0
+        self._delete_files([key, *(variant['filename'] for variant in record.get('variants') or [])])
+        self.collection.delete_one({'_id': key})
+        return 1
+
+    def _delete_files(self, keys):
+        for key in keys:
+            self.backend.delete(key)
+
+    def _submit(self, func, arg):
+        future = self._executor.submit(func, arg)
+        future.add_done_callback(
+            lambda future: future.exception() and logger.error('Upload cleanup failed for %s', arg,
+                                                               exc_info=future.exception()))
+        return future
+
+    # Maintenance
+
+    def rebuild_refs(self, news):
+        """Recount references from the ``news`` collection (after imports or manual edits).
+
+        Returns the number of content records now referenced.
+        """
+        counts = news.aggregate([
+            {'$match': {'image': {'$regex': CONTENT_KEY_RE.pattern}}},
+            {'$group': {'_id': '$image', 'refs': {'$sum': 1}, 'variants': {'$first': '$image_variants'}}}
+        ])
+        referenced = set()
+        for count in counts:
+            referenced.add(count['_id'])
+            self.collection.update_one({'_id': count['_id']}, {
+                '$set': {'refs': count['refs']},
+                '$setOnInsert': {'variants': count.get('variants') or [], 'date_created': datetime.utcnow()}
+            }, upsert=True)
+        self.collection.update_many({'_id': {'$nin': list(referenced)}}, {'$set': {'refs': 0}})
+        return len(referenced)
+
+    def download(self, key, path):
+        """Copy stored ``key`` to the local file ``path``."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with closing(self.backend.open(key)) as source, open(path, 'wb') as target:
+            shutil.copyfileobj(source, target, CHUNK_SIZE)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,224 @@
+# transfer.py
+# Streaming NDJSON export/import of articles, with uploaded images packed into a tar
+import gzip
+import hashlib
+import itertools
+import json
+import posixpath
+import tarfile
+import time
+from contextlib import closing
+from datetime import datetime
+
+from bson import json_util
+from bson.objectid import ObjectId
+from pymongo import ReplaceOne
+
+from articles import summarize_content
+
+# Extended JSON keeps ObjectId and datetime values exact across a round trip
+JSON_OPTIONS = json_util.RELAXED_JSON_OPTIONS
+REQUIRED_FIELDS = ('title', 'content', 'category')
+DATE_FIELDS = ('date_created', 'date_updated')
+
+
+def open_text(path, mode):
+    """Open ``path`` for text streaming; ``.gz`` files are (de)compressed on the fly."""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def article_image_files(news):
+    """Filenames of an article's upload and its variants."""
+    files = [news['image']] if news.get('image') else []
+    files.extend(variant['filename'] for variant in news.get('image_variants') or [])
+    return files
+
+
+class Progress:
+    """Counts records and bytes and reports throughput at most every ``interval`` seconds."""
+
+    def __init__(self, report, interval=2.0):
+        self.report = report
+        self.interval = interval
+        self.count = 0
+        self.bytes = 0
+        # Last input line committed (imports), for resuming with start_line
+        self.line = None
+        self.started = time.perf_counter()
+        self._next_report = self.started + interval
+
+    def add(self, count, size):
+        self.count += count
+        self.bytes += size
+        if self.report and time.perf_counter() >= self._next_report:
+            self._next_report = time.perf_counter() + self.interval
+            self.report(self)
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def __str__(self):
+        elapsed = max(self.elapsed, 1e-9)
+        text = (f"{self.count} articles, {self.bytes / 1e6:.1f} MB in {elapsed:.1f}s "
+                f"({self.count / elapsed:.0f} articles/s, {self.bytes / 1e6 / elapsed:.1f} MB/s)")
+        return text + (f", through line {self.line}" if self.line else '')
+
+
+def export_articles(collection, path, query=None, batch_size=1000, store=None,
+                    images_path=None, report=None):
+    """Write every matching article to ``path`` as NDJSON, one document per line.
+
+    The cursor is read ``batch_size`` documents at a time and each line is
+    written as soon as it is encoded, so memory use does not depend on the
+    number of articles. With ``images_path`` the uploads (and variants)
+    referenced by the exported articles are streamed from ``store`` into a
+    tar (gzip when the name ends in .gz), each once. Returns the Progress.
+    """
+    progress = Progress(report)
+    images = None
+    # Keys already packed; shared uploads are stored once
+    packed = set()
+    if images_path:
+        images = tarfile.open(images_path, 'w|gz' if images_path.endswith('.gz') else 'w|')
+    try:
+        with open_text(path, 'w') as output:
+            for news in collection.find(query or {}).sort('_id', 1).batch_size(batch_size):
+                line = json_util.dumps(news, json_options=JSON_OPTIONS) + '\n'
+                output.write(line)
+                if images is not None:
+                    for key in article_image_files(news):
+                        if key not in packed and store.backend.exists(key):
+                            info = tarfile.TarInfo(key)
+                            info.size = store.backend.size(key)
+                            info.mtime = int(time.time())
+                            with closing(store.backend.open(key)) as source:
+                                images.addfile(info, source)
+                            packed.add(key)
+                progress.add(1, len(line))
+    finally:
+        if images is not None:
+            images.close()
+    return progress
+
+
+def read_articles(path, start_line=1):
+    """Yield ``(line_number, document or None, error, size)`` for each line from ``start_line`` on."""
+    with open_text(path, 'r') as source:
+        for line_number, line in enumerate(source, 1):
+            if line_number < start_line or not line.strip():
+                continue
+            try:
+                news = json_util.loads(line, json_options=JSON_OPTIONS)
+            except ValueError as error:
+                yield line_number, None, f'invalid JSON: {error}', len(line)
+                continue
+            if not isinstance(news, dict):
+                yield line_number, None, 'not a JSON object', len(line)
+                continue
+            yield line_number, news, None, len(line)
+
+
+def parse_date(value):
+    """A date field as a datetime: decoded already, or an ISO-8601 string read as the exporter's ``$date``."""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        return json_util.loads(json.dumps({'$date': value}), json_options=JSON_OPTIONS)
+    raise ValueError(f'expected a date, got {type(value).__name__}')
+
+
+def stable_id(news):
+    """Key for upserts: the exported ``_id``, or an id derived from title and creation date."""
+    if news.get('_id') is not None:
+        return ObjectId(news['_id']) if ObjectId.is_valid(news['_id']) else news['_id']
+    key = f"{news['title']}\x00{news.get('date_created')}".encode('utf-8')
+    return ObjectId(hashlib.sha1(key).digest()[:12])
+
+
+def prepare_article(news):
+    """Fill in what the app expects of an article; returns an error message for unusable records."""
+    missing = [field for field in REQUIRED_FIELDS if not news.get(field)]
+    if missing:
+        return f"missing {', '.join(missing)}"
+    for field in DATE_FIELDS:
+        if news.get(field) is not None:
+            try:
+                news[field] = parse_date(news[field])
+            except ValueError as error:
+                return f'invalid {field}: {error}'
+    now = datetime.utcnow()
+    news['_id'] = stable_id(news)
+    if news.get('date_created') is None:
+        news['date_created'] = now
+    if news.get('date_updated') is None:
+        news['date_updated'] = news['date_created']
+    news.setdefault('views', 0)
+    news.setdefault('image', None)
+    news.setdefault('author', 'Admin')
+    if 'excerpt' not in news:
+        news.update(summarize_content(news['content']))
+    return None
+
+
+def import_articles(collection, path, batch_size=1000, start_line=1, report=None, on_error=None):
+    """Upsert the articles of an NDJSON file ``batch_size`` at a time.
+
+    Each article replaces the stored document with the same ``_id`` (or is
+    inserted), so re-running an interrupted import converges on the same
+    result; ``start_line`` skips what an earlier run already committed.
+    Invalid lines are passed to ``on_error(line_number, message)`` and
+    skipped. Returns the Progress.
+    """
+    progress = Progress(report)
+    records = read_articles(path, start_line)
+    for chunk in chunked(records, batch_size):
+        requests = []
+        size = 0
+        for line_number, news, error, line_size in chunk:
+            size += line_size
+            error = error or prepare_article(news)
+            if error:
+                if on_error:
+                    on_error(line_number, error)
+                continue
+            requests.append(ReplaceOne({'_id': news['_id']}, news, upsert=True))
+        if requests:
+            collection.bulk_write(requests, ordered=False)
+        progress.line = chunk[-1][0]
+        progress.add(len(requests), size)
+    return progress
+
+
+def import_images(images_path, store):
+    """Restore uploads from a tar written by export_articles(). Returns (extracted, skipped).
+
+    Members are read sequentially (no seeking, so memory stays flat) and
+    streamed into ``store`` under their key. Only plain files with relative
+    paths are restored, and keys already present with the same size are left
+    alone so a re-run is cheap. Reference counts are rebuilt separately, from
+    the imported articles (UploadStore.rebuild_refs).
+    """
+    extracted = skipped = 0
+    with tarfile.open(images_path, 'r|*') as archive:
+        for member in archive:
+            key = posixpath.normpath(member.name)
+            if not member.isfile() or key.startswith(('/', '..')) or posixpath.basename(key).startswith('.'):
+                continue
+            if store.backend.exists(key) and store.backend.size(key) == member.size:
+                skipped += 1
+                continue
+            store.save_stream(key, archive.extractfile(member))
+            extracted += 1
+    return extracted, skipped
@@ -0,0 +1,259 @@
+# trending.py
+# "Trending now": time-decayed view scores with an in-memory top-K, merged across workers through MongoDB
+#
+# Scores use forward decay. A view at time t adds 2 ** ((t - epoch) / half_life),
+# so stored scores never have to be decayed and their order holds as time
+# passes; the current value is score * 2 ** (-(now - epoch) / half_life). The
+# epoch moves forward every ERA_HALF_LIVES half-lives (an "era") to keep the
+# numbers in float range; scores carried into a new era are scaled down once.
+#
+# Documents (trending collection): {_id: '<news id>', era, score}
+import atexit
+import heapq
+import logging
+import os
+import threading
+import time
+
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from articles import CARD_PROJECTION
+
+logger = logging.getLogger(__name__)
+
+ERA_HALF_LIVES = 256
+# Stored scores that have decayed below this many views are deleted
+MIN_SCORE = 1e-3
+
+
+class TrendingTracker:
+    """Ranks articles by recent views, for read paths that must not query MongoDB.
+
+    The view counter's flush listener feeds ``record()``; each worker adds
+    the views it flushed to its in-memory scores and updates its top
+    ``size`` with a heap merge (scores only grow, so only the previous top
+    and the articles just viewed can make up the new one). A background
+    thread persists each worker's increments with ``$inc`` every
+    ``sync_interval`` seconds and reloads the merged top ``candidates``
+    scores, so all workers converge on one ranking, and refreshes the card
+    fields of the top articles. ``top()`` reads memory only.
+    """
+
+    def __init__(self, half_life=6 * 3600, size=10, candidates=200, sync_interval=60):
+        self.half_life = half_life
+        self.size = size
+        self.candidates = max(candidates, size)
+        self.sync_interval = sync_interval
+        self._get_db = None
+        self._lock = threading.Lock()
+        self._era = None
+        # news_id -> score in the current era: merged at the last sync, plus local views since
+        self._scores = {}
+        # news_id -> local score not persisted yet
+        self._deltas = {}
+        # [(score, news_id)], best first
+        self._top = []
+        # news_id -> card fields of the articles in _top
+        self._articles = {}
+        self._persisted_era = None
+        self._loaded = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._atexit_registered = False
+
+    def init_db(self, get_db):
+        """Register a callable returning the database (``news`` and ``trending`` collections)."""
+        self._get_db = get_db
+        # Once per tracker: the registration is inherited by forked workers, each persisting its own scores
+        if not self._atexit_registered:
+            atexit.register(self.stop)
+            self._atexit_registered = True
+
+    # Scores
+
+    def _era_length(self):
+        return ERA_HALF_LIVES * self.half_life
+
+    def _advance(self, era):
+        # Called with the lock held: rescale local scores into ``era``
+        if self._era is not None and era > self._era:
+            factor = 2.0 ** (-ERA_HALF_LIVES * (era - self._era))
+            self._scores = {news_id: score * factor for news_id, score in self._scores.items()}
+            self._deltas = {news_id: score * factor for news_id, score in self._deltas.items()}
+            self._top = [(score * factor, news_id) for score, news_id in self._top]
+        if self._era is None or era > self._era:
+            self._era = era
+
+    def _weight(self, now):
+        return 2.0 ** ((now - self._era * self._era_length()) / self.half_life)
+
+    def record(self, counts, now=None):
+        """Add flushed views ``{news_id: count}``."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._advance(int(now // self._era_length()))
+            weight = self._weight(now)
+            for news_id, count in counts.items():
+                news_id = str(news_id)
+                self._scores[news_id] = self._scores.get(news_id, 0.0) + count * weight
+                self._deltas[news_id] = self._deltas.get(news_id, 0.0) + count * weight
+            candidates = {news_id for _, news_id in self._top}.union(map(str, counts))
+            self._top = heapq.nlargest(self.size, ((self._scores[news_id], news_id) for news_id in candidates))
+            missing = [news_id for _, news_id in self._top if news_id not in self._articles]
+        if missing and self._get_db is not None:
+            # Runs on the view counter's flush thread, not a request
+            self._load_articles(self._get_db(), missing)
+        self._ensure_thread()
+
+    def remove(self, news_id):
+        """Forget a deleted article."""
+        news_id = str(news_id)
+        with self._lock:
+            self._scores.pop(news_id, None)
+            self._deltas.pop(news_id, None)
+            self._articles.pop(news_id, None)
+            self._top = heapq.nlargest(self.size, ((score, news_id) for news_id, score in self._scores.items()))
+        if self._get_db is not None:
+            self._get_db().trending.delete_one({'_id': news_id})
+
+    def update_article(self, news):
+        """Refresh the stored card fields of an edited article if it is trending here."""
+        news_id = str(news['_id'])
+        with self._lock:
+            if news_id in self._articles:
+                self._articles[news_id] = {field: news.get(field) for field in ('_id', *CARD_PROJECTION)}
+
+    # Reading
+
+    def top(self, limit=None, now=None):
+        """The trending articles (card fields plus ``trending_score``), best first. No database access."""
+        self._ensure_thread()
+        if not self._loaded.is_set():
+            # Only a worker's first request waits, briefly, for the initial load
+            self._loaded.wait(1.0)
+        now = time.time() if now is None else now
+        with self._lock:
+            entries = self._top[:limit or self.size]
+            articles = self._articles
+            era = self._era
+        if era is None:
+            return []
+        decay = 2.0 ** (-(now - era * self._era_length()) / self.half_life)
+        return [{**articles[news_id], 'trending_score': score * decay}
+                for score, news_id in entries if news_id in articles]
+
+    # Persistence
+
+    def sync(self, now=None):
+        """Persist local increments, then reload the merged top scores and their articles."""
+        now = time.time() if now is None else now
+        db = self._get_db()
+        era = int(now // self._era_length())
+        with self._lock:
+            self._advance(era)
+            era = self._era
+            deltas, self._deltas = self._deltas, {}
+        try:
+            self._persist(db, era, deltas)
+        except Exception:
+            with self._lock:
+                for news_id, score in deltas.items():
+                    self._deltas[news_id] = self._deltas.get(news_id, 0.0) + score
+            raise
+
+        # Forget what has decayed to nothing, then read the best candidates (era, score index)
+        threshold = MIN_SCORE * 2.0 ** ((now - era * self._era_length()) / self.half_life)
+        db.trending.delete_many({'era': era, 'score': {'$lt': threshold}})
+        merged = {doc['_id']: doc['score']
+                  for doc in db.trending.find({'era': era}, {'score': 1}).sort('score', -1).limit(self.candidates)}
+        with self._lock:
+            if self._era == era:
+                # Views recorded while this ran are not in the database yet
+                for news_id, score in self._deltas.items():
+                    merged[news_id] = merged.get(news_id, 0.0) + score
+                self._scores = merged
+                self._top = heapq.nlargest(self.size, ((score, news_id) for news_id, score in merged.items()))
+            top_ids = [news_id for _, news_id in self._top]
+        # Card fields of every top article are re-read, so edits and deletes elsewhere show up
+        self._load_articles(db, top_ids, replace=True)
+
+    def _persist(self, db, era, deltas):
+        if self._persisted_era != era:
+            # First sync of this process in a new era: carry the previous era's scores over
+            # (later workers find nothing left to convert) and drop anything older
+            db.trending.update_many({'era': era - 1}, {'$mul': {'score': 2.0 ** -ERA_HALF_LIVES},
+                                                       '$set': {'era': era}})
+            db.trending.delete_many({'era': {'$lt': era - 1}})
+            self._persisted_era = era
+        if not deltas:
+            return
+        try:
+            db.trending.bulk_write([UpdateOne({'_id': news_id, 'era': era}, {'$inc': {'score': score}}, upsert=True)
+                                    for news_id, score in deltas.items()], ordered=False)
+        except BulkWriteError as error:
+            # Only a document another worker has not moved into this era yet can collide;
+            # those few views, at an era boundary, are dropped
+            if any(write_error.get('code') != 11000 for write_error in error.details.get('writeErrors', [])):
+                raise
+
+    def _load_articles(self, db, news_ids, replace=False):
+        object_ids = [ObjectId(news_id) for news_id in news_ids if ObjectId.is_valid(news_id)]
+        found = {str(news['_id']): news for news in db.news.find({'_id': {'$in': object_ids}}, CARD_PROJECTION)}
+        with self._lock:
+            articles = {} if replace else dict(self._articles)
+            articles.update(found)
+            if replace:
+                # Deleted articles drop out of the ranking
+                gone = set(news_ids) - set(found)
+                self._top = [(score, news_id) for score, news_id in self._top if news_id not in gone]
+            keep = {news_id for _, news_id in self._top}
+            # Swapped whole, so top() can read it without copying
+            self._articles = {news_id: news for news_id, news in articles.items() if news_id in keep}
+
+    # Background sync
+
+    def stop(self):
+        self._stopping.set()
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                self._thread.join(timeout=self.sync_interval + 1)
+            # A later record() or top() starts a new sync thread rather than relying on this one
+            self._thread = None
+            self._pid = None
+        if self._get_db is None:
+            return
+        with self._lock:
+            deltas, self._deltas = self._deltas, {}
+            era = self._era
+        try:
+            if deltas:
+                self._persist(self._get_db(), era, deltas)
+        except Exception:
+            logger.exception('Final trending sync failed')
+
+    def _ensure_thread(self):
+        # Threads do not survive a fork, so each gunicorn worker starts its own
+        if self._get_db is None or (self._thread is not None and self._pid == os.getpid()):
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._loaded.clear()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='trending-sync', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self.sync()
+            except Exception:
+                logger.exception('Trending sync failed')
+            finally:
+                self._loaded.set()
+            self._stopping.wait(self.sync_interval)
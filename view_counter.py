@@ -0,0 +1,203 @@
+# view_counter.py
+# Write-behind view counting: buffer increments per article, flush them in bulk
+import atexit
+import logging
+import os
+import threading
+from collections import Counter
+
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+
+class LocalViewBuffer:
+    """In-process buffer. Used for single-worker setups and as the stand-in for Redis in tests."""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def add(self, news_id, amount=1):
+        """Buffer ``amount`` views and return the number of views pending overall."""
+        with self._lock:
+            self._counts[news_id] += amount
+            self._total += amount
+            return self._total
+
+    def add_many(self, counts):
+        with self._lock:
+            self._counts.update(counts)
+            self._total += sum(counts.values())
+
+    def pending(self, news_id):
+        with self._lock:
+            return self._counts.get(news_id, 0)
+
+    def drain(self):
+        """Remove and return every buffered count as ``{news_id: views}``."""
+        with self._lock:
+            counts, self._counts = dict(self._counts), Counter()
+            self._total = 0
+            return counts
+
+
+class RedisViewBuffer:
+    """Buffer shared by every worker through a Redis hash (any Redis-compatible server)."""
+
+    def __init__(self, client, key='news_portal:views'):
+        self.client = client
+        self.key = key
+        self.total_key = f'{key}:total'
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        import redis
+        return cls(redis.Redis.from_url(url, decode_responses=True), **kwargs)
+
+    def add(self, news_id, amount=1):
+        pipe = self.client.pipeline()
+        pipe.hincrby(self.key, news_id, amount)
+        pipe.incrby(self.total_key, amount)
+        return int(pipe.execute()[1])
+
+    def add_many(self, counts):
+        pipe = self.client.pipeline()
+        for news_id, amount in counts.items():
+            pipe.hincrby(self.key, news_id, amount)
+        pipe.incrby(self.total_key, sum(counts.values()))
+        pipe.execute()
+
+    def pending(self, news_id):
+        return int(self.client.hget(self.key, news_id) or 0)
+
+    def drain(self):
+        # MULTI/EXEC so that no increment lands between the read and the delete
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hgetall(self.key)
+        pipe.delete(self.key, self.total_key)
+        counts = pipe.execute()[0]
+        return {news_id: int(amount) for news_id, amount in counts.items()}
+
+
+def create_view_buffer(url=None):
+    """Pick a buffer from the VIEW_BUFFER_URL setting (None means in-process)."""
+    if url:
+        return RedisViewBuffer.from_url(url)
+    return LocalViewBuffer()
+
+
+class ViewCounter:
+    """Collects article views and writes them to MongoDB with one ``bulk_write``.
+
+    A background thread flushes every ``flush_interval`` seconds, or sooner
+    once ``flush_threshold`` views are pending. Pending views are flushed
+    again when the process exits.
+    """
+
+    def __init__(self, buffer, flush_interval=5.0, flush_threshold=1000):
+        self.buffer = buffer
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._get_collection = None
+        self._listeners = []
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._atexit_registered = False
+
+    def init_collection(self, get_collection):
+        """Register a callable returning the ``news`` collection to flush into."""
+        self._get_collection = get_collection
+        # Once per counter: the registration is inherited by forked workers, each flushing its own buffer
+        if not self._atexit_registered:
+            atexit.register(self.stop)
+            self._atexit_registered = True
+
+    def add_flush_listener(self, listener):
+        """Call ``listener(counts)`` with every batch successfully written."""
+        self._listeners.append(listener)
+
+    def record(self, news_id):
+        pending = self.buffer.add(str(news_id))
+        self._ensure_thread()
+        if pending >= self.flush_threshold:
+            self._wakeup.set()
+
+    def pending(self, news_id):
+        return self.buffer.pending(str(news_id))
+
+    def flush(self):
+        """Write every buffered count now. Returns the number of articles updated."""
+        with self._flush_lock:
+            counts = self.buffer.drain()
+            if not counts:
+                return 0
+
+            news_ids = list(counts)
+            operations = [UpdateOne({'_id': ObjectId(news_id)}, {'$inc': {'views': counts[news_id]}})
+                          for news_id in news_ids]
+            error = None
+            try:
+                self._get_collection().bulk_write(operations, ordered=False)
+            except BulkWriteError as bulk_error:
+                # Unordered, so every operation but those in writeErrors was applied:
+                # put back only the failed views, or the others would be counted twice
+                failed = {news_ids[write_error['index']] for write_error in bulk_error.details.get('writeErrors', [])}
+                if failed:
+                    self.buffer.add_many({news_id: counts.pop(news_id) for news_id in failed})
+                error = bulk_error
+            except Exception:
+                # Put the views back so the next flush retries them
+                self.buffer.add_many(counts)
+                raise
+
+            for listener in self._listeners:
+                try:
+                    listener(counts)
+                except Exception:
+                    logger.exception('View flush listener failed')
+            if error is not None:
+                raise error
+            return len(counts)
+
+    def stop(self):
+        self._stopping.set()
+        self._wakeup.set()
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                self._thread.join(timeout=self.flush_interval + 1)
+            # A later record() starts a new flush thread rather than buffering for this one
+            self._thread = None
+            self._pid = None
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Final view count flush failed')
+
+    def _ensure_thread(self):
+        # Threads do not survive a fork, so each gunicorn worker starts its own
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='view-counter-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('View count flush failed')